@@ -0,0 +1,119 @@
+import math
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, timedelta
+
+
+class ClaimAggregates:
+    # running counts and sums over claims, updated on every claim add/remove/status change
+    # so dashboards read O(groups) instead of scanning every claim
+    def __init__(self):
+        self.by_month = {}  # "YYYY-MM" -> [count, total_amount]
+        self.by_policy_type = {}  # policy type -> [count, total_amount]
+        self.by_policy_type_status = {}  # (policy type, status) -> count
+        self.by_status = {}  # status -> [count, total_amount]
+        self.by_policyholder = {}  # policyholder id -> [count, total_amount]
+        self.dates_by_policyholder = {}  # policyholder id -> sorted date ordinals, one per claim
+
+    def add(self, claim, policy_type):
+        self._apply(claim, policy_type, 1)
+
+    def remove(self, claim, policy_type):
+        self._apply(claim, policy_type, -1)
+
+    def clear(self):
+        self.__init__()
+
+    def monthly_totals(self):
+        return sorted((month, count, total) for month, (count, total) in self.by_month.items())
+
+    def policy_type_totals(self):
+        return [(policy_type, count, total) for policy_type, (count, total) in self.by_policy_type.items()]
+
+    def policy_type_status_count(self, policy_type, status):
+        return self.by_policy_type_status.get((policy_type, status), 0)
+
+    def status_totals(self, status):
+        return tuple(self.by_status.get(status, (0, 0)))
+
+    def policyholder_totals(self, policyholder_id):
+        return tuple(self.by_policyholder.get(policyholder_id, (0, 0)))
+
+    def policyholder_claims_since(self, policyholder_id, since_ordinal):
+        # claims dated strictly after the `since_ordinal` day
+        dates = self.dates_by_policyholder.get(policyholder_id)
+        if not dates:
+            return 0
+        return len(dates) - bisect_right(dates, since_ordinal)
+
+    def policyholder_claims_between(self, policyholder_id, start_ordinal, end_ordinal):
+        # claims dated from the start to the end day, both included
+        dates = self.dates_by_policyholder.get(policyholder_id)
+        if not dates:
+            return 0
+        return bisect_right(dates, end_ordinal) - bisect_left(dates, start_ordinal)
+
+    def policyholder_claims_last_year(self, policyholder_id, now=None):
+        now = now or datetime.now()
+        return self.policyholder_claims_since(policyholder_id, (now - timedelta(days=365)).toordinal())
+
+    def verify(self, db):
+        # compare the running aggregates with a full recompute, returning the mismatches found
+        expected = ClaimAggregates()
+        for claim in db.claims.values():
+            ph = db.policyholders.get(claim.policyholder_id)
+            expected.add(claim, ph.policy_type if ph else None)
+        mismatches = []
+        for name in ("by_month", "by_policy_type", "by_policy_type_status", "by_status",
+                     "by_policyholder", "dates_by_policyholder"):
+            actual, wanted = getattr(self, name), getattr(expected, name)
+            for key in set(actual) | set(wanted):
+                if name == "dates_by_policyholder":
+                    if actual.get(key) != wanted.get(key):
+                        mismatches.append((name, key, actual.get(key), wanted.get(key)))
+                elif not _same(actual.get(key), wanted.get(key)):
+                    mismatches.append((name, key, actual.get(key), wanted.get(key)))
+        return mismatches
+
+    def _apply(self, claim, policy_type, sign):
+        amount = claim.amount * sign
+        _bump(self.by_month, claim.date[:7], sign, amount)
+        _bump(self.by_status, claim.status, sign, amount)
+        _bump(self.by_policyholder, claim.policyholder_id, sign, amount)
+        dates = self.dates_by_policyholder.setdefault(claim.policyholder_id, [])
+        if sign > 0:
+            insort(dates, claim.date_ordinal)
+        else:
+            i = bisect_left(dates, claim.date_ordinal)
+            if i < len(dates) and dates[i] == claim.date_ordinal:
+                del dates[i]
+            if not dates:
+                del self.dates_by_policyholder[claim.policyholder_id]
+        # claims whose policyholder is gone have no policy type and stay out of the per-type figures
+        if policy_type is not None:
+            _bump(self.by_policy_type, policy_type, sign, amount)
+            _count(self.by_policy_type_status, (policy_type, claim.status), sign)
+
+
+def _bump(groups, key, sign, amount):
+    entry = groups.get(key)
+    if entry is None:
+        entry = groups[key] = [0, 0]
+    entry[0] += sign
+    entry[1] += amount
+    if entry[0] == 0:
+        del groups[key]
+
+
+def _count(groups, key, sign):
+    count = groups.get(key, 0) + sign
+    if count:
+        groups[key] = count
+    else:
+        groups.pop(key, None)
+
+
+def _same(actual, wanted):
+    if isinstance(actual, list) and isinstance(wanted, list):
+        # float totals accumulate rounding error as claims come and go
+        return actual[0] == wanted[0] and math.isclose(actual[1], wanted[1], rel_tol=1e-9, abs_tol=1e-6)
+    return actual == wanted
@@ -1,15 +1,43 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
 import os
-import json
-from db_manager import DBManager
-from risk_analyzer import RiskAnalyzer
+from metrics import CONTENT_TYPE, ApiMetrics
+from risk_service import ServiceError, create_service, read_json_items
 
 app = Flask(__name__)
 @app.route('/')
 def home():
     return "<h2>Risk Analysis API</h2><p>Visit <code>/health</code> to check API status or use Postman to test endpoints like <code>/api/analyze</code>.</p>"
-db_manager = DBManager()
-risk_analyzer = RiskAnalyzer()
+# the route logic lives in risk_service.RiskService, which asgi.py serves as well
+service = create_service()
+db_manager = service.db_manager
+risk_analyzer = service.risk_analyzer
+response_cache = service.response_cache
+# request metrics and RiskAnalyzer/DBManager spans, served on /metrics; when disabled no hooks
+# or wrappers are installed at all
+metrics = ApiMetrics() if os.environ.get('METRICS_ENABLED', 'false').lower() == 'true' else None
+
+if metrics is not None:
+    metrics.instrument_service(service)
+
+    @app.before_request
+    def _start_request_metrics():
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        g.metrics_request = (route, metrics.request_started(route))
+
+    @app.after_request
+    def _record_request_metrics(response):
+        # runs for error responses too; streamed responses are timed up to the first byte,
+        # when the handler returns
+        started = g.pop('metrics_request', None)
+        if started is not None:
+            metrics.request_finished(request.method, started[0], response.status_code, started[1])
+        return response
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    if metrics is None:
+        return jsonify({"status": "error", "message": "Metrics are disabled"}), 404
+    return Response(metrics.render(), content_type=CONTENT_TYPE)
 
 @app.route('/health', methods=['GET'])
 def health_check():
@@ -18,86 +46,103 @@ def health_check():
 @app.route('/api/risks', methods=['GET'])
 def get_all_risks():
     try:
-        risks = db_manager.get_all_risks()
-        return jsonify({"status": "success", "data": risks})
+        export = service.export_format(request.args, request.headers.get('Accept', ''))
+        if export is not None:
+            mimetype, chunks = service.export_risks(export, request.args)
+            return Response(chunks, mimetype=mimetype)
+        return _cached_json(*service.risk_list(request.args, request.query_string))
+    except ServiceError as e:
+        return jsonify(e.payload()), e.status
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
 @app.route('/api/risks/<int:risk_id>', methods=['GET'])
 def get_risk(risk_id):
     try:
-        risk = db_manager.get_risk_by_id(risk_id)
-        if risk:
-            return jsonify({"status": "success", "data": risk})
-        else:
-            return jsonify({"status": "error", "message": "Risk not found"}), 404
+        return _cached_json(*service.risk(risk_id))
+    except ServiceError as e:
+        return jsonify(e.payload()), e.status
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
 @app.route('/api/risks', methods=['POST'])
 def create_risk():
     try:
-        data = request.get_json()
-        required_fields = ['project_name', 'risk_factors']
-        for field in required_fields:
-            if field not in data:
-                return jsonify({"status": "error", "message": f"Missing required field: {field}"}), 400
-        risk_score = risk_analyzer.analyze_risk(data['risk_factors'])
-        data['risk_score'] = risk_score
-        risk_id = db_manager.create_risk(data)        
-        return jsonify({"status": "success", "message": "Risk assessment created", "risk_id": risk_id}), 201
+        return jsonify(service.create_risk(request.get_json())), 201
+    except ServiceError as e:
+        return jsonify(e.payload()), e.status
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+@app.route('/api/risks/bulk', methods=['POST'])
+def create_risks_bulk():
+    try:
+        items, errors = read_json_items(request.get_data(), request.content_type)
+        return jsonify(service.create_risks(items, errors)), 201
+    except ServiceError as e:
+        return jsonify(e.payload()), e.status
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    return jsonify(service.cache_stats())
+
+def _cached_json(key, version, build):
+    # answers If-None-Match with 304 and otherwise serves the body cached for this version
+    etag = service.etag(key, version)
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+        response.set_etag(etag)
+        return response
+    body = service.cached_body(key, version, build, lambda payload: jsonify(payload).get_data())
+    response = app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    return response
+
 @app.route('/api/risks/<int:risk_id>', methods=['PUT'])
 def update_risk(risk_id):
     try:
-        data = request.get_json()
-        existing_risk = db_manager.get_risk_by_id(risk_id)
-        if not existing_risk:
-            return jsonify({"status": "error", "message": "Risk not found"}), 404
-        if 'risk_factors' in data:
-            risk_score = risk_analyzer.analyze_risk(data['risk_factors'])
-            data['risk_score'] = risk_score
-        success = db_manager.update_risk(risk_id, data)
-        if success:
-            return jsonify({"status": "success", "message": "Risk assessment updated"})
-        else:
-            return jsonify({"status": "error", "message": "Failed to update risk assessment"}), 500
+        return jsonify(service.update_risk(risk_id, request.get_json()))
+    except ServiceError as e:
+        return jsonify(e.payload()), e.status
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
 @app.route('/api/risks/<int:risk_id>', methods=['DELETE'])
 def delete_risk(risk_id):
     try:
-        existing_risk = db_manager.get_risk_by_id(risk_id)
-        if not existing_risk:
-            return jsonify({"status": "error", "message": "Risk not found"}), 404
-        success = db_manager.delete_risk(risk_id)        
-        if success:
-            return jsonify({"status": "success", "message": "Risk assessment deleted"})
-        else:
-            return jsonify({"status": "error", "message": "Failed to delete risk assessment"}), 500
+        return jsonify(service.delete_risk(risk_id))
+    except ServiceError as e:
+        return jsonify(e.payload()), e.status
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
 @app.route('/api/analyze', methods=['POST'])
 def analyze_risk():
     try:
-        data = request.get_json()
-        if 'risk_factors' not in data:
-            return jsonify({"status": "error", "message": "Missing risk_factors"}), 400
-        risk_score = risk_analyzer.analyze_risk(data['risk_factors'])
-        return jsonify({
-            "status": "success", 
-            "data": {
-                "risk_score": risk_score,
-                "risk_level": risk_analyzer.get_risk_level(risk_score)
-            }
-        })
+        return jsonify(service.analyze(request.get_json()))
+    except ServiceError as e:
+        return jsonify(e.payload()), e.status
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+@app.route('/api/analyze/batch', methods=['POST'])
+def analyze_risk_batch():
+    try:
+        items, parse_errors = read_json_items(request.get_data(), request.content_type)
+        return jsonify(service.analyze_batch(items, parse_errors))
+    except ServiceError as e:
+        return jsonify(e.payload()), e.status
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
-    app.run(host='0.0.0.0', port=port, debug=os.environ.get('DEBUG', 'False').lower() == 'true')
\ No newline at end of file
+    app.run(host='0.0.0.0', port=port, debug=os.environ.get('DEBUG', 'False').lower() == 'true')
@@ -0,0 +1,191 @@
+import asyncio
+import contextlib
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import wraps
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import HTMLResponse, Response, StreamingResponse
+from starlette.routing import Route
+from risk_service import ServiceError, create_service, dumps, loads, read_json_items, score_batch
+
+# asyncio entry point for the risk API: the same routes and RiskService as the Flask app in
+# app.py, for serving many slow or concurrent clients from one process:
+#   uvicorn asgi:app --host 0.0.0.0 --port 5000 --workers 4
+# Calls into an SQL DBManager run in a thread so they don't block the event loop, and batch
+# scoring runs in SCORING_EXECUTOR ("process" or "thread") with SCORING_WORKERS workers.
+
+service = create_service()
+# batches smaller than this are scored inline; shipping them to a worker costs more
+OFFLOAD_MIN_ROWS = 64
+# request bodies larger than this are parsed in a thread
+OFFLOAD_MIN_BYTES = 64 * 1024
+_executor = None
+
+
+def _scoring_executor():
+    global _executor
+    if _executor is None:
+        workers = int(os.environ.get('SCORING_WORKERS', os.cpu_count() or 1))
+        if os.environ.get('SCORING_EXECUTOR', 'process') == 'thread':
+            _executor = ThreadPoolExecutor(workers)
+        else:
+            # spawn rather than fork: the event loop and its thread pool are already running
+            _executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'))
+    return _executor
+
+
+async def _score(rows):
+    if len(rows) < OFFLOAD_MIN_ROWS:
+        return service.risk_analyzer.analyze_batch(rows)
+    return await asyncio.get_running_loop().run_in_executor(_scoring_executor(), score_batch, rows)
+
+
+async def _db(fn, *args):
+    # DBManager calls take microseconds and run inline; SQLDBManager ones wait on the database
+    if service.db_manager.blocking:
+        return await run_in_threadpool(fn, *args)
+    return fn(*args)
+
+
+async def _json_items(request):
+    body = await request.body()
+    if len(body) >= OFFLOAD_MIN_BYTES:
+        return await run_in_threadpool(read_json_items, body, request.headers.get('content-type'))
+    return read_json_items(body, request.headers.get('content-type'))
+
+
+def _json(payload, status=200):
+    return Response(dumps(payload), status_code=status, media_type='application/json')
+
+
+def _handles_errors(value_error_status=500):
+    # the same error responses as the Flask routes: ServiceError carries its own status, and
+    # routes that treat bad input as a client error map ValueError to 400
+    def decorate(handler):
+        @wraps(handler)
+        async def wrapper(request):
+            try:
+                return await handler(request)
+            except ServiceError as e:
+                return _json(e.payload(), e.status)
+            except ValueError as e:
+                return _json({"status": "error", "message": str(e)}, value_error_status)
+            except Exception as e:
+                return _json({"status": "error", "message": str(e)}, 500)
+        return wrapper
+    return decorate
+
+
+def _etag_matches(header, etag):
+    if not header:
+        return False
+    tags = [tag.strip() for tag in header.split(',')]
+    return '*' in tags or any(tag.removeprefix('W/').strip('"') == etag for tag in tags)
+
+
+async def _cached_json(request, key, version, build):
+    # answers If-None-Match with 304 and otherwise serves the body cached for this version
+    etag = service.etag(key, version)
+    headers = {'ETag': f'"{etag}"'}
+    if _etag_matches(request.headers.get('if-none-match'), etag):
+        return Response(status_code=304, headers=headers)
+    body = await _db(service.cached_body, key, version, build, dumps)
+    return Response(body, media_type='application/json', headers=headers)
+
+
+async def home(request):
+    return HTMLResponse("<h2>Risk Analysis API</h2><p>Visit <code>/health</code> to check API status or use Postman to test endpoints like <code>/api/analyze</code>.</p>")
+
+
+async def health_check(request):
+    return _json({"status": "healthy", "service": "risk-analysis-api"})
+
+
+@_handles_errors(value_error_status=400)
+async def get_all_risks(request):
+    args = request.query_params
+    export = service.export_format(args, request.headers.get('accept', ''))
+    if export is not None:
+        mimetype, chunks = await _db(service.export_risks, export, args)
+        # a plain iterator, which Starlette advances in its thread pool
+        return StreamingResponse(chunks, media_type=mimetype)
+    key, version, build = await _db(service.risk_list, args, request.scope['query_string'])
+    return await _cached_json(request, key, version, build)
+
+
+@_handles_errors()
+async def get_risk(request):
+    key, version, build = await _db(service.risk, request.path_params['risk_id'])
+    return await _cached_json(request, key, version, build)
+
+
+@_handles_errors()
+async def create_risk(request):
+    data = loads(await request.body())
+    return _json(await _db(service.create_risk, data), 201)
+
+
+@_handles_errors(value_error_status=400)
+async def create_risks_bulk(request):
+    items, errors = await _json_items(request)
+    factors = service.bulk_factors(items, errors)
+    result = await _score(factors)
+    return _json(await _db(service.create_risks_scored, items, errors, result), 201)
+
+
+@_handles_errors()
+async def cache_stats(request):
+    return _json(service.cache_stats())
+
+
+@_handles_errors()
+async def update_risk(request):
+    data = loads(await request.body())
+    return _json(await _db(service.update_risk, request.path_params['risk_id'], data))
+
+
+@_handles_errors()
+async def delete_risk(request):
+    return _json(await _db(service.delete_risk, request.path_params['risk_id']))
+
+
+@_handles_errors()
+async def analyze_risk(request):
+    return _json(service.analyze(loads(await request.body())))
+
+
+@_handles_errors(value_error_status=400)
+async def analyze_risk_batch(request):
+    items, parse_errors = await _json_items(request)
+    rows = service.batch_rows(items, parse_errors)
+    return _json(service.analyze_batch_scored(parse_errors, await _score(rows)))
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    yield
+    if _executor is not None:
+        _executor.shutdown(cancel_futures=True)
+    service.db_manager.close()
+
+
+app = Starlette(lifespan=lifespan, routes=[
+    Route('/', home),
+    Route('/health', health_check, methods=['GET']),
+    Route('/api/risks', get_all_risks, methods=['GET']),
+    Route('/api/risks', create_risk, methods=['POST']),
+    Route('/api/risks/bulk', create_risks_bulk, methods=['POST']),
+    Route('/api/risks/{risk_id:int}', get_risk, methods=['GET']),
+    Route('/api/risks/{risk_id:int}', update_risk, methods=['PUT']),
+    Route('/api/risks/{risk_id:int}', delete_risk, methods=['DELETE']),
+    Route('/api/cache/stats', cache_stats, methods=['GET']),
+    Route('/api/analyze', analyze_risk, methods=['POST']),
+    Route('/api/analyze/batch', analyze_risk_batch, methods=['POST']),
+])
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run("asgi:app", host='0.0.0.0', port=int(os.environ.get('PORT', 5000)),
+                workers=int(os.environ.get('WEB_CONCURRENCY', 1)))
@@ -0,0 +1,160 @@
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVERS = {
+    # gunicorn's default sync workers: one request per worker at a time, no keep-alive
+    "flask": lambda port, workers: [sys.executable, "-m", "gunicorn", "--workers", str(workers),
+                                    "--bind", f"127.0.0.1:{port}", "--log-level", "warning", "app:app"],
+    "asgi": lambda port, workers: [sys.executable, "-m", "uvicorn", "asgi:app", "--workers", str(workers),
+                                   "--port", str(port), "--log-level", "warning", "--no-access-log"],
+}
+FACTORS = {"technical_complexity": 7, "resource_availability": 5, "timeline_constraints": 6,
+           "budget_constraints": 4, "stakeholder_involvement": 3, "regulatory_compliance": 6}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1).read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("server did not start")
+
+
+def seed(port, count):
+    body = json.dumps([{"project_name": f"Project {i}", "risk_factors": FACTORS} for i in range(count)]).encode()
+    request = urllib.request.Request(f"http://127.0.0.1:{port}/api/risks/bulk", data=body,
+                                     headers={"Content-Type": "application/json"})
+    urllib.request.urlopen(request).read()
+
+
+async def read_response(reader):
+    # status line and headers, then a Content-Length or chunked body; returns (status, keep-alive)
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split()[1])
+    headers = {}
+    for line in lines[1:]:
+        if line:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+    if headers.get("transfer-encoding") == "chunked":
+        while True:
+            size = int((await reader.readuntil(b"\r\n")).strip(), 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    else:
+        await reader.readexactly(int(headers.get("content-length", 0)))
+    return status, headers.get("connection", "").lower() != "close"
+
+
+async def client(port, request, deadline, latencies, errors):
+    reader = writer = None
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(request)
+            status, keep_alive = await read_response(reader)
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            errors.append(1)
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+            await asyncio.sleep(0.01)
+            continue
+        latencies.append(time.perf_counter() - start)
+        if status >= 400:
+            errors.append(status)
+        if not keep_alive:
+            writer.close()
+            reader = writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def slow_client(port, path, deadline):
+    # sends its request one byte at a time, holding on to whatever serves it
+    request = f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode()
+    while time.perf_counter() < deadline:
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            for i in range(len(request)):
+                writer.write(request[i:i + 1])
+                await writer.drain()
+                await asyncio.sleep(0.1)
+            await read_response(reader)
+            writer.close()
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            await asyncio.sleep(0.1)
+
+
+async def load(port, path, connections, slow, duration):
+    request = f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode()
+    latencies, errors = [], []
+    deadline = time.perf_counter() + duration
+    tasks = [asyncio.create_task(slow_client(port, path, deadline)) for _ in range(slow)]
+    start = time.perf_counter()
+    tasks += [asyncio.create_task(client(port, request, deadline, latencies, errors)) for _ in range(connections)]
+    await asyncio.gather(*tasks)
+    return latencies, errors, time.perf_counter() - start
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else float("nan")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test: Flask under gunicorn sync workers vs the ASGI app under uvicorn")
+    parser.add_argument("--connections", type=int, default=1000, help="concurrent keep-alive connections")
+    parser.add_argument("--slow", type=int, default=0, help="extra clients that trickle their requests in")
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--workers", type=int, default=1, help="server processes for each app")
+    parser.add_argument("--db", choices=["memory", "sqlite"], default="memory",
+                        help="RISK_DB_BACKEND for the servers; with several workers use sqlite so they share the data")
+    parser.add_argument("--path", default="/api/risks/1")
+    parser.add_argument("--seed-count", type=int, default=1000)
+    parser.add_argument("--servers", default="flask,asgi")
+    args = parser.parse_args()
+    print(f"{args.connections} connections (+{args.slow} slow), {args.duration:.0f}s, {args.workers} worker(s), "
+          f"GET {args.path}, {os.cpu_count()} CPU(s) shared with the client")
+    for name in args.servers.split(","):
+        port = free_port()
+        with tempfile.TemporaryDirectory() as tmp:
+            env = {**os.environ, "RISK_DB_BACKEND": args.db, "RISK_DB_PATH": os.path.join(tmp, "risks.db")}
+            server = subprocess.Popen(SERVERS[name](port, args.workers), cwd=ROOT, env=env,
+                                      stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            try:
+                wait_ready(port)
+                seed(port, args.seed_count)
+                latencies, errors, elapsed = asyncio.run(load(port, args.path, args.connections, args.slow, args.duration))
+            finally:
+                server.terminate()
+                server.wait()
+        latencies.sort()
+        print(f"  {name:<6} {len(latencies) / elapsed:9.0f} req/s  p50 {percentile(latencies, 0.5) * 1000:8.1f} ms  "
+              f"p99 {percentile(latencies, 0.99) * 1000:8.1f} ms  errors {len(errors)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+from db_manager import DBManager, SQLDBManager, SQLiteDialect
+from risk_analyzer import RiskAnalyzer
+
+
+def make_rows(count, rng):
+    return [{"project_name": f"Project {i}", "description": "x" * 80,
+             "risk_factors": {factor: rng.randint(1, 10) for factor in RiskAnalyzer.WEIGHT_FACTORS}}
+            for i in range(count)]
+
+
+def single(client, rows):
+    for row in rows:
+        response = client.post("/api/risks", json=row)
+        assert response.status_code == 201, response.get_json()
+
+
+def bulk(client, rows, batch_size, ndjson):
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        if ndjson:
+            response = client.post("/api/risks/bulk", data="\n".join(json.dumps(row) for row in batch),
+                                   content_type="application/x-ndjson")
+        else:
+            response = client.post("/api/risks/bulk", json=batch)
+        assert response.status_code == 201, response.get_json()
+
+
+def timed(label, fn, count, baseline=None):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    line = f"  {label:<22} {count / elapsed:10.0f} rows/s  {elapsed:8.2f}s"
+    if baseline:
+        line += f"  {baseline / elapsed * count:6.1f}x single"
+    print(line)
+    return elapsed / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="POST /api/risks one row at a time vs POST /api/risks/bulk")
+    parser.add_argument("--count", type=int, default=50_000)
+    parser.add_argument("--single-count", type=int, default=5000, help="rows posted through the single-row endpoint")
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+    client = app.app.test_client()
+    with tempfile.TemporaryDirectory() as tmp:
+        managers = [("memory", DBManager), ("sqlite", lambda: SQLDBManager(SQLiteDialect(os.path.join(tmp, "risks.db"))))]
+        for name, factory in managers:
+            print(f"{name}: {args.single_count} single rows, {args.count} bulk rows in batches of {args.batch_size}")
+            app.service.db_manager = factory()
+            rows = make_rows(args.single_count, rng)
+            per_row = timed("single", lambda: single(client, rows), len(rows))
+            rows = make_rows(args.count, rng)
+            timed("bulk json", lambda: bulk(client, rows, args.batch_size, False), len(rows), per_row)
+            rows = make_rows(args.count, rng)
+            timed("bulk ndjson", lambda: bulk(client, rows, args.batch_size, True), len(rows), per_row)
+            app.service.db_manager.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_manager import DBManager, SQLDBManager, SQLiteDialect
+
+
+class ListDBManager:
+    # the original list-backed store, kept here as the baseline
+    def __init__(self):
+        self.risks = []
+        self.next_id = 1
+
+    def get_risk_by_id(self, risk_id):
+        for risk in self.risks:
+            if risk['id'] == risk_id:
+                return risk
+        return None
+
+    def create_risk(self, risk_data):
+        risk_data['id'] = self.next_id
+        self.next_id += 1
+        self.risks.append(risk_data)
+        return risk_data['id']
+
+    def update_risk(self, risk_id, updated_data):
+        for i, risk in enumerate(self.risks):
+            if risk['id'] == risk_id:
+                self.risks[i].update(updated_data)
+                return True
+        return False
+
+    def delete_risk(self, risk_id):
+        for i, risk in enumerate(self.risks):
+            if risk['id'] == risk_id:
+                del self.risks[i]
+                return True
+        return False
+
+
+def timed(label, fn, ops):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<8} {ops:>8} ops  {elapsed:9.3f}s  {elapsed / ops * 1e6:12.2f} us/op")
+
+
+def run(manager, size, ops, seed):
+    rng = random.Random(seed)
+    risk_factors = {"technical_complexity": 5, "resource_availability": 5}
+    timed("create", lambda: [manager.create_risk({"project_name": f"p{i}", "risk_factors": risk_factors, "risk_score": 50.0})
+                             for i in range(size)], size)
+    ids = [rng.randint(1, size) for _ in range(ops)]
+    timed("get", lambda: [manager.get_risk_by_id(i) for i in ids], ops)
+    timed("update", lambda: [manager.update_risk(i, {"risk_score": 60.0}) for i in ids], ops)
+    victims = rng.sample(range(1, size + 1), ops)
+    timed("delete", lambda: [manager.delete_risk(i) for i in victims], ops)
+
+
+def run_bulk(manager, size):
+    risk_factors = {"technical_complexity": 5, "resource_availability": 5}
+    timed("bulk", lambda: manager.create_risks([{"project_name": f"p{i}", "risk_factors": risk_factors, "risk_score": 50.0}
+                                                for i in range(size)]), size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the list-backed and id-indexed risk stores")
+    parser.add_argument("--size", type=int, default=1_000_000, help="number of stored assessments")
+    parser.add_argument("--ops", type=int, default=1000, help="random get/update/delete operations")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--sql-size", type=int, default=0,
+                        help="also run SQLDBManager on a temporary SQLite file with this many assessments")
+    args = parser.parse_args()
+    # the list baseline is O(n) per operation, so keep its op count small
+    baseline_ops = max(1, min(args.ops, 100))
+    print(f"list-backed store ({args.size} assessments)")
+    run(ListDBManager(), args.size, baseline_ops, args.seed)
+    print(f"DBManager ({args.size} assessments)")
+    run(DBManager(), args.size, args.ops, args.seed)
+    if args.sql_size:
+        with tempfile.TemporaryDirectory() as tmp:
+            print(f"SQLDBManager on SQLite ({args.sql_size} assessments)")
+            manager = SQLDBManager(SQLiteDialect(os.path.join(tmp, "risks.db")))
+            run(manager, args.sql_size, args.ops, args.seed)
+            run_bulk(manager, args.sql_size)
+            manager.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# each mode runs in a fresh interpreter so its peak RSS isn't hidden by an earlier run
+CHILD = """
+import json, resource, sys, time
+sys.path.insert(0, {root!r})
+import app
+import risk_service
+if not {use_orjson!r}:
+    risk_service.orjson = None
+factors = {{"technical_complexity": 5, "resource_availability": 6, "timeline_constraints": 7,
+            "budget_constraints": 4, "stakeholder_involvement": 3, "regulatory_compliance": 8}}
+app.db_manager.create_risks([{{"project_name": f"Project {{i}}", "description": "x" * 80,
+                               "risk_factors": factors, "risk_score": (i * 7) % 100 + 0.5}}
+                              for i in range({count!r})])
+client = app.app.test_client()
+before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+start = time.perf_counter()
+response = client.get({url!r}, buffered=False)
+first_byte = None
+size = 0
+for chunk in response.response:
+    if first_byte is None:
+        first_byte = time.perf_counter() - start
+    size += len(chunk)
+response.close()
+elapsed = time.perf_counter() - start
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{"seconds": elapsed, "first_byte": first_byte, "bytes": size, "peak_delta_kb": peak - before}}))
+"""
+
+MODES = [
+    ("jsonify", "/api/risks", False),
+    ("json stream", "/api/risks?export=json", False),
+    ("json stream+orjson", "/api/risks?export=json", True),
+    ("ndjson", "/api/risks?export=ndjson", False),
+    ("ndjson+orjson", "/api/risks?export=ndjson", True),
+]
+
+
+def run(url, count, use_orjson):
+    code = CHILD.format(root=ROOT, url=url, count=count, use_orjson=use_orjson)
+    output = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Full risk list: jsonify vs streamed JSON/NDJSON export")
+    parser.add_argument("--count", type=int, default=500_000, help="number of stored assessments")
+    args = parser.parse_args()
+    print(f"{args.count} assessments")
+    for label, url, use_orjson in MODES:
+        try:
+            import orjson  # noqa: F401
+        except ImportError:
+            if use_orjson:
+                continue
+        result = run(url, args.count, use_orjson)
+        print(f"  {label:<19} {result['seconds']:7.2f}s  {args.count / result['seconds']:10.0f} rows/s  "
+              f"first byte {result['first_byte'] * 1000:8.1f} ms  "
+              f"peak RSS +{result['peak_delta_kb'] / 1024:7.1f} MiB  {result['bytes'] / 2**20:7.1f} MiB out")
+
+
+if __name__ == '__main__':
+    main()
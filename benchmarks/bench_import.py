@@ -0,0 +1,87 @@
+import argparse
+import contextlib
+import csv
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bulk
+from database import Database
+from models import Policyholder, Claim
+
+POLICY_TYPES = ["Health", "Vehicle", "Life"]
+
+
+def write_files(tmp, policyholders, claims, rng):
+    ph_path = os.path.join(tmp, "policyholders.csv")
+    with open(ph_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(bulk.FIELDS["policyholders"])
+        for i in range(policyholders):
+            writer.writerow([f"P{i:07d}", f"Holder {i}", rng.randint(18, 100), rng.choice(POLICY_TYPES),
+                             rng.randrange(100000, 10000001, 100000), "2024-01-01"])
+    claims_path = os.path.join(tmp, "claims.ndjson")
+    with open(claims_path, "w") as f:
+        for i in range(claims):
+            f.write(json.dumps({"id": f"C{i:08d}", "policyholder_id": f"P{rng.randrange(policyholders):07d}",
+                                "amount": rng.randint(1000, 100000), "reason": "Historical claim",
+                                "status": rng.choice(bulk.CLAIM_STATUSES),
+                                "date": f"20{rng.randint(15, 24)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"}))
+            f.write("\n")
+    return ph_path, claims_path
+
+
+def open_db(data_dir, data_format):
+    # Database prints on construction
+    with contextlib.redirect_stdout(io.StringIO()):
+        return Database(data_dir, data_format=data_format)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Database.add_claim one at a time vs bulk.import_records")
+    parser.add_argument("--policyholders", type=int, default=10_000)
+    parser.add_argument("--claims", type=int, default=1_000_000)
+    parser.add_argument("--single", type=int, default=1000, help="claims added one at a time for the baseline")
+    parser.add_argument("--data-format", choices=["json", "ndjson", "snapshot"], default="ndjson")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        ph_path, claims_path = write_files(tmp, args.policyholders, args.claims, rng)
+
+        data_dir = os.path.join(tmp, "single")
+        os.makedirs(data_dir)
+        db = open_db(data_dir, args.data_format)
+        policyholder = Policyholder("Holder", 40, "Health", 10000000)
+        db.add_policyholder(policyholder)
+        start = time.perf_counter()
+        for _ in range(args.single):
+            db.add_claim(Claim(policyholder.id, 5000, "Historical claim", "Pending", "2024-01-01"))
+        elapsed = time.perf_counter() - start
+        print(f"  add_claim      {args.single:>9} claims  {elapsed:8.2f}s  {args.single / elapsed:10.0f} claims/s")
+
+        data_dir = os.path.join(tmp, "bulk")
+        os.makedirs(data_dir)
+        db = open_db(data_dir, args.data_format)
+        start = time.perf_counter()
+        with open(ph_path, newline="") as ph_file, open(claims_path) as claims_file:
+            summary = bulk.import_records(db, bulk.read_records(ph_file, "csv"), bulk.read_records(claims_file, "ndjson"))
+        elapsed = time.perf_counter() - start
+        print(f"  import_records {summary['claims']:>9} claims  {elapsed:8.2f}s  {summary['claims'] / elapsed:10.0f} claims/s"
+              f"  (+{summary['policyholders']} policyholders, saved once)")
+
+        start = time.perf_counter()
+        with open(os.path.join(tmp, "export.ndjson"), "w") as f:
+            count = bulk.export_records(db, "claims", f, "ndjson")
+        elapsed = time.perf_counter() - start
+        print(f"  export         {count:>9} claims  {elapsed:8.2f}s  {count / elapsed:10.0f} claims/s")
+
+
+if __name__ == '__main__':
+    main()
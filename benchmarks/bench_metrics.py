@@ -0,0 +1,62 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# each setting runs in a fresh interpreter, since METRICS_ENABLED is read when app.py is imported
+CHILD = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+import app
+factors = {{"technical_complexity": 5, "resource_availability": 6, "timeline_constraints": 7,
+            "budget_constraints": 4, "stakeholder_involvement": 3, "regulatory_compliance": 8}}
+client = app.app.test_client()
+client.post("/api/risks", json={{"project_name": "Project", "risk_factors": factors}})
+results = {{}}
+for label, call in (("GET /api/risks/1", lambda: client.get("/api/risks/1")),
+                    ("POST /api/analyze", lambda: client.post("/api/analyze", json={{"risk_factors": factors}}))):
+    for _ in range(500):
+        call()
+    # best of several rounds, to keep other load on the machine out of the comparison
+    best = float("inf")
+    for _ in range(5):
+        start = time.perf_counter()
+        for _ in range({requests!r} // 5):
+            call()
+        best = min(best, (time.perf_counter() - start) / ({requests!r} // 5))
+    results[label] = best
+best = float("inf")
+for _ in range(5):
+    start = time.perf_counter()
+    for _ in range({calls!r} // 5):
+        app.risk_analyzer.analyze_risk(factors)
+    best = min(best, (time.perf_counter() - start) / ({calls!r} // 5))
+results["analyze_risk call"] = best
+print(json.dumps(results))
+"""
+
+
+def run(enabled, requests, calls):
+    code = CHILD.format(root=ROOT, requests=requests, calls=calls)
+    env = {**os.environ, "METRICS_ENABLED": "true" if enabled else "false", "RISK_DB_BACKEND": "memory"}
+    output = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True, env=env).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cost of request metrics and spans: METRICS_ENABLED on vs off")
+    parser.add_argument("--requests", type=int, default=20000, help="requests per route, through the Flask test client")
+    parser.add_argument("--calls", type=int, default=1_000_000, help="direct analyze_risk calls")
+    args = parser.parse_args()
+    off = run(False, args.requests, args.calls)
+    on = run(True, args.requests, args.calls)
+    for label in off:
+        print(f"  {label:<20} off {off[label] * 1e6:8.2f} us  on {on[label] * 1e6:8.2f} us  "
+              f"({(on[label] - off[label]) * 1e6:+.2f} us)")
+
+
+if __name__ == '__main__':
+    main()
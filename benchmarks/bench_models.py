@@ -0,0 +1,87 @@
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import Claim, ordinal_to_date_string
+
+
+class DictClaim:
+    # the original dict-backed Claim with string dates, kept here as the baseline
+    def __init__(self, policyholder_id, amount, reason, status, date=None):
+        self.id = str(uuid.uuid4())[:8]
+        self.policyholder_id = policyholder_id
+        self.amount = amount
+        self.reason = reason
+        self.status = status
+        self.date = date if date else datetime.now().strftime("%Y-%m-%d")
+
+    @classmethod
+    def from_dict(cls, data):
+        claim = cls(data["policyholder_id"], data["amount"], data["reason"], data["status"], data["date"])
+        claim.id = data["id"]
+        return claim
+
+
+def make_records(count):
+    start = datetime(2020, 1, 1)
+    statuses = ["Approved", "Pending", "Rejected"]
+    return [{
+        "id": f"{i:08x}",
+        "policyholder_id": f"{i % 50000:08x}",
+        "amount": 1000 + (i * 37) % 500000,
+        "reason": "Medical Treatment",
+        "status": statuses[i % 3],
+        "date": (start + timedelta(days=i % 2000)).strftime("%Y-%m-%d"),
+    } for i in range(count)]
+
+
+def measure(label, cls, records):
+    gc.collect()
+    start = time.perf_counter()
+    claims = [cls.from_dict(record) for record in records]
+    load_time = time.perf_counter() - start
+    del claims
+    gc.collect()
+    # tracemalloc slows allocation down, so memory is measured on a separate pass
+    tracemalloc.start()
+    claims = [cls.from_dict(record) for record in records]
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    if cls is Claim:
+        months = {}
+        for claim in claims:
+            key = ordinal_to_date_string(claim.date_ordinal)[:7]
+            months[key] = months.get(key, 0) + 1
+    else:
+        months = {}
+        for claim in claims:
+            key = datetime.strptime(claim.date, "%Y-%m-%d").strftime("%Y-%m")
+            months[key] = months.get(key, 0) + 1
+    group_time = time.perf_counter() - start
+    print(f"{label:<12} load {load_time:7.2f}s  {memory / len(records):7.1f} B/claim  "
+          f"date grouping {group_time:7.2f}s")
+    return claims
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory and throughput of the claim model")
+    parser.add_argument("--count", type=int, default=1_000_000, help="number of claims")
+    args = parser.parse_args()
+    records = make_records(args.count)
+    print(f"{args.count} claims")
+    baseline = measure("dict/str", DictClaim, records)
+    del baseline
+    measure("slots/ord", Claim, records)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database
+from parallel_reports import ParallelReports
+from reports import ReportEngine
+from synthetic import SyntheticData
+
+REPORTS = ("claim_frequency", "high_risk_policyholders", "policy_type_summary", "monthly_totals",
+           "average_claim_by_policy_type", "top_claims")
+NOW = datetime(2025, 1, 1)
+
+
+def run_reports(engine):
+    # every report once, from cold; returns the total seconds and the results
+    results = {}
+    start = time.perf_counter()
+    for name in REPORTS:
+        report = getattr(engine, name)
+        results[name] = report(NOW) if name == "high_risk_policyholders" else report()
+    return time.perf_counter() - start, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Risk Analysis and Reports: serial aggregates vs the process pool")
+    parser.add_argument("--policyholders", type=int, default=200_000)
+    parser.add_argument("--claims", type=int, default=2_000_000)
+    parser.add_argument("--workers", default="2,4,8", help="comma-separated pool sizes to try")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as data_dir:
+        SyntheticData(args.policyholders, args.claims, seed=args.seed, end_date=NOW.date()).write(data_dir, "ndjson")
+        with contextlib.redirect_stdout(io.StringIO()):
+            db = Database(data_dir, data_format="ndjson", fsync=False)
+        elapsed, expected = run_reports(ReportEngine(db))
+        print(f"{args.claims} claims on {os.cpu_count()} CPUs")
+        print(f"  serial       {elapsed:8.3f}s")
+        for workers in (int(w) for w in args.workers.split(",")):
+            engine = ReportEngine(db, parallel=ParallelReports(workers=workers, min_claims=0))
+            try:
+                # the first pass also starts the pool, which a long-running app pays once
+                run_reports(engine)
+                db.version += 1
+                elapsed, results = run_reports(engine)
+            finally:
+                engine.close()
+            for name in REPORTS:
+                pd.testing.assert_frame_equal(expected[name], results[name])
+            print(f"  {workers:>2} workers   {elapsed:8.3f}s  (identical results)")
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from risk_analyzer import RiskAnalyzer
+
+
+class OriginalRiskAnalyzer(RiskAnalyzer):
+    # analyze_risk as it was before the score cache, kept here as the baseline
+    def analyze_risk(self, risk_factors):
+        if not risk_factors:
+            raise ValueError("Risk factors cannot be empty")
+        self._validate_risk_factors(risk_factors)
+        weighted_score = 0
+        for factor, weight in self.WEIGHT_FACTORS.items():
+            if factor in risk_factors:
+                weighted_score += (risk_factors[factor] / 10) * 100 * weight
+        return round(weighted_score, 2)
+
+
+def timed(label, analyzer, rows, stats=True):
+    start = time.perf_counter()
+    for row in rows:
+        analyzer.analyze_risk(row)
+    elapsed = time.perf_counter() - start
+    line = f"  {label:<10} {len(rows) / elapsed:12.0f} calls/s  {elapsed / len(rows) * 1e9:8.0f} ns/call"
+    if stats:
+        info = analyzer.score_cache_stats()
+        line += f"  hit rate {info['hit_rate']:6.1%}  fallbacks {info['fallbacks']}"
+    print(line)
+
+
+def main():
+    # test_risk_analyzer.py checks that every mode's scores are bit-identical to the original
+    parser = argparse.ArgumentParser(description="RiskAnalyzer score cache speed")
+    parser.add_argument("--calls", type=int, default=1_000_000)
+    parser.add_argument("--distinct", type=int, default=5000, help="distinct integer inputs in the workload")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+    factors = list(RiskAnalyzer.WEIGHT_FACTORS)
+
+    pool = [{factor: rng.randint(1, 10) for factor in factors} for _ in range(args.distinct)]
+    rows = [rng.choice(pool) for _ in range(args.calls)]
+    print(f"{args.calls} calls over {args.distinct} distinct integer inputs")
+    timed("original", OriginalRiskAnalyzer(score_cache='off'), rows, stats=False)
+    for mode in ('memo', 'table'):
+        analyzer = RiskAnalyzer(score_cache=mode)
+        analyzer.analyze_risk(pool[0])  # builds the table outside the timing
+        timed(mode, analyzer, rows)
+
+
+if __name__ == '__main__':
+    main()
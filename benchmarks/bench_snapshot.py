@@ -0,0 +1,77 @@
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from json_stream import write_object_items
+from snapshot import pack
+
+# run in a fresh interpreter so each measurement is a cold start
+CHILD = """
+import json, resource, sys, time
+sys.path.insert(0, {root!r})
+start = time.perf_counter()
+from database import Database
+db = Database({data_dir!r}, data_format={data_format!r})
+count = len(db.claims) + len(db.policyholders)
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, "records": count}}))
+"""
+
+
+def generate(data_dir, claims, policyholders, seed):
+    rng = random.Random(seed)
+    start = date(2020, 1, 1)
+    ph_ids = [f"{i:08x}" for i in range(policyholders)]
+    with open(os.path.join(data_dir, "policyholders.json"), "w") as f:
+        write_object_items(f, ((ph_id, {
+            "id": ph_id,
+            "name": f"Policyholder {i}",
+            "age": rng.randint(18, 90),
+            "policy_type": rng.choice(["Health", "Vehicle", "Life"]),
+            "sum_insured": rng.randrange(100000, 10000000, 100000),
+            "registration_date": (start + timedelta(days=rng.randint(0, 1500))).isoformat(),
+        }) for i, ph_id in enumerate(ph_ids)))
+    with open(os.path.join(data_dir, "claims.json"), "w") as f:
+        write_object_items(f, ((claim_id, {
+            "id": claim_id,
+            "policyholder_id": rng.choice(ph_ids),
+            "amount": rng.randint(1000, 500000),
+            "reason": rng.choice(["Medical Treatment", "Surgery", "Car Accident", "Critical Illness"]),
+            "status": rng.choice(["Approved", "Pending", "Rejected"]),
+            "date": (start + timedelta(days=rng.randint(0, 2000))).isoformat(),
+        }) for claim_id in (f"c{i:07x}" for i in range(claims))))
+
+
+def cold_start(data_dir, data_format):
+    code = CHILD.format(root=ROOT, data_dir=data_dir, data_format=data_format)
+    output = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start time and RSS: JSON load_data vs mapped snapshot")
+    parser.add_argument("--claims", type=int, default=1_000_000)
+    parser.add_argument("--policyholders", type=int, default=50_000)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as data_dir:
+        generate(data_dir, args.claims, args.policyholders, args.seed)
+        pack(data_dir, os.path.join(data_dir, "data.snap"))
+        for data_format in ("json", "snapshot"):
+            results = [cold_start(data_dir, data_format) for _ in range(args.runs)]
+            best = min(results, key=lambda r: r["seconds"])
+            print(f"{data_format:<9} {best['seconds']:8.3f}s  max RSS {best['max_rss_kb'] / 1024:8.1f} MiB  "
+                  f"({best['records']} records)")
+
+
+if __name__ == '__main__':
+    main()
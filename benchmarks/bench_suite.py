@@ -0,0 +1,322 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# the API section runs against the in-memory DBManager whatever the shell has set
+os.environ["RISK_DB_BACKEND"] = "memory"
+os.environ.setdefault("METRICS_ENABLED", "false")
+
+from database import Database
+from models import Claim, Policyholder
+from reports import ReportEngine
+from risk_analyzer import RiskAnalyzer
+from synthetic import SyntheticData
+
+# Times Database load/save and mutations, every ReportEngine computation behind the Risk
+# Analysis and Reports pages, and every API route, over seeded synthetic data, and writes the
+# results as JSON so two commits can be compared:
+#   python benchmarks/bench_suite.py run --claims 1000000 --output before.json
+#   python benchmarks/bench_suite.py compare before.json after.json
+# Every result is seconds per operation; "best" is what compare uses.
+
+SECTIONS = ("database", "reports", "api")
+REPORTS = ("claim_frequency", "high_risk_policyholders", "policy_type_summary", "monthly_totals",
+           "average_claim_by_policy_type", "top_claims", "pending_aging")
+
+
+def measure(fn, repeat=5, number=1, setup=None):
+    # best and median seconds per call over repeat rounds of number calls each
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        times.append((time.perf_counter() - start) / number)
+    return {"best": min(times), "median": statistics.median(times), "repeat": repeat, "number": number}
+
+
+def open_database(data_dir, data_format, journal):
+    # Database prints progress on construction, which would drown the results
+    with contextlib.redirect_stdout(io.StringIO()):
+        return Database(data_dir, data_format=data_format, journal=journal, fsync=False)
+
+
+def bench_database(results, data_dir, args):
+    def load():
+        open_database(data_dir, args.data_format, args.journal).close()
+    results["database.load_data"] = measure(load, repeat=args.repeat)
+
+    db = open_database(data_dir, args.data_format, args.journal)
+
+    def dirty():
+        db.backend.mark_dirty("policyholders")
+        db.backend.mark_dirty("claims")
+    results["database.save_data"] = measure(db.save_data, repeat=args.repeat, setup=dirty)
+
+    # the first sorted-index query builds the amount and pending-date indexes
+    results["database.build_sorted_indexes"] = measure(lambda: db.top_claims(10), repeat=1)
+    results["database.top_claims"] = measure(lambda: db.top_claims(10), repeat=args.repeat, number=100)
+    results["database.pending_claims"] = measure(lambda: db.pending_claims(100), repeat=args.repeat, number=100)
+    # the first date-range query builds the claim date index; then the last 30 days of claims,
+    # and report aggregates over the last year
+    results["database.build_date_index"] = measure(db.claim_date_range, repeat=1)
+    last = db.claim_date_range()[1].toordinal()
+    results["database.claims_between"] = measure(lambda: db.claims_between(last - 29, last),
+                                                 repeat=args.repeat, number=10)
+    results["database.aggregates_between"] = measure(lambda: db.aggregates_between(last - 364, last),
+                                                     repeat=args.repeat)
+
+    # each mutation is timed on its own, args.mutations times; in the default (non-journal)
+    # mode every one of them rewrites a data file
+    count = args.mutations
+    rng = random.Random(args.seed)
+    # update_claim_status and delete_claim take count claims each
+    claim_ids = rng.sample(sorted(db.claims.keys()), 2 * count)
+    policyholder_ids = rng.sample(sorted(db.policyholders.keys()), count)
+    added_policyholders = iter([Policyholder(f"Bench Holder {i}", 40, "Health", 500000) for i in range(count)])
+    added_claims = iter([Claim(policyholder_ids[i], 1000, "Surgery", "Pending", "2024-01-01") for i in range(count)])
+    new_ids = []
+    mutations = (
+        ("add_policyholder", lambda: new_ids.append(_add(db.add_policyholder, next(added_policyholders)))),
+        ("update_policyholder", lambda: db.update_policyholder(policyholder_ids.pop(), {"age": 50})),
+        ("delete_policyholder", lambda: db.delete_policyholder(new_ids.pop())),
+        ("add_claim", lambda: db.add_claim(next(added_claims))),
+        ("update_claim_status", lambda: db.update_claim_status(claim_ids.pop(), "Approved")),
+        ("delete_claim", lambda: db.delete_claim(claim_ids.pop())),
+    )
+    for name, mutate in mutations:
+        results[f"database.{name}"] = measure(mutate, repeat=count)
+    db.close()
+
+
+def _add(add, record):
+    add(record)
+    return record.id
+
+
+def bench_reports(results, data_dir, args):
+    db = open_database(data_dir, args.data_format, args.journal)
+    # a fresh engine per round, so nothing is answered from the engine's result cache
+    holder = {}
+
+    def fresh():
+        holder["engine"] = ReportEngine(db)
+    for name in REPORTS:
+        report = getattr(ReportEngine, name)
+        results[f"reports.{name}"] = measure(lambda: report(holder["engine"]), repeat=args.repeat, setup=fresh)
+    # the same reports limited to the last year's claims, as the date filter on the pages does
+    last = db.claim_date_range()[1].toordinal()
+    for name in REPORTS:
+        report = getattr(ReportEngine, name)
+        results[f"reports.{name}.last_year"] = measure(
+            lambda: report(holder["engine"], start=last - 364, end=last), repeat=args.repeat, setup=fresh)
+    db.close()
+
+
+def bench_api(results, args):
+    import app
+    from db_manager import DBManager
+
+    app.service.db_manager = DBManager()
+    app.service.response_cache.clear()
+    client = app.app.test_client()
+    rng = random.Random(args.seed)
+
+    def risk(i):
+        return {"project_name": f"Project {i}", "description": "x" * 80,
+                "risk_factors": {factor: rng.randint(1, 10) for factor in RiskAnalyzer.WEIGHT_FACTORS}}
+
+    for start in range(0, args.risks, 10000):
+        rows = [risk(i) for i in range(start, min(start + 10000, args.risks))]
+        _check(client.post("/api/risks/bulk", json=rows), 201)
+    ids = list(range(1, args.risks + 1))
+    batch = [risk(i) for i in range(100)]
+    full_list = client.get("/api/risks")
+    etag = full_list.headers["ETag"]
+    n = args.requests
+
+    def get(path, status=200, **kwargs):
+        return lambda: _check(client.get(path, **kwargs), status)
+
+    reads = (
+        ("GET /health", get("/health")),
+        ("GET /api/risks", get("/api/risks")),
+        ("GET /api/risks cold", get("/api/risks")),
+        ("GET /api/risks 304", get("/api/risks", 304, headers={"If-None-Match": etag})),
+        ("GET /api/risks?limit=100", get("/api/risks?limit=100")),
+        ("GET /api/risks?risk_level=medium&limit=100", get("/api/risks?risk_level=medium&limit=100")),
+        ("GET /api/risks?export=ndjson", lambda: _check(client.get("/api/risks?export=ndjson"), 200).get_data()),
+        ("GET /api/risks/<id>", lambda: _check(client.get(f"/api/risks/{rng.choice(ids)}"), 200)),
+        ("GET /api/cache/stats", get("/api/cache/stats")),
+        ("POST /api/analyze", lambda: _check(client.post("/api/analyze", json={"risk_factors": batch[0]["risk_factors"]}), 200)),
+        ("POST /api/analyze/batch (100 rows)", lambda: _check(client.post("/api/analyze/batch", json=batch), 200)),
+    )
+    # full-list and export responses cost O(risks), so they get fewer rounds
+    slow = {"GET /api/risks cold", "GET /api/risks?export=ndjson"}
+    for name, call in reads:
+        number = max(1, n // 50) if name in slow else n
+        setup = app.service.response_cache.clear if name == "GET /api/risks cold" else None
+        if setup is not None:
+            results[f"api.{name}"] = measure(call, repeat=number, setup=setup)
+        else:
+            results[f"api.{name}"] = measure(call, repeat=args.repeat, number=max(1, number // args.repeat))
+
+    created = []
+    writes = (
+        ("POST /api/risks", lambda: created.append(_check(client.post("/api/risks", json=risk(0)), 201).get_json()["risk_id"])),
+        ("PUT /api/risks/<id>", lambda: _check(client.put(f"/api/risks/{rng.choice(ids)}", json=risk(0)), 200)),
+        ("DELETE /api/risks/<id>", lambda: _check(client.delete(f"/api/risks/{created.pop()}"), 200)),
+        ("POST /api/risks/bulk (100 rows)", lambda: _check(client.post("/api/risks/bulk", json=batch), 201)),
+    )
+    for name, call in writes:
+        results[f"api.{name}"] = measure(call, repeat=args.repeat, number=max(1, n // args.repeat))
+
+
+def _check(response, status):
+    if response.status_code != status:
+        raise RuntimeError(f"{response.request.method} {response.request.path}: expected {status}, "
+                           f"got {response.status_code}: {response.get_data(as_text=True)[:200]}")
+    return response
+
+
+def git_revision():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True,
+                                check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                                    capture_output=True, text=True, check=True).stdout.strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+
+def run(args):
+    sections = args.sections.split(",") if args.sections else SECTIONS
+    unknown = set(sections) - set(SECTIONS)
+    if unknown:
+        raise SystemExit(f"unknown sections: {', '.join(sorted(unknown))}")
+    claims = args.claims if args.claims is not None else args.policyholders * 5
+    commit, dirty = git_revision()
+    report = {
+        "meta": {
+            "commit": commit,
+            "dirty": dirty,
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "policyholders": args.policyholders,
+            "claims": claims,
+            "seed": args.seed,
+            "data_format": args.data_format,
+            "journal": args.journal,
+            "risks": args.risks,
+        },
+        "results": {},
+    }
+    results = report["results"]
+    with tempfile.TemporaryDirectory() as data_dir:
+        if "database" in sections or "reports" in sections:
+            start = time.perf_counter()
+            # a fixed end date, so the same seed gives the same data on any day
+            SyntheticData(args.policyholders, claims, seed=args.seed,
+                          end_date=datetime(2025, 1, 1).date()).write(data_dir, args.data_format)
+            report["meta"]["generate_seconds"] = time.perf_counter() - start
+        for section in sections:
+            print(f"{section}...", file=sys.stderr)
+            if section == "database":
+                bench_database(results, data_dir, args)
+            elif section == "reports":
+                bench_reports(results, data_dir, args)
+            else:
+                bench_api(results, args)
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    for name, result in results.items():
+        print(f"  {name:<48} {_format_seconds(result['best']):>10}  (median {_format_seconds(result['median'])})",
+              file=sys.stderr)
+    if not args.output:
+        print(output)
+    return 0
+
+
+def compare(args):
+    # prints new/base for every benchmark both files have and exits 1 if any got slower than
+    # the threshold allows
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    for label, report in (("base", base), ("new", new)):
+        meta = report["meta"]
+        print(f"{label}: {meta.get('commit') or '?'}{' (dirty)' if meta.get('dirty') else ''}  "
+              f"{meta.get('policyholders')} policyholders, {meta.get('claims')} claims, {meta.get('risks')} risks")
+    regressions = 0
+    for name, result in new["results"].items():
+        before = base["results"].get(name)
+        if before is None:
+            print(f"  {name:<48} {_format_seconds(result['best']):>10}  (new)")
+            continue
+        ratio = result["best"] / before["best"] if before["best"] else float("inf")
+        flag = ""
+        if ratio > 1 + args.threshold:
+            flag = "  SLOWER"
+            regressions += 1
+        elif ratio < 1 - args.threshold:
+            flag = "  faster"
+        print(f"  {name:<48} {_format_seconds(before['best']):>10} -> {_format_seconds(result['best']):>10}  "
+              f"{ratio:6.2f}x{flag}")
+    return 1 if regressions else 0
+
+
+def _format_seconds(seconds):
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:.1f} us"
+    if seconds < 1:
+        return f"{seconds * 1e3:.2f} ms"
+    return f"{seconds:.3f} s"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark suite for Database, reports and the API")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    run_parser = subparsers.add_parser("run", help="run the benchmarks and write JSON results")
+    run_parser.add_argument("--policyholders", type=int, default=10000)
+    run_parser.add_argument("--claims", type=int, help="defaults to 5 per policyholder")
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--data-format", choices=["json", "ndjson", "snapshot"], default="json")
+    run_parser.add_argument("--journal", action="store_true", help="open the Database in journal mode")
+    run_parser.add_argument("--risks", type=int, default=10000, help="risks stored before timing the API")
+    run_parser.add_argument("--repeat", type=int, default=5, help="rounds per benchmark; the best one counts")
+    run_parser.add_argument("--mutations", type=int, default=10, help="timed calls per Database mutation")
+    run_parser.add_argument("--requests", type=int, default=500, help="requests per API route")
+    run_parser.add_argument("--sections", help=f"comma-separated subset of {','.join(SECTIONS)}")
+    run_parser.add_argument("--output", help="write the JSON here instead of stdout")
+    compare_parser = subparsers.add_parser("compare", help="compare two results files")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--threshold", type=float, default=0.10,
+                                help="relative change in best time that counts as a regression")
+    args = parser.parse_args()
+    return run(args) if args.command == "run" else compare(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
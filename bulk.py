@@ -0,0 +1,274 @@
+import argparse
+import csv
+import math
+import os
+import sys
+import uuid
+from datetime import date
+
+from json_stream import iter_ndjson, write_ndjson
+from models import Policyholder, Claim, date_string_to_ordinal, ordinal_to_date_string
+
+# Bulk import/export of policyholders and claims as CSV or NDJSON. An import reads each
+# file once, checks every claim against the policyholders already stored plus those in the
+# same import, and hands everything to Database.import_records, which persists once.
+
+FIELDS = {
+    "policyholders": ("id", "name", "age", "policy_type", "sum_insured", "registration_date"),
+    "claims": ("id", "policyholder_id", "amount", "reason", "status", "date"),
+}
+CLAIM_STATUSES = ("Pending", "Approved", "Rejected")
+FORMATS = ("csv", "ndjson")
+# how many error messages an import keeps; the count covers all of them
+MAX_REPORTED_ERRORS = 100
+
+
+class BulkImportError(ValueError):
+    def __init__(self, errors, error_count):
+        super().__init__(f"{error_count} invalid records, nothing was imported")
+        self.errors = errors
+        self.error_count = error_count
+
+
+def format_for(path, data_format=None):
+    if data_format:
+        return data_format
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        return "csv"
+    if extension in (".ndjson", ".jsonl"):
+        return "ndjson"
+    raise ValueError(f"Cannot tell the format of {path}, pass csv or ndjson explicitly")
+
+
+def read_records(fp, data_format):
+    # yields record dicts; CSV values arrive as strings and are converted while validating
+    if data_format == "csv":
+        yield from csv.DictReader(fp)
+    elif data_format == "ndjson":
+        yield from iter_ndjson(fp)
+    else:
+        raise ValueError(f"Unknown format: {data_format}")
+
+
+def import_records(db, policyholders=None, claims=None, skip_invalid=False):
+    # policyholders/claims are iterables of record dicts (see read_records); returns a summary
+    # and raises BulkImportError without touching db if anything is invalid, unless
+    # skip_invalid is set, in which case invalid records are left out and reported. An id
+    # that is already stored, or repeated within the import, is invalid: imports only add
+    errors = []
+    error_count = 0
+
+    def report(collection, number, message):
+        nonlocal error_count
+        error_count += 1
+        if len(errors) < MAX_REPORTED_ERRORS:
+            errors.append(f"{collection} record {number}: {message}")
+
+    # the one lookup claims need from a policyholder, for stored and imported ones alike
+    sum_insured = {record["id"]: record["sum_insured"] for record in db.iter_record_dicts("policyholders")}
+    new_policyholders = []
+    for number, record in enumerate(policyholders or (), 1):
+        try:
+            policyholder = _policyholder(record)
+        except ValueError as e:
+            report("policyholders", number, e)
+            continue
+        if policyholder.id in sum_insured:
+            report("policyholders", number, f"duplicate id {policyholder.id!r}")
+            continue
+        sum_insured[policyholder.id] = policyholder.sum_insured
+        new_policyholders.append(policyholder)
+    new_claims = []
+    claim_ids = set()
+    for number, record in enumerate(claims or (), 1):
+        try:
+            claim = _claim(record, sum_insured)
+        except ValueError as e:
+            report("claims", number, e)
+            continue
+        if claim.id in claim_ids or claim.id in db.claims:
+            report("claims", number, f"duplicate id {claim.id!r}")
+            continue
+        claim_ids.add(claim.id)
+        new_claims.append(claim)
+    if error_count and not skip_invalid:
+        raise BulkImportError(errors, error_count)
+    saved = db.import_records(new_policyholders, new_claims)
+    # with duplicates refused, every record handed over is a new one
+    return {
+        "policyholders": len(new_policyholders),
+        "claims": len(new_claims),
+        "skipped": error_count,
+        "errors": errors,
+        "saved": saved,
+    }
+
+
+def export_records(db, collection, fp, data_format):
+    # streams one collection to fp and returns the number of records written
+    count = 0
+
+    def counted(records):
+        nonlocal count
+        for record in records:
+            count += 1
+            yield record
+
+    records = counted(db.iter_record_dicts(collection))
+    if data_format == "csv":
+        writer = csv.DictWriter(fp, fieldnames=FIELDS[collection], extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(records)
+    elif data_format == "ndjson":
+        write_ndjson(fp, records)
+    else:
+        raise ValueError(f"Unknown format: {data_format}")
+    return count
+
+
+def _policyholder(record):
+    if not isinstance(record, dict):
+        raise ValueError("not an object")
+    name = _text(record, "name")
+    age = _number(record, "age")
+    if age != int(age):
+        raise ValueError(f"age must be a whole number, got {age!r}")
+    sum_insured = _number(record, "sum_insured")
+    if sum_insured <= 0:
+        raise ValueError(f"sum_insured must be positive, got {sum_insured!r}")
+    return Policyholder.from_dict({
+        "id": record.get("id") or str(uuid.uuid4())[:8],
+        "name": name,
+        "age": int(age),
+        "policy_type": _text(record, "policy_type"),
+        "sum_insured": sum_insured,
+        "registration_date": _date(record, "registration_date"),
+    })
+
+
+def _claim(record, sum_insured):
+    if not isinstance(record, dict):
+        raise ValueError("not an object")
+    policyholder_id = _text(record, "policyholder_id")
+    if policyholder_id not in sum_insured:
+        raise ValueError(f"unknown policyholder {policyholder_id!r}")
+    amount = _number(record, "amount")
+    if amount <= 0:
+        raise ValueError(f"amount must be positive, got {amount!r}")
+    # the same limit the claim form in main.py enforces
+    if amount > sum_insured[policyholder_id]:
+        raise ValueError(f"amount {amount!r} exceeds the sum insured ({sum_insured[policyholder_id]!r})")
+    status = _text(record, "status")
+    if status not in CLAIM_STATUSES:
+        raise ValueError(f"status must be one of {', '.join(CLAIM_STATUSES)}, got {status!r}")
+    return Claim.from_dict({
+        "id": record.get("id") or str(uuid.uuid4())[:8],
+        "policyholder_id": policyholder_id,
+        "amount": amount,
+        "reason": _text(record, "reason"),
+        "status": status,
+        "date": _date(record, "date"),
+    })
+
+
+def _text(record, field):
+    value = record.get(field)
+    if not isinstance(value, str) or not value.strip():
+        raise ValueError(f"{field} is required")
+    return value
+
+
+def _number(record, field):
+    value = record.get(field)
+    if isinstance(value, str):
+        # CSV: keep whole numbers as ints, like the forms in main.py produce
+        try:
+            value = int(value)
+        except ValueError:
+            try:
+                value = float(value)
+            except ValueError:
+                raise ValueError(f"{field} must be a number, got {value!r}") from None
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise ValueError(f"{field} must be a number, got {value!r}")
+    return value
+
+
+def _date(record, field):
+    # missing dates default to today, as they do for new records in the app
+    value = record.get(field)
+    if not value:
+        return date.today().isoformat()
+    try:
+        return ordinal_to_date_string(date_string_to_ordinal(value))
+    except (TypeError, ValueError):
+        raise ValueError(f"{field} must be a YYYY-MM-DD date, got {value!r}") from None
+
+
+def _open_database(args):
+    from database import Database
+    if args.sqlite:
+        from storage import SQLiteBackend
+        return Database(backend=SQLiteBackend(args.sqlite))
+    return Database(args.data_dir, data_format=args.data_format, journal=args.journal)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import/export of policyholders and claims (CSV or NDJSON)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for command, help_text in (("import", "load records into the database"), ("export", "write records out")):
+        sub = subparsers.add_parser(command, help=help_text)
+        sub.add_argument("--policyholders", help="policyholders file")
+        sub.add_argument("--claims", help="claims file")
+        sub.add_argument("--format", choices=FORMATS, help="defaults to the file extension")
+        sub.add_argument("--data-dir", default="./data")
+        sub.add_argument("--data-format", choices=["json", "ndjson", "snapshot"], default="json")
+        sub.add_argument("--journal", action="store_true")
+        sub.add_argument("--sqlite", metavar="PATH", help="use the SQLite backend at PATH instead of data-dir")
+        if command == "import":
+            sub.add_argument("--skip-invalid", action="store_true", help="import the valid records and report the rest")
+    args = parser.parse_args()
+    if not args.policyholders and not args.claims:
+        parser.error("pass --policyholders and/or --claims")
+    db = _open_database(args)
+    try:
+        if args.command == "export":
+            for collection in ("policyholders", "claims"):
+                path = getattr(args, collection)
+                if path:
+                    with open(path, "w", newline="") as fp:
+                        count = export_records(db, collection, fp, format_for(path, args.format))
+                    print(f"exported {count} {collection} to {path}")
+            return 0
+        files = {}
+        try:
+            for collection in ("policyholders", "claims"):
+                path = getattr(args, collection)
+                if path:
+                    files[collection] = open(path, "r", newline="")
+            summary = import_records(
+                db,
+                read_records(files["policyholders"], format_for(args.policyholders, args.format))
+                if "policyholders" in files else None,
+                read_records(files["claims"], format_for(args.claims, args.format)) if "claims" in files else None,
+                skip_invalid=args.skip_invalid,
+            )
+        except BulkImportError as e:
+            print("\n".join(e.errors), file=sys.stderr)
+            print(e, file=sys.stderr)
+            return 1
+        finally:
+            for fp in files.values():
+                fp.close()
+        for message in summary["errors"]:
+            print(message, file=sys.stderr)
+        print(f"imported {summary['policyholders']} policyholders and {summary['claims']} claims, "
+              f"skipped {summary['skipped']}")
+        return 0 if summary["saved"] else 1
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
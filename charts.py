@@ -0,0 +1,99 @@
+import io
+import threading
+import matplotlib.pyplot as plt
+import seaborn as sns
+from reports import _window
+from response_cache import ResponseCache
+
+# PNG renderings of the Risk Analysis and Reports charts. Each image is kept for the
+# Database.version it was drawn from, so reruns that change nothing reuse it instead of
+# building a new matplotlib figure; figures are closed as soon as they are saved.
+
+# the resolution st.pyplot renders at
+DPI = 200
+# pyplot keeps global state, so sessions take turns drawing
+_render_lock = threading.Lock()
+
+
+class ReportCharts:
+    def __init__(self, reports, max_bytes=32 * 1024 * 1024, dpi=DPI):
+        self.reports = reports
+        self.dpi = dpi
+        # (chart, parameters) -> PNG bytes, least recently used evicted past max_bytes; the
+        # parameters are the claim date range the chart covers, normalized as ReportEngine
+        # keys its results, so a date and its "%Y-%m-%d" string share one image
+        self.images = ResponseCache(max_bytes)
+
+    def claim_frequency(self, start=None, end=None):
+        return self._image("claim_frequency", _window(start, end), self._draw_claim_frequency)
+
+    def policy_type_pies(self, start=None, end=None):
+        return self._image("policy_type_pies", _window(start, end), self._draw_policy_type_pies)
+
+    def monthly_totals(self, start=None, end=None):
+        return self._image("monthly_totals", _window(start, end), self._draw_monthly_totals)
+
+    def average_claim_by_policy_type(self, start=None, end=None):
+        return self._image("average_claim_by_policy_type", _window(start, end), self._draw_average_claim_by_policy_type)
+
+    def stats(self):
+        return self.images.stats()
+
+    def _image(self, chart, params, draw):
+        key = (chart, params, self.dpi)
+        # read before drawing, so a change made meanwhile leaves this image stale rather
+        # than tagged with the newer version
+        version = self.reports.db.version
+        png = self.images.get(key, version)
+        if png is None:
+            png = self._render(draw, *params)
+            self.images.put(key, version, png)
+        return png
+
+    def _render(self, draw, *params):
+        with _render_lock:
+            fig = draw(*params)
+            try:
+                buffer = io.BytesIO()
+                fig.savefig(buffer, format="png", dpi=self.dpi, bbox_inches="tight")
+                return buffer.getvalue()
+            finally:
+                plt.close(fig)
+
+    def _draw_claim_frequency(self, start, end):
+        df_freq = self.reports.claim_frequency(start, end)
+        fig, ax = plt.subplots(figsize=(10, 6))
+        sns.barplot(x='Policyholder', y='Number of Claims', data=df_freq, ax=ax)
+        plt.setp(ax.get_xticklabels(), rotation=45, ha='right')
+        fig.tight_layout()
+        return fig
+
+    def _draw_policy_type_pies(self, start, end):
+        df_policy = self.reports.policy_type_summary(start, end)
+        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(12, 6))
+        labels = df_policy["Policy Type"].tolist()
+        ax1.pie(df_policy["Total Claims"].tolist(), labels=labels, autopct='%1.1f%%', startangle=90)
+        ax1.set_title('Claims Count by Policy Type')
+        ax2.pie(df_policy["Total Amount Value"].tolist(), labels=labels, autopct='%1.1f%%', startangle=90)
+        ax2.set_title('Claims Amount by Policy Type')
+        fig.tight_layout()
+        return fig
+
+    def _draw_monthly_totals(self, start, end):
+        df_monthly = self.reports.monthly_totals(start, end)
+        fig, ax = plt.subplots(figsize=(10, 6))
+        sns.barplot(x=df_monthly["Month"].tolist(), y=df_monthly["Number of Claims"].tolist(), ax=ax)
+        plt.setp(ax.get_xticklabels(), rotation=45, ha='right')
+        ax.set_ylabel("Number of Claims")
+        ax.set_title("Claims per Month")
+        fig.tight_layout()
+        return fig
+
+    def _draw_average_claim_by_policy_type(self, start, end):
+        df_avg = self.reports.average_claim_by_policy_type(start, end)
+        fig, ax = plt.subplots(figsize=(10, 6))
+        sns.barplot(x="Policy Type", y="Average Claim Amount", data=df_avg, ax=ax)
+        ax.set_ylabel("Average Claim Amount ($)")
+        ax.set_title("Average Claim Amount by Policy Type")
+        fig.tight_layout()
+        return fig
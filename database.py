@@ -1,101 +1,486 @@
-import json
-import os
-from models import Policyholder, Claim
+import heapq
+import threading
+from datetime import date
+from models import Policyholder, Claim, day_ordinal
+from indexes import Index, SortedIndex
+from aggregates import ClaimAggregates
+from storage import FileBackend
+
+PENDING = "Pending"
 
 class Database:
-    def __init__(self, data_dir="./data"):
+    def __init__(self, data_dir="./data", journal=False, compact_threshold=10000, fsync=True,
+                 data_format="json", lazy=False, backend=None):
         print("Using OUR Database class!")
         print("Running Database.__init__")
         print("Policyholders before init:", hasattr(self, 'policyholders'))
-        self.policyholders = {}  # policyholders by ID
-        self.claims = {}  # claims by ID
+        # where records are kept and persisted, see storage.py; the default mirrors
+        # everything in memory to the files in data_dir
+        if backend is None:
+            backend = FileBackend(data_dir, data_format=data_format, journal=journal,
+                                  compact_threshold=compact_threshold, fsync=fsync, lazy=lazy)
+        self.backend = backend
         self.data_dir = data_dir
-        if not os.path.exists(data_dir):
-            os.makedirs(data_dir)
+        self.policyholders = backend.records("policyholders")  # policyholders by ID
+        self.claims = backend.records("claims")  # claims by ID
+        # secondary indexes, kept in step with every add/update/delete once built
+        self._claims_by_policyholder = Index()
+        self._claims_by_status = Index()
+        self._policyholders_by_type = Index()
+        # (-amount, claim id) and, for pending claims only, (date ordinal, claim id), for the
+        # Highest Claims and Pending Claims reports; built on the first such query
+        self._claims_by_amount = None
+        self._pending_by_date = None
+        # (date ordinal, claim id) for every claim, for date-range queries; built on the first one
+        self._claims_by_date = None
+        # running report aggregates, see aggregates.ClaimAggregates
+        self._aggregates = ClaimAggregates()
+        # indexes and aggregates are built after loading (or on first use in lazy mode);
+        # backends that answer queries themselves never need them
+        self._indexed = False
+        # bumped on every change to the data, so caches can key on it
+        self.version = 0
+        # one instance may be shared by several Streamlit sessions / threads
+        self._lock = threading.RLock()
         self.load_data()
-    
+
     def add_policyholder(self, policyholder):
-        self.policyholders[policyholder.id] = policyholder
-        self.save_data()
-    
+        with self._lock:
+            self._put_policyholder(policyholder)
+            self._commit("put_policyholder", data=policyholder.to_dict())
+
     def update_policyholder(self, policyholder_id, updated_data):
-        if policyholder_id in self.policyholders:
-            policyholder = self.policyholders[policyholder_id]
-            for key, value in updated_data.items():
-                if hasattr(policyholder, key):
-                    setattr(policyholder, key, value)    
-            self.save_data()
-            return True
-        return False
-    
-    def delete_policyholder(self, policyholder_id):
-        if policyholder_id in self.policyholders:
-            # exisiting claims
-            has_claims = any(claim.policyholder_id == policyholder_id for claim in self.claims.values())
-            if not has_claims:
-                del self.policyholders[policyholder_id]
-                self.save_data()
+        with self._lock:
+            if policyholder_id in self.policyholders:
+                policyholder = self.policyholders[policyholder_id]
+                old_policy_type = policyholder.policy_type
+                for key, value in updated_data.items():
+                    if hasattr(policyholder, key):
+                        setattr(policyholder, key, value)
+                # a no-op for dicts, a write for backends that don't hold the object itself
+                self.policyholders[policyholder_id] = policyholder
+                if self._indexed:
+                    self._policyholders_by_type.remove(old_policy_type, policyholder_id)
+                    self._policyholders_by_type.add(policyholder.policy_type, policyholder_id)
+                    self._retag_claims(policyholder_id, old_policy_type, policyholder.policy_type)
+                self._mark_dirty("policyholders")
+                self._commit("put_policyholder", data=policyholder.to_dict())
                 return True
-            else:
-                return False
-        return False
-    
+            return False
+
+    def delete_policyholder(self, policyholder_id):
+        with self._lock:
+            if policyholder_id in self.policyholders:
+                # exisiting claims
+                if not self.has_claims(policyholder_id):
+                    self._remove_policyholder(policyholder_id)
+                    self._commit("delete_policyholder", id=policyholder_id)
+                    return True
+                else:
+                    return False
+            return False
+
     def add_claim(self, claim):
-        if claim.policyholder_id in self.policyholders:
-            self.claims[claim.id] = claim
-            self.save_data()
-            return True
-        return False
-    
+        with self._lock:
+            if claim.policyholder_id in self.policyholders:
+                self._put_claim(claim)
+                self._commit("put_claim", data=claim.to_dict())
+                return True
+            return False
+
     def update_claim_status(self, claim_id, new_status):
-        if claim_id in self.claims:
-            self.claims[claim_id].status = new_status
-            self.save_data()
-            return True
-        return False
-    
+        with self._lock:
+            if claim_id in self.claims:
+                claim = self.claims[claim_id]
+                if self._indexed:
+                    policy_type = self._policy_type_of(claim)
+                    self._claims_by_status.remove(claim.status, claim_id)
+                    self._aggregates.remove(claim, policy_type)
+                    self._unsort_claim(claim)
+                claim.status = new_status
+                self.claims[claim_id] = claim
+                if self._indexed:
+                    self._claims_by_status.add(new_status, claim_id)
+                    self._aggregates.add(claim, policy_type)
+                    self._sort_claim(claim)
+                self._mark_dirty("claims")
+                self._commit("put_claim", data=claim.to_dict())
+                return True
+            return False
+
     def delete_claim(self, claim_id):
-        if claim_id in self.claims:
-            del self.claims[claim_id]
-            self.save_data()
-            return True
-        return False
-    
-    def save_data(self):
-        try:
-            policyholder_data = {
-                ph_id: ph.to_dict() for ph_id, ph in self.policyholders.items()
-            }
-            with open(os.path.join(self.data_dir, "policyholders.json"), "w") as f:
-                json.dump(policyholder_data, f, indent=4)
-            claim_data = {
-                claim_id: claim.to_dict() for claim_id, claim in self.claims.items()
-            }
-            with open(os.path.join(self.data_dir, "claims.json"), "w") as f:
-                json.dump(claim_data, f, indent=4)    
-            return True
-        except Exception as e:
-            print(f"Error saving data: {e}")
+        with self._lock:
+            if claim_id in self.claims:
+                self._remove_claim(claim_id)
+                self._commit("delete_claim", id=claim_id)
+                return True
             return False
-    
+
+    def import_records(self, policyholders=(), claims=()):
+        # bulk load: records are applied as add_policyholder/add_claim would apply them, but
+        # the backend persists once at the end instead of once per record; callers check
+        # referential integrity first (see bulk.py)
+        with self._lock:
+            if self.backend.pushdown:
+                self.policyholders.put_many(policyholders)
+                self.claims.put_many(claims)
+                self._mark_dirty("policyholders")
+                self._mark_dirty("claims")
+            else:
+                for policyholder in policyholders:
+                    self._put_policyholder(policyholder)
+                for claim in claims:
+                    self._put_claim(claim)
+            return self.backend.save(self)
+
+    def iter_record_dicts(self, collection):
+        # every record of "policyholders" or "claims" as a dict, without building models for
+        # records a lazy or snapshot backend still holds raw
+        records = getattr(self, collection)
+        if hasattr(records, "raw_items"):
+            for _, record in records.raw_items():
+                yield record
+        else:
+            for record in records.values():
+                yield record.to_dict()
+
+    def save_data(self):
+        with self._lock:
+            return self.backend.save(self)
+
+    def compact(self):
+        return self.save_data()
+
+    def flush(self):
+        # write whatever the backend still holds back (nothing in journal mode)
+        with self._lock:
+            return self.backend.flush(self)
+
+    def is_dirty(self):
+        return self.backend.is_dirty()
+
     def load_data(self):
-        try:
-            ph_file = os.path.join(self.data_dir, "policyholders.json")
-            if os.path.exists(ph_file):
-                with open(ph_file, "r") as f:
-                    policyholder_data = json.load(f)
-                    for ph_id, ph_dict in policyholder_data.items():
-                        self.policyholders[ph_id] = Policyholder.from_dict(ph_dict)
-            claims_file = os.path.join(self.data_dir, "claims.json")
-            if os.path.exists(claims_file):
-                with open(claims_file, "r") as f:
-                    claim_data = json.load(f)
-                    for claim_id, claim_dict in claim_data.items():
-                        self.claims[claim_id] = Claim.from_dict(claim_dict)                
+        with self._lock:
+            try:
+                self.backend.load(self)
+                if not self.backend.lazy:
+                    self._build_indexes()
+                return True
+            except Exception as e:
+                print(f"Error loading data: {e}")
+                return False
+
+    def reload_if_changed(self):
+        # pick up changes another process made to the underlying storage
+        with self._lock:
+            if not self.backend.changed_on_disk():
+                return False
+            if not self.backend.pushdown:
+                self.backend.close()
+                self.policyholders.clear()
+                self.claims.clear()
+                self._claims_by_policyholder.clear()
+                self._claims_by_status.clear()
+                self._policyholders_by_type.clear()
+                self._aggregates.clear()
+                self._claims_by_amount = None
+                self._pending_by_date = None
+                self._claims_by_date = None
+                self._indexed = False
+                self.load_data()
+            self.version += 1
             return True
-        except Exception as e:
-            print(f"Error loading data: {e}")
-            return False
-            
+
     def get_claims_for_policyholder(self, policyholder_id):
-        return [claim for claim in self.claims.values() if claim.policyholder_id == policyholder_id]
\ No newline at end of file
+        with self._lock:
+            if self.backend.pushdown:
+                return self.backend.get_claims_for_policyholder(policyholder_id)
+            self._ensure_indexed()
+            return [self.claims[claim_id] for claim_id in self._claims_by_policyholder.get(policyholder_id)]
+
+    def count_claims_for_policyholder(self, policyholder_id):
+        with self._lock:
+            if self.backend.pushdown:
+                return self.backend.count_claims_for_policyholder(policyholder_id)
+            self._ensure_indexed()
+            return self._claims_by_policyholder.count(policyholder_id)
+
+    def has_claims(self, policyholder_id):
+        with self._lock:
+            if self.backend.pushdown:
+                return self.backend.has_claims(policyholder_id)
+            self._ensure_indexed()
+            return self._claims_by_policyholder.count(policyholder_id) > 0
+
+    def get_claims_by_status(self, status):
+        with self._lock:
+            if self.backend.pushdown:
+                return self.backend.get_claims_by_status(status)
+            self._ensure_indexed()
+            return [self.claims[claim_id] for claim_id in self._claims_by_status.get(status)]
+
+    def count_claims_by_status(self, status):
+        with self._lock:
+            if self.backend.pushdown:
+                return self.backend.count_claims_by_status(status)
+            self._ensure_indexed()
+            return self._claims_by_status.count(status)
+
+    def get_policy_types(self):
+        with self._lock:
+            if self.backend.pushdown:
+                return self.backend.get_policy_types()
+            self._ensure_indexed()
+            return list(self._policyholders_by_type.keys())
+
+    def get_policyholders_by_type(self, policy_type):
+        with self._lock:
+            if self.backend.pushdown:
+                return self.backend.get_policyholders_by_type(policy_type)
+            self._ensure_indexed()
+            return [self.policyholders[ph_id] for ph_id in self._policyholders_by_type.get(policy_type)]
+
+    def get_claims_by_policy_type(self, policy_type):
+        with self._lock:
+            if self.backend.pushdown:
+                return self.backend.get_claims_by_policy_type(policy_type)
+            self._ensure_indexed()
+            return [
+                self.claims[claim_id]
+                for ph_id in self._policyholders_by_type.get(policy_type)
+                for claim_id in self._claims_by_policyholder.get(ph_id)
+            ]
+
+    def claims_between(self, start=None, end=None):
+        # claims dated from start to end, both included, oldest first and by claim id among
+        # claims of the same day; start and end are dates, "%Y-%m-%d" strings or day ordinals,
+        # and None leaves that side open. O(log C + m) for m matching claims
+        start, end = _day_range(start, end)
+        with self._lock:
+            if self.backend.pushdown:
+                return self.backend.claims_between(start, end)
+            self._ensure_dated()
+            claims = self.claims
+            return [claims[key[1]] for key in _keys_between(self._claims_by_date, start, end)]
+
+    def claim_date_range(self):
+        # the first and last claim dates as dates, or None without claims
+        with self._lock:
+            if self.backend.pushdown:
+                bounds = self.backend.claim_date_range()
+            else:
+                self._ensure_dated()
+                first, last = self._claims_by_date.first(), self._claims_by_date.last()
+                bounds = (first[0], last[0]) if first else None
+            return tuple(date.fromordinal(ordinal) for ordinal in bounds) if bounds else None
+
+    def aggregates_between(self, start=None, end=None):
+        # the report aggregates over claims_between(start, end) only, computed in O(m); the
+        # whole range is the running Database.aggregates
+        start, end = _day_range(start, end)
+        with self._lock:
+            if start is None and end is None:
+                return self.aggregates
+            if self.backend.pushdown:
+                return self.backend.aggregates_between(start, end)
+            self._ensure_dated()
+            aggregates = ClaimAggregates()
+            for key in _keys_between(self._claims_by_date, start, end):
+                claim = self.claims[key[1]]
+                aggregates.add(claim, self._policy_type_of(claim))
+            return aggregates
+
+    def top_claims(self, n=10, start=None, end=None):
+        # the n largest claims whose policyholder still exists, largest first and by claim id
+        # among equal amounts; O(n log C) once the amount index is built. Limited to a date
+        # range, the range's claims are ranked instead, in O(m log n)
+        start, end = _day_range(start, end)
+        with self._lock:
+            if self.backend.pushdown:
+                return self.backend.top_claims(n, start, end)
+            if start is None and end is None:
+                self._ensure_sorted()
+                return self._claims_in_order(self._claims_by_amount, n)
+            self._ensure_dated()
+            claims = (self.claims[key[1]] for key in _keys_between(self._claims_by_date, start, end))
+            return heapq.nsmallest(n, (claim for claim in claims if claim.policyholder_id in self.policyholders),
+                                   key=lambda claim: (-claim.amount, claim.id))
+
+    def pending_claims(self, limit=None, start=None, end=None):
+        # pending claims whose policyholder still exists, oldest first and by claim id among
+        # claims of the same day; all of them, or the first `limit`, optionally dated from
+        # start to end like claims_between
+        start, end = _day_range(start, end)
+        with self._lock:
+            if self.backend.pushdown:
+                return self.backend.pending_claims(limit, start, end)
+            self._ensure_sorted()
+            return self._claims_in_order(_keys_between(self._pending_by_date, start, end), limit)
+
+    @property
+    def aggregates(self):
+        with self._lock:
+            if self.backend.pushdown:
+                return self.backend.aggregates
+            self._ensure_indexed()
+            return self._aggregates
+
+    def policy_type_order(self):
+        # the order aggregates.policy_type_totals() lists policy types in, or None before the
+        # running aggregates are built, when they will follow the claims' own order. Built
+        # aggregates keep a policy type where it was first added, even after the claims that
+        # put it there are deleted.
+        with self._lock:
+            if self.backend.pushdown or not self._indexed:
+                return None
+            return [policy_type for policy_type, _, _ in self._aggregates.policy_type_totals()]
+
+    def verify_aggregates(self):
+        with self._lock:
+            return self.aggregates.verify(self)
+
+    def close(self):
+        self.backend.close()
+
+    def _commit(self, op, **payload):
+        return self.backend.commit(self, op, payload)
+
+    def _apply(self, record):
+        # replay is idempotent, so a journal applied on top of a newer snapshot is harmless
+        op = record["op"]
+        if op == "put_policyholder":
+            self._put_policyholder(Policyholder.from_dict(record["data"]))
+        elif op == "delete_policyholder":
+            self._remove_policyholder(record["id"])
+        elif op == "put_claim":
+            self._put_claim(Claim.from_dict(record["data"]))
+        elif op == "delete_claim":
+            self._remove_claim(record["id"])
+        else:
+            raise ValueError(f"Unknown journal operation: {op}")
+
+    def _ensure_indexed(self):
+        if not self._indexed:
+            self._build_indexes()
+
+    def _ensure_sorted(self):
+        self._ensure_indexed()
+        if self._claims_by_amount is None:
+            claims = list(self.claims.values())
+            self._claims_by_amount = SortedIndex((-claim.amount, claim.id) for claim in claims)
+            self._pending_by_date = SortedIndex((claim.date_ordinal, claim.id)
+                                                for claim in claims if claim.status == PENDING)
+
+    def _ensure_dated(self):
+        self._ensure_indexed()
+        if self._claims_by_date is None:
+            self._claims_by_date = SortedIndex((claim.date_ordinal, claim.id) for claim in self.claims.values())
+
+    def _claims_in_order(self, keys, limit):
+        claims = []
+        for key in keys:
+            if limit is not None and len(claims) >= limit:
+                break
+            claim = self.claims[key[1]]
+            if claim.policyholder_id in self.policyholders:
+                claims.append(claim)
+        return claims
+
+    def _build_indexes(self):
+        for policyholder in self.policyholders.values():
+            self._policyholders_by_type.add(policyholder.policy_type, policyholder.id)
+        for claim in self.claims.values():
+            self._claims_by_policyholder.add(claim.policyholder_id, claim.id)
+            self._claims_by_status.add(claim.status, claim.id)
+            self._aggregates.add(claim, self._policy_type_of(claim))
+        self._indexed = True
+
+    # the helpers below keep indexes and aggregates in step once they are built;
+    # before that (while loading, or in lazy mode) _build_indexes picks changes up later
+
+    def _put_policyholder(self, policyholder):
+        previous = self.policyholders.get(policyholder.id) if self._indexed else None
+        self.policyholders[policyholder.id] = policyholder
+        if self._indexed:
+            if previous is not None:
+                self._policyholders_by_type.remove(previous.policy_type, policyholder.id)
+            self._policyholders_by_type.add(policyholder.policy_type, policyholder.id)
+            self._retag_claims(policyholder.id, previous.policy_type if previous else None, policyholder.policy_type)
+        self._mark_dirty("policyholders")
+
+    def _remove_policyholder(self, policyholder_id):
+        policyholder = self.policyholders.pop(policyholder_id, None)
+        if policyholder is not None:
+            if self._indexed:
+                self._policyholders_by_type.remove(policyholder.policy_type, policyholder_id)
+                self._retag_claims(policyholder_id, policyholder.policy_type, None)
+            self._mark_dirty("policyholders")
+
+    def _put_claim(self, claim):
+        previous = self.claims.get(claim.id) if self._indexed else None
+        self.claims[claim.id] = claim
+        if self._indexed:
+            if previous is not None:
+                self._claims_by_policyholder.remove(previous.policyholder_id, claim.id)
+                self._claims_by_status.remove(previous.status, claim.id)
+                self._aggregates.remove(previous, self._policy_type_of(previous))
+                self._unsort_claim(previous)
+            self._claims_by_policyholder.add(claim.policyholder_id, claim.id)
+            self._claims_by_status.add(claim.status, claim.id)
+            self._aggregates.add(claim, self._policy_type_of(claim))
+            self._sort_claim(claim)
+        self._mark_dirty("claims")
+
+    def _remove_claim(self, claim_id):
+        claim = self.claims.pop(claim_id, None)
+        if claim is not None:
+            if self._indexed:
+                self._claims_by_policyholder.remove(claim.policyholder_id, claim_id)
+                self._claims_by_status.remove(claim.status, claim_id)
+                self._aggregates.remove(claim, self._policy_type_of(claim))
+                self._unsort_claim(claim)
+            self._mark_dirty("claims")
+
+    def _sort_claim(self, claim):
+        if self._claims_by_date is not None:
+            self._claims_by_date.add((claim.date_ordinal, claim.id))
+        if self._claims_by_amount is not None:
+            self._claims_by_amount.add((-claim.amount, claim.id))
+            if claim.status == PENDING:
+                self._pending_by_date.add((claim.date_ordinal, claim.id))
+
+    def _unsort_claim(self, claim):
+        if self._claims_by_date is not None:
+            self._claims_by_date.remove((claim.date_ordinal, claim.id))
+        if self._claims_by_amount is not None:
+            self._claims_by_amount.remove((-claim.amount, claim.id))
+            if claim.status == PENDING:
+                self._pending_by_date.remove((claim.date_ordinal, claim.id))
+
+    def _policy_type_of(self, claim):
+        policyholder = self.policyholders.get(claim.policyholder_id)
+        return policyholder.policy_type if policyholder else None
+
+    def _retag_claims(self, policyholder_id, old_policy_type, new_policy_type):
+        # a policyholder's claims are aggregated under its policy type, so move them when it changes
+        if old_policy_type == new_policy_type:
+            return
+        for claim_id in self._claims_by_policyholder.get(policyholder_id):
+            claim = self.claims[claim_id]
+            self._aggregates.remove(claim, old_policy_type)
+            self._aggregates.add(claim, new_policy_type)
+
+    def _mark_dirty(self, collection):
+        self.backend.mark_dirty(collection)
+        self.version += 1
+
+
+def _day_range(start, end):
+    return (None if start is None else day_ordinal(start)), (None if end is None else day_ordinal(end))
+
+
+def _keys_between(index, start, end):
+    # (date ordinal, claim id) keys from the start day through the end day; (day,) sorts
+    # before every key of that day
+    return index.irange(None if start is None else (start,), None if end is None else (end + 1,),
+                        inclusive=(True, False))
@@ -1,33 +1,566 @@
+import json
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from indexes import SortedIndex
+
+
+def _numeric_score(risk):
+    score = risk.get('risk_score')
+    return score if isinstance(score, (int, float)) and not isinstance(score, bool) else None
+
+
+def _text_project(risk):
+    name = risk.get('project_name')
+    return name if isinstance(name, str) else None
+
+
+def _query_order(limit, after, min_score, max_score, below_score, project_prefix):
+    # pages follow the index that narrows the query: project name, then score, then id;
+    # a cursor is the order name followed by the sort key of the last row returned
+    if limit is not None and limit < 1:
+        raise ValueError("limit must be at least 1")
+    if project_prefix is not None:
+        order = "project_name"
+    elif min_score is not None or max_score is not None or below_score is not None:
+        order = "risk_score"
+    else:
+        order = "id"
+    if after is not None:
+        types = {"id": (int,), "risk_score": ((int, float), int), "project_name": (str, int)}[order]
+        if not isinstance(after, (list, tuple)) or len(after) != len(types) + 1 or after[0] != order or \
+                not all(isinstance(value, kind) and not isinstance(value, bool) for value, kind in zip(after[1:], types)):
+            raise ValueError("Cursor does not match the query filters")
+    return order
+
+
+def _score_matches(score, min_score, max_score, below_score):
+    if min_score is None and max_score is None and below_score is None:
+        return True
+    return score is not None and (min_score is None or score >= min_score) and \
+        (max_score is None or score <= max_score) and (below_score is None or score < below_score)
+
+
 class DBManager:
+    # calls never wait on I/O, so async callers can make them inline (see asgi.py)
+    blocking = False
+
     def __init__(self, *args, **kwargs):
-        self.risks = []
+        # risks keyed by id; dicts keep insertion order, so get_all_risks stays in creation order
+        self.risks = {}
         self.next_id = 1
+        # sorted indexes behind query_risks: ids, (risk_score, id) and (project_name, id);
+        # risks without a numeric score or a string project name stay out of those two
+        self._ids = SortedIndex()
+        self._by_score = SortedIndex()
+        self._by_project = SortedIndex()
+        # bumped on every write; each risk remembers the version that last wrote it, so
+        # callers can tell whether anything (or one risk) changed without comparing data
+        self.version = 0
+        self._risk_versions = {}
+        self._lock = threading.RLock()
 
     def get_all_risks(self):
-        return self.risks
+        with self._lock:
+            return list(self.risks.values())
 
     def get_risk_by_id(self, risk_id):
-        for risk in self.risks:
-            if risk['id'] == risk_id:
-                return risk
-        return None
+        with self._lock:
+            return self.risks.get(risk_id)
+
+    def get_version(self):
+        with self._lock:
+            return self.version
+
+    def get_risk_version(self, risk_id):
+        # None when the risk doesn't exist
+        with self._lock:
+            return self._risk_versions.get(risk_id)
+
+    def query_risks(self, limit=None, after=None, min_score=None, max_score=None, below_score=None,
+                    project_prefix=None):
+        # returns (risks, next cursor or None); a page costs O(log n + page size), plus the rows
+        # skipped by a score filter when paging by project name
+        with self._lock:
+            order = _query_order(limit, after, min_score, max_score, below_score, project_prefix)
+            if order == "id":
+                keys = ((risk_id,) for risk_id in self._ids.irange(after[1] if after else None, inclusive=(False, True)))
+            elif order == "risk_score":
+                if after:
+                    keys = self._by_score.irange(tuple(after[1:]), inclusive=(False, True))
+                else:
+                    keys = self._by_score.irange((min_score,) if min_score is not None else None)
+            else:
+                keys = self._by_project.irange(tuple(after[1:]) if after else (project_prefix,),
+                                               inclusive=(not after, True))
+            risks = []
+            last_key = None
+            for key in keys:
+                if order == "project_name" and not key[0].startswith(project_prefix):
+                    break
+                if order == "risk_score" and ((max_score is not None and key[0] > max_score) or
+                                              (below_score is not None and key[0] >= below_score)):
+                    break
+                risk = self.risks[key[-1]]
+                if not _score_matches(_numeric_score(risk), min_score, max_score, below_score):
+                    continue
+                if limit is not None and len(risks) == limit:
+                    return risks, [order, *last_key]
+                risks.append(risk)
+                last_key = key
+            return risks, None
 
     def create_risk(self, risk_data):
-        risk_data['id'] = self.next_id
-        self.next_id += 1
-        self.risks.append(risk_data)
-        return risk_data['id']
+        with self._lock:
+            risk_data['id'] = self.next_id
+            self.next_id += 1
+            self.risks[risk_data['id']] = risk_data
+            self._index(risk_data['id'], risk_data)
+            self._bump(risk_data['id'])
+            return risk_data['id']
+
+    def create_risks(self, risks):
+        # all or nothing, and one version for the whole batch like SQLDBManager; if a row
+        # fails, the rows already added are taken out again and their ids handed back
+        with self._lock:
+            first_id = self.next_id
+            created = []
+            try:
+                for risk_data in risks:
+                    risk_data['id'] = self.next_id
+                    self.next_id += 1
+                    self.risks[risk_data['id']] = risk_data
+                    created.append(risk_data)
+                    self._index(risk_data['id'], risk_data)
+            except Exception:
+                for risk_data in created:
+                    del self.risks[risk_data['id']]
+                    self._unindex(risk_data['id'], risk_data)
+                self.next_id = first_id
+                raise
+            ids = [risk_data['id'] for risk_data in created]
+            if ids:
+                self.version += 1
+                for risk_id in ids:
+                    self._risk_versions[risk_id] = self.version
+            return ids
 
     def update_risk(self, risk_id, updated_data):
-        for i, risk in enumerate(self.risks):
-            if risk['id'] == risk_id:
-                self.risks[i].update(updated_data)
-                return True
-        return False
+        with self._lock:
+            risk = self.risks.get(risk_id)
+            if risk is None:
+                return False
+            self._unindex(risk_id, risk)
+            risk.update(updated_data)
+            self._index(risk_id, risk)
+            self._bump(risk_id)
+            return True
 
     def delete_risk(self, risk_id):
-        for i, risk in enumerate(self.risks):
-            if risk['id'] == risk_id:
-                del self.risks[i]
-                return True
-        return False
+        with self._lock:
+            risk = self.risks.pop(risk_id, None)
+            if risk is None:
+                return False
+            self._unindex(risk_id, risk)
+            self._bump(risk_id, deleted=True)
+            return True
+
+    def delete_risks(self, risk_ids):
+        with self._lock:
+            return sum(self.delete_risk(risk_id) for risk_id in risk_ids)
+
+    def close(self):
+        pass
+
+    def _bump(self, risk_id, deleted=False):
+        self.version += 1
+        if deleted:
+            self._risk_versions.pop(risk_id, None)
+        else:
+            self._risk_versions[risk_id] = self.version
+
+    def _index(self, risk_id, risk):
+        self._ids.add(risk_id)
+        score = _numeric_score(risk)
+        if score is not None:
+            self._by_score.add((score, risk_id))
+        name = _text_project(risk)
+        if name is not None:
+            self._by_project.add((name, risk_id))
+
+    def _unindex(self, risk_id, risk):
+        self._ids.remove(risk_id)
+        score = _numeric_score(risk)
+        if score is not None:
+            self._by_score.remove((score, risk_id))
+        name = _text_project(risk)
+        if name is not None:
+            self._by_project.remove((name, risk_id))
+
+
+class ConnectionPool:
+    # DB-API connections shared by the threads of one process (so one pool per gunicorn
+    # worker); min_size connections are opened up front and at most max_size ever exist
+    def __init__(self, connect, min_size=1, max_size=10, timeout=30):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("Pool sizes must satisfy 0 <= min_size <= max_size and max_size >= 1")
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._size = 0
+        self._size_lock = threading.Lock()
+        for _ in range(min_size):
+            self._idle.put(self._open())
+
+    def _open(self):
+        with self._size_lock:
+            if self._size >= self.max_size:
+                return None
+            self._size += 1
+        try:
+            return self._connect()
+        except BaseException:
+            with self._size_lock:
+                self._size -= 1
+            raise
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        conn = self._open()
+        if conn is not None:
+            return conn
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError(f"No database connection available after {self.timeout}s") from None
+
+    def release(self, conn, discard=False):
+        if discard:
+            with self._size_lock:
+                self._size -= 1
+            try:
+                conn.close()
+            except Exception:
+                pass
+            return
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        # commits on success and rolls back on error; a connection that can't even
+        # roll back is assumed broken and replaced
+        conn = self.acquire()
+        try:
+            yield conn
+            conn.commit()
+        except BaseException as original:
+            try:
+                conn.rollback()
+            except Exception as rollback_error:
+                # report the error that failed the work, not the failed rollback
+                self.release(conn, discard=True)
+                raise original from rollback_error
+            self.release(conn)
+            raise
+        self.release(conn)
+
+    @property
+    def size(self):
+        return self._size
+
+    def close(self):
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self.release(conn, discard=True)
+
+
+class SQLiteDialect:
+    # local stand-in for Oracle, e.g. for development and tests; WAL mode lets the
+    # gunicorn workers read while one of them writes
+    schema = (
+        "CREATE TABLE IF NOT EXISTS risks ("
+        "id INTEGER PRIMARY KEY AUTOINCREMENT, project_name TEXT, risk_score REAL, data TEXT, version INTEGER)",
+        "CREATE INDEX IF NOT EXISTS risks_score ON risks (risk_score, id)",
+        "CREATE INDEX IF NOT EXISTS risks_project ON risks (project_name, id)",
+        # single row holding the store-wide version, see SQLDBManager._bump_version
+        "CREATE TABLE IF NOT EXISTS risk_store (id INTEGER PRIMARY KEY CHECK (id = 1), version INTEGER NOT NULL)",
+        "INSERT OR IGNORE INTO risk_store (id, version) VALUES (1, 0)",
+    )
+    input_sizes = {}
+    for_update = ""
+    limit_clause = "LIMIT :limit"
+
+    def __init__(self, path="./data/risks.db", statement_cache_size=100, timeout=30):
+        self.path = path
+        self.statement_cache_size = statement_cache_size
+        self.timeout = timeout
+
+    def connect(self):
+        # isolation_level=None leaves transaction control to begin()/commit()
+        conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None,
+                               check_same_thread=False, cached_statements=self.statement_cache_size)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def create_schema(self, cursor):
+        for statement in self.schema:
+            cursor.execute(statement)
+
+    def begin(self, cursor):
+        # take the write lock up front so read-modify-write and id reservation can't interleave
+        cursor.execute("BEGIN IMMEDIATE")
+
+    def reserve_ids(self, cursor, count):
+        # AUTOINCREMENT never hands out an id twice, even after the highest row is deleted
+        cursor.execute("SELECT MAX(COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'risks'), 0), "
+                       "COALESCE((SELECT MAX(id) FROM risks), 0))")
+        last = cursor.fetchone()[0]
+        return list(range(last + 1, last + count + 1))
+
+
+class OracleDialect:
+    schema = (
+        "CREATE TABLE risks (id NUMBER(19) PRIMARY KEY, project_name VARCHAR2(4000), "
+        "risk_score BINARY_DOUBLE, data CLOB, version NUMBER(19))",
+        "CREATE SEQUENCE risk_ids CACHE 1000",
+        "CREATE INDEX risks_score ON risks (risk_score, id)",
+        "CREATE INDEX risks_project ON risks (project_name, id)",
+        "CREATE TABLE risk_store (id NUMBER(1) PRIMARY KEY CHECK (id = 1), version NUMBER(19) NOT NULL)",
+        "INSERT INTO risk_store (id, version) SELECT 1, 0 FROM dual WHERE NOT EXISTS (SELECT 1 FROM risk_store)",
+    )
+    for_update = " FOR UPDATE"
+    limit_clause = "FETCH FIRST :limit ROWS ONLY"
+
+    def __init__(self, user, password, dsn, statement_cache_size=100):
+        import cx_Oracle
+        self.cx_Oracle = cx_Oracle
+        self.user = user
+        self.password = password
+        self.dsn = dsn
+        self.statement_cache_size = statement_cache_size
+        self.input_sizes = {"data": cx_Oracle.DB_TYPE_CLOB}
+
+    def connect(self):
+        conn = self.cx_Oracle.connect(user=self.user, password=self.password, dsn=self.dsn, encoding="UTF-8")
+        conn.stmtcachesize = self.statement_cache_size
+        conn.outputtypehandler = self._output_type_handler
+        return conn
+
+    def _output_type_handler(self, cursor, name, default_type, size, precision, scale):
+        # read the JSON CLOB as a plain string instead of a LOB locator
+        if default_type == self.cx_Oracle.DB_TYPE_CLOB:
+            return cursor.var(self.cx_Oracle.DB_TYPE_LONG, arraysize=cursor.arraysize)
+
+    def create_schema(self, cursor):
+        for statement in self.schema:
+            try:
+                cursor.execute(statement)
+            except self.cx_Oracle.DatabaseError as e:
+                # ORA-00955: name is already used by an existing object;
+                # ORA-00001: another worker seeded risk_store first
+                if e.args[0].code not in (955, 1):
+                    raise
+
+    def begin(self, cursor):
+        # Oracle starts a transaction implicitly with the first DML statement
+        pass
+
+    def reserve_ids(self, cursor, count):
+        cursor.execute("SELECT risk_ids.NEXTVAL FROM dual CONNECT BY LEVEL <= :count", {"count": count})
+        return [row[0] for row in cursor.fetchall()]
+
+
+class SQLDBManager:
+    # DBManager over a shared database, so every gunicorn worker sees the same assessments.
+    # Each risk is stored as its JSON document plus the columns queries need; statements
+    # use the :name paramstyle, which both sqlite3 and cx_Oracle accept.
+    # Calls wait on the pool and the database, so async callers run them in a thread.
+    blocking = True
+
+    def __init__(self, dialect, min_size=1, max_size=10, timeout=30):
+        self.dialect = dialect
+        self.pool = ConnectionPool(dialect.connect, min_size=min_size, max_size=max_size, timeout=timeout)
+        with self.pool.connection() as conn:
+            dialect.create_schema(conn.cursor())
+
+    def get_all_risks(self):
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT id, data FROM risks ORDER BY id")
+            return [self._risk(risk_id, data) for risk_id, data in cursor]
+
+    def get_risk_by_id(self, risk_id):
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT id, data FROM risks WHERE id = :id", {"id": risk_id})
+            row = cursor.fetchone()
+            return self._risk(*row) if row else None
+
+    def get_version(self):
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT version FROM risk_store WHERE id = 1")
+            return cursor.fetchone()[0]
+
+    def get_risk_version(self, risk_id):
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT version FROM risks WHERE id = :id", {"id": risk_id})
+            row = cursor.fetchone()
+            return row[0] if row else None
+
+    def query_risks(self, limit=None, after=None, min_score=None, max_score=None, below_score=None,
+                    project_prefix=None):
+        # keyset pagination over the (project_name, id) / (risk_score, id) / id indexes,
+        # with the same ordering and cursors as DBManager.query_risks
+        order = _query_order(limit, after, min_score, max_score, below_score, project_prefix)
+        columns = {"id": ("id",), "risk_score": ("risk_score", "id"), "project_name": ("project_name", "id")}[order]
+        conditions, params = [], {}
+        if project_prefix is not None:
+            conditions.append("project_name >= :prefix")
+            params["prefix"] = project_prefix
+            if project_prefix:
+                # compared as a substring rather than against a computed upper bound, which
+                # doesn't exist for every prefix (one ending in U+10FFFF, say)
+                conditions.append("substr(project_name, 1, length(:prefix)) = :prefix")
+        for name, operator, value in (("min_score", ">=", min_score), ("max_score", "<=", max_score),
+                                      ("below_score", "<", below_score)):
+            if value is not None:
+                conditions.append(f"risk_score {operator} :{name}")
+                params[name] = value
+        if after:
+            if len(columns) == 1:
+                conditions.append("id > :after_id")
+            else:
+                conditions.append(f"({columns[0]} > :after_key OR ({columns[0]} = :after_key AND id > :after_id))")
+                params["after_key"] = after[1]
+            params["after_id"] = after[-1]
+        sql = "SELECT id, risk_score, project_name, data FROM risks"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY " + ", ".join(columns)
+        if limit is not None:
+            sql += " " + self.dialect.limit_clause
+            params["limit"] = limit + 1
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+        next_after = None
+        if limit is not None and len(rows) > limit:
+            rows = rows[:limit]
+            risk_id, score, name, _ = rows[-1]
+            next_after = [order, *{"id": (risk_id,), "risk_score": (score, risk_id), "project_name": (name, risk_id)}[order]]
+        return [self._risk(risk_id, data) for risk_id, _, _, data in rows], next_after
+
+    def create_risk(self, risk_data):
+        return self.create_risks([risk_data])[0]
+
+    def create_risks(self, risks):
+        # one transaction and one executemany, however many rows
+        risks = list(risks)
+        if not risks:
+            return []
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            self.dialect.begin(cursor)
+            ids = self.dialect.reserve_ids(cursor, len(risks))
+            version = self._bump_version(cursor)
+            rows = []
+            for risk_id, risk_data in zip(ids, risks):
+                risk_data['id'] = risk_id
+                rows.append(self._row(risk_id, risk_data, version))
+            if self.dialect.input_sizes:
+                cursor.setinputsizes(**self.dialect.input_sizes)
+            cursor.executemany("INSERT INTO risks (id, project_name, risk_score, data, version) "
+                               "VALUES (:id, :project_name, :risk_score, :data, :version)", rows)
+        return ids
+
+    def update_risk(self, risk_id, updated_data):
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            self.dialect.begin(cursor)
+            cursor.execute("SELECT id, data FROM risks WHERE id = :id" + self.dialect.for_update, {"id": risk_id})
+            row = cursor.fetchone()
+            if row is None:
+                return False
+            risk = self._risk(*row)
+            risk.update(updated_data)
+            version = self._bump_version(cursor)
+            if self.dialect.input_sizes:
+                cursor.setinputsizes(**self.dialect.input_sizes)
+            cursor.execute("UPDATE risks SET project_name = :project_name, risk_score = :risk_score, "
+                           "data = :data, version = :version WHERE id = :id", self._row(risk_id, risk, version))
+            return True
+
+    def delete_risk(self, risk_id):
+        return self.delete_risks([risk_id]) == 1
+
+    def delete_risks(self, risk_ids):
+        risk_ids = list(risk_ids)
+        if not risk_ids:
+            return 0
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            self.dialect.begin(cursor)
+            cursor.executemany("DELETE FROM risks WHERE id = :id", [{"id": risk_id} for risk_id in risk_ids])
+            deleted = cursor.rowcount
+            if deleted:
+                self._bump_version(cursor)
+            return deleted
+
+    def close(self):
+        self.pool.close()
+
+    @staticmethod
+    def _bump_version(cursor):
+        # the UPDATE row-locks risk_store until commit, so concurrent writers get distinct versions
+        cursor.execute("UPDATE risk_store SET version = version + 1 WHERE id = 1")
+        cursor.execute("SELECT version FROM risk_store WHERE id = 1")
+        return cursor.fetchone()[0]
+
+    @staticmethod
+    def _risk(risk_id, data):
+        risk = json.loads(data)
+        risk['id'] = risk_id
+        return risk
+
+    @staticmethod
+    def _row(risk_id, risk, version):
+        document = {key: value for key, value in risk.items() if key != 'id'}
+        return {
+            "id": risk_id,
+            "project_name": _text_project(risk),
+            "risk_score": _numeric_score(risk),
+            "data": json.dumps(document),
+            "version": version,
+        }
+
+
+def create_db_manager(env=None):
+    # RISK_DB_BACKEND picks the store: "memory" (per process, the default), "sqlite" or "oracle"
+    env = os.environ if env is None else env
+    backend = env.get("RISK_DB_BACKEND", "memory")
+    if backend == "memory":
+        return DBManager()
+    statement_cache_size = int(env.get("DB_STATEMENT_CACHE_SIZE", 100))
+    if backend == "sqlite":
+        dialect = SQLiteDialect(env.get("RISK_DB_PATH", "./data/risks.db"), statement_cache_size=statement_cache_size)
+    elif backend == "oracle":
+        dialect = OracleDialect(env["ORACLE_USER"], env["ORACLE_PASSWORD"], env["ORACLE_DSN"],
+                                statement_cache_size=statement_cache_size)
+    else:
+        raise ValueError(f"Unknown RISK_DB_BACKEND: {backend}")
+    return SQLDBManager(dialect, min_size=int(env.get("DB_POOL_MIN", 1)), max_size=int(env.get("DB_POOL_MAX", 10)),
+                        timeout=float(env.get("DB_POOL_TIMEOUT", 30)))
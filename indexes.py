@@ -0,0 +1,120 @@
+from bisect import bisect_left, bisect_right, insort
+
+
+class Index:
+    # maps a key (policyholder id, status, policy type, ...) to the ids stored under it;
+    # each bucket is a dict used as an insertion-ordered set
+    def __init__(self):
+        self._buckets = {}
+
+    def add(self, key, item_id):
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = {}
+        bucket[item_id] = None
+
+    def remove(self, key, item_id):
+        bucket = self._buckets.get(key)
+        if bucket is not None:
+            bucket.pop(item_id, None)
+            if not bucket:
+                del self._buckets[key]
+
+    def get(self, key):
+        return self._buckets.get(key, {}).keys()
+
+    def count(self, key):
+        return len(self._buckets.get(key, ()))
+
+    def keys(self):
+        return self._buckets.keys()
+
+    def clear(self):
+        self._buckets.clear()
+
+
+class SortedIndex:
+    # sorted multiset of keys (usually (value, id) tuples) split into blocks of at most
+    # 2 * load entries, so an insert or removal shifts one block instead of the whole list
+    def __init__(self, keys=(), load=512):
+        self._load = load
+        self._blocks = []
+        self._maxes = []
+        self._len = 0
+        keys = sorted(keys)
+        for start in range(0, len(keys), load):
+            block = keys[start:start + load]
+            self._blocks.append(block)
+            self._maxes.append(block[-1])
+        self._len = len(keys)
+
+    def add(self, key):
+        if not self._blocks:
+            self._blocks.append([key])
+            self._maxes.append(key)
+        else:
+            i = bisect_right(self._maxes, key)
+            if i == len(self._blocks):
+                # past every key, the common case for increasing ids and dates
+                i -= 1
+                self._blocks[i].append(key)
+                self._maxes[i] = key
+            else:
+                insort(self._blocks[i], key)
+            block = self._blocks[i]
+            if len(block) > 2 * self._load:
+                self._blocks[i:i + 1] = [block[:self._load], block[self._load:]]
+                self._maxes[i:i + 1] = [block[self._load - 1], block[-1]]
+        self._len += 1
+
+    def remove(self, key):
+        i = bisect_left(self._maxes, key)
+        if i == len(self._blocks):
+            return False
+        block = self._blocks[i]
+        j = bisect_left(block, key)
+        if block[j] != key:
+            return False
+        del block[j]
+        if block:
+            self._maxes[i] = block[-1]
+        else:
+            del self._blocks[i]
+            del self._maxes[i]
+        self._len -= 1
+        return True
+
+    def irange(self, minimum=None, maximum=None, inclusive=(True, True)):
+        # keys between minimum and maximum in order; None leaves that side open
+        if minimum is None:
+            i = j = 0
+        else:
+            find = bisect_left if inclusive[0] else bisect_right
+            i = find(self._maxes, minimum)
+            if i == len(self._blocks):
+                return
+            j = find(self._blocks[i], minimum)
+        for block in self._blocks[i:]:
+            for k in range(j, len(block)):
+                key = block[k]
+                if maximum is not None and (key > maximum or (key == maximum and not inclusive[1])):
+                    return
+                yield key
+            j = 0
+
+    def first(self):
+        return self._blocks[0][0] if self._blocks else None
+
+    def last(self):
+        return self._maxes[-1] if self._maxes else None
+
+    def __iter__(self):
+        return self.irange()
+
+    def __len__(self):
+        return self._len
+
+    def clear(self):
+        self._blocks.clear()
+        self._maxes.clear()
+        self._len = 0
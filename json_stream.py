@@ -0,0 +1,154 @@
+import json
+from collections.abc import MutableMapping
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+
+
+def iter_object_items(fp, chunk_size=1 << 16):
+    # yields (key, value) pairs of a top-level JSON object one at a time, reading the
+    # file in chunks instead of holding the whole document and its parse tree in memory
+    reader = _ChunkReader(fp, chunk_size)
+    if not reader.skip_whitespace():
+        return
+    reader.expect("{")
+    reader.skip_whitespace()
+    if reader.peek() == "}":
+        return
+    while True:
+        key = reader.decode()
+        reader.skip_whitespace()
+        reader.expect(":")
+        value = reader.decode()
+        yield key, value
+        reader.skip_whitespace()
+        separator = reader.peek()
+        if separator == "}":
+            return
+        reader.expect(",")
+
+
+def iter_ndjson(fp, chunk_size=1 << 16):
+    for chunk in iter_ndjson_chunks(fp, chunk_size):
+        yield from chunk
+
+
+def iter_ndjson_chunks(fp, chunk_size=1 << 16):
+    # yields lists of parsed records, reading roughly chunk_size bytes of lines at a time
+    while True:
+        lines = fp.readlines(chunk_size)
+        if not lines:
+            return
+        yield [json.loads(line) for line in lines if line.strip()]
+
+
+def write_object_items(fp, items, indent=4):
+    # streaming equivalent of json.dump(dict(items), fp, indent=indent)
+    pad = " " * indent
+    first = True
+    for key, value in items:
+        fp.write("{\n" if first else ",\n")
+        first = False
+        body = json.dumps(value, indent=indent).replace("\n", "\n" + pad)
+        fp.write(f"{pad}{json.dumps(key)}: {body}")
+    fp.write("{}" if first else "\n}")
+
+
+def write_ndjson(fp, records):
+    for record in records:
+        fp.write(json.dumps(record))
+        fp.write("\n")
+
+
+class _ChunkReader:
+    def __init__(self, fp, chunk_size):
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+
+    def _fill(self):
+        chunk = self.fp.read(self.chunk_size)
+        if not chunk:
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def skip_whitespace(self):
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return True
+            if not self._fill():
+                return False
+
+    def peek(self):
+        if not self.skip_whitespace():
+            raise ValueError("Unexpected end of JSON data")
+        return self.buffer[self.pos]
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} at offset {self.pos} of the current chunk")
+        self.pos += 1
+
+    def decode(self):
+        self.skip_whitespace()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+            except ValueError:
+                # the value may just be cut off at the chunk boundary
+                if not self._fill():
+                    raise
+                continue
+            if end == len(self.buffer) and self._fill():
+                # a number at the very end of the buffer may continue in the next chunk
+                continue
+            self.pos = end
+            return value
+
+
+class LazyRecords(MutableMapping):
+    # dict of model objects that keeps records as the raw parsed dicts until first access,
+    # so loading doesn't have to build a model object for every record up front
+    def __init__(self, factory):
+        self._factory = factory
+        self._items = {}
+
+    def set_raw(self, key, record):
+        self._items[key] = record
+
+    def raw_items(self):
+        # (id, record dict) pairs without materializing anything that is still raw
+        for key, item in self._items.items():
+            yield key, item if type(item) is dict else item.to_dict()
+
+    def materialized_count(self):
+        return sum(1 for item in self._items.values() if type(item) is not dict)
+
+    def __getitem__(self, key):
+        item = self._items[key]
+        if type(item) is dict:
+            item = self._items[key] = self._factory(item)
+        return item
+
+    def __setitem__(self, key, value):
+        self._items[key] = value
+
+    def __delitem__(self, key):
+        del self._items[key]
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __len__(self):
+        return len(self._items)
+
+    def clear(self):
+        self._items.clear()
@@ -4,12 +4,48 @@ import json
 import os
 from datetime import datetime, timedelta
 import uuid
-import matplotlib.pyplot as plt
-import seaborn as sns
 from models import Policyholder, Claim
 from database import Database
+from storage import SQLiteBackend
+from reports import ReportEngine
+from parallel_reports import MIN_CLAIMS, ParallelReports
+from charts import ReportCharts
 
-db = Database()
+@st.cache_resource
+def get_database():
+    # one Database shared by every rerun and session; it reloads itself only
+    # when the data files are changed on disk by someone else. JOURNAL=true appends
+    # each change to journal.log instead of rewriting the data files
+    if os.environ.get("STORAGE_BACKEND", "file") == "sqlite":
+        return Database(backend=SQLiteBackend(os.environ.get("SQLITE_PATH", "./data/claims.db")))
+    return Database(
+        data_format=os.environ.get("DATA_FORMAT", "json"),
+        lazy=os.environ.get("LAZY_LOAD", "False").lower() == "true",
+        journal=os.environ.get("JOURNAL", "False").lower() == "true",
+        compact_threshold=int(os.environ.get("JOURNAL_COMPACT_THRESHOLD", 10000)),
+    )
+
+@st.cache_resource
+def get_reports():
+    # report results are cached per Database.version inside the engine, for the whole dataset
+    # and the REPORT_CACHE_WINDOWS date ranges used last; datasets of at least
+    # REPORT_PARALLEL_MIN_CLAIMS claims are aggregated across REPORT_WORKERS processes
+    parallel = ParallelReports(
+        workers=int(os.environ.get("REPORT_WORKERS", os.cpu_count() or 1)),
+        min_claims=int(os.environ.get("REPORT_PARALLEL_MIN_CLAIMS", MIN_CLAIMS)),
+    )
+    return ReportEngine(get_database(), parallel=parallel,
+                        max_windows=int(os.environ.get("REPORT_CACHE_WINDOWS", 16)))
+
+@st.cache_resource
+def get_charts():
+    # rendered chart images, redrawn only after the data changes
+    return ReportCharts(get_reports(), max_bytes=int(os.environ.get("CHART_CACHE_MB", 32)) * 1024 * 1024)
+
+db = get_database()
+db.reload_if_changed()
+reports = get_reports()
+charts = get_charts()
 print("DB instance:", db)
 
 def load_sample_data():
@@ -33,6 +69,20 @@ def load_sample_data():
         for claim in claims:
             db.add_claim(claim)
 
+def claim_date_filter():
+    # the claim dates the Risk Analysis and Reports pages cover; the full range counts as no
+    # filter, so those reports and charts stay shared with every other session
+    bounds = db.claim_date_range()
+    if bounds is None:
+        return None, None
+    first, last = bounds
+    selected = st.sidebar.date_input("Claim dates", value=(first, last), min_value=first, max_value=last)
+    # while a new range is being picked only its first date is set
+    if len(selected) != 2:
+        return None, None
+    start, end = selected
+    return (start if start > first else None), (end if end < last else None)
+
 # Page configuration
 st.set_page_config(
     page_title="ABC Insurance - Claim Management System",
@@ -107,11 +157,12 @@ if page == "Policyholder Management":
                         if not name:
                             st.error("Name cannot be empty")
                         else:
-                            policyholder.name = name
-                            policyholder.age = age
-                            policyholder.policy_type = policy_type
-                            policyholder.sum_insured = sum_insured
-                            db.save_data()
+                            db.update_policyholder(policyholder_id, {
+                                "name": name,
+                                "age": age,
+                                "policy_type": policy_type,
+                                "sum_insured": sum_insured
+                            })
                             st.success(f"Policyholder {name} updated successfully")
 
 # Claim Management Page
@@ -189,13 +240,13 @@ elif page == "Claim Management":
                 st.write(f"Current Status: {claim.status}")                
                 new_status = st.selectbox("New Status", ["Pending", "Approved", "Rejected"], index=["Pending", "Approved", "Rejected"].index(claim.status))                
                 if st.button("Update Status"):
-                    claim.status = new_status
-                    db.save_data()
+                    db.update_claim_status(claim_id, new_status)
                     st.success(f"Claim status updated to {new_status}")
 
 # Risk Analysis Page
 elif page == "Risk Analysis":
     st.header("Risk Analysis")
+    start, end = claim_date_filter()
     if not db.claims or not db.policyholders:
         st.warning("Insufficient data for risk analysis. Please add more policyholders and claims.")
     else:
@@ -203,102 +254,29 @@ elif page == "Risk Analysis":
         tab1, tab2, tab3 = st.tabs(["Claim Frequency", "High Risk Policyholders", "Claims by Policy Type"])        
         with tab1:
             st.subheader("Claim Frequency per Policyholder")
-            claim_frequency = {}
-            for ph_id in db.policyholders:
-                policyholder_name = db.policyholders[ph_id].name
-                count = sum(1 for c in db.claims.values() if c.policyholder_id == ph_id)
-                claim_frequency[policyholder_name] = count
-            df_freq = pd.DataFrame(list(claim_frequency.items()), columns=['Policyholder', 'Number of Claims'])
-            df_freq = df_freq.sort_values('Number of Claims', ascending=False)
+            df_freq = reports.claim_frequency(start, end)
             st.dataframe(df_freq, use_container_width=True)
             
             # Create bar chart
-            fig, ax = plt.subplots(figsize=(10, 6))
-            sns.barplot(x='Policyholder', y='Number of Claims', data=df_freq, ax=ax)
-            plt.xticks(rotation=45, ha='right')
-            plt.tight_layout()
-            st.pyplot(fig)
+            st.image(charts.claim_frequency(start, end), use_column_width=True)
         
         with tab2:
             st.subheader("High Risk Policyholders")
-            high_risk_data = []
-            one_year_ago = datetime.now() - timedelta(days=365)
-            
-            for ph_id, policyholder in db.policyholders.items():
-                claims_last_year = sum(1 for c in db.claims.values() 
-                                     if c.policyholder_id == ph_id and 
-                                     datetime.strptime(c.date, "%Y-%m-%d") > one_year_ago)
-                total_claim_amount = sum(c.amount for c in db.claims.values() 
-                                       if c.policyholder_id == ph_id)
-                claim_ratio = (total_claim_amount / policyholder.sum_insured) * 100 if policyholder.sum_insured > 0 else 0
-                risk_factors = []
-                if claims_last_year > 3:
-                    risk_factors.append("Frequent Claims")
-                if claim_ratio > 80:
-                    risk_factors.append("High Claim Ratio")
-                if risk_factors:
-                    high_risk_data.append({
-                        "Policyholder": policyholder.name,
-                        "Policy Type": policyholder.policy_type,
-                        "Claims (Last Year)": claims_last_year,
-                        "Total Claim Amount": f"${total_claim_amount:,}",
-                        "Sum Insured": f"${policyholder.sum_insured:,}",
-                        "Claim Ratio": f"{claim_ratio:.2f}%",
-                        "Risk Factors": ", ".join(risk_factors)
-                    })
-            if high_risk_data:
-                df_risk = pd.DataFrame(high_risk_data)
+            df_risk = reports.high_risk_policyholders(start=start, end=end)
+            if not df_risk.empty:
                 st.dataframe(df_risk, use_container_width=True)
             else:
                 st.info("No high-risk policyholders identified.")
         
         with tab3:
             st.subheader("Claims by Policy Type")
-            policy_claims = {}
-            for claim in db.claims.values():
-                ph = db.policyholders.get(claim.policyholder_id)
-                if ph:
-                    if ph.policy_type not in policy_claims:
-                        policy_claims[ph.policy_type] = {
-                            "count": 0,
-                            "total_amount": 0,
-                            "approved": 0,
-                            "pending": 0,
-                            "rejected": 0
-                        }
-                    policy_claims[ph.policy_type]["count"] += 1
-                    policy_claims[ph.policy_type]["total_amount"] += claim.amount
-                    if claim.status == "Approved":
-                        policy_claims[ph.policy_type]["approved"] += 1
-                    elif claim.status == "Pending":
-                        policy_claims[ph.policy_type]["pending"] += 1
-                    elif claim.status == "Rejected":
-                        policy_claims[ph.policy_type]["rejected"] += 1
-            policy_claims_data = []
-            for policy_type, data in policy_claims.items():
-                policy_claims_data.append({
-                    "Policy Type": policy_type,
-                    "Total Claims": data["count"],
-                    "Total Amount": f"${data['total_amount']:,}",
-                    "Approved Claims": data["approved"],
-                    "Pending Claims": data["pending"],
-                    "Rejected Claims": data["rejected"],
-                    "Average Claim": f"${data['total_amount'] / data['count']:,.2f}" if data["count"] > 0 else "$0"
-                })
-            df_policy = pd.DataFrame(policy_claims_data)
-            st.dataframe(df_policy, use_container_width=True)
-            fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(12, 6))
-            labels = [data["Policy Type"] for data in policy_claims_data]
-            values = [data["Total Claims"] for data in policy_claims_data]
-            ax1.pie(values, labels=labels, autopct='%1.1f%%', startangle=90)
-            ax1.set_title('Claims Count by Policy Type')
-            amount_values = [policy_claims[pt]["total_amount"] for pt in policy_claims]
-            ax2.pie(amount_values, labels=labels, autopct='%1.1f%%', startangle=90)
-            ax2.set_title('Claims Amount by Policy Type')
-            plt.tight_layout()
-            st.pyplot(fig)
+            df_policy = reports.policy_type_summary(start, end)
+            st.dataframe(df_policy.drop(columns=["Total Amount Value"]), use_container_width=True)
+            if not df_policy.empty:
+                st.image(charts.policy_type_pies(start, end), use_column_width=True)
 elif page == "Reports":
     st.header("Reports Module")
+    start, end = claim_date_filter()
     if not db.claims or not db.policyholders:
         st.warning("Insufficient data for reports. Please add more policyholders and claims.")
     else:
@@ -310,110 +288,27 @@ elif page == "Reports":
         ])
         with tab1:
             st.subheader("Total Claims per Month")
-            claims_by_month = {}
-            for claim in db.claims.values():
-                claim_date = datetime.strptime(claim.date, "%Y-%m-%d")
-                month_key = claim_date.strftime("%Y-%m")
-                month_name = claim_date.strftime("%B %Y")  
-                if month_key not in claims_by_month:
-                    claims_by_month[month_key] = {
-                        "month_name": month_name,
-                        "count": 0,
-                        "total_amount": 0
-                    }
-                claims_by_month[month_key]["count"] += 1
-                claims_by_month[month_key]["total_amount"] += claim.amount
-            monthly_data = []
-            for month_key, data in sorted(claims_by_month.items()):
-                monthly_data.append({
-                    "Month": data["month_name"],
-                    "Number of Claims": data["count"],
-                    "Total Amount": f"${data['total_amount']:,}",
-                    "Average Claim": f"${data['total_amount'] / data['count']:,.2f}"
-                })
-            df_monthly = pd.DataFrame(monthly_data)
+            df_monthly = reports.monthly_totals(start, end)
             st.dataframe(df_monthly, use_container_width=True)
-            fig, ax = plt.subplots(figsize=(10, 6))
-            months = [data["Month"] for data in monthly_data]
-            counts = [data["Number of Claims"] for data in monthly_data]    
-            sns.barplot(x=months, y=counts, ax=ax)
-            plt.xticks(rotation=45, ha='right')
-            plt.ylabel("Number of Claims")
-            plt.title("Claims per Month")
-            plt.tight_layout()
-            st.pyplot(fig)
+            if not df_monthly.empty:
+                st.image(charts.monthly_totals(start, end), use_column_width=True)
         with tab2:
             st.subheader("Average Claim Amount by Policy Type")
-            avg_claim_by_policy = {}
-            for claim in db.claims.values():
-                ph = db.policyholders.get(claim.policyholder_id)
-                if ph:
-                    if ph.policy_type not in avg_claim_by_policy:
-                        avg_claim_by_policy[ph.policy_type] = {
-                            "total_amount": 0,
-                            "count": 0
-                        }
-                    avg_claim_by_policy[ph.policy_type]["total_amount"] += claim.amount
-                    avg_claim_by_policy[ph.policy_type]["count"] += 1
-            avg_data = []
-            for policy_type, data in avg_claim_by_policy.items():
-                average = data["total_amount"] / data["count"] if data["count"] > 0 else 0
-                avg_data.append({
-                    "Policy Type": policy_type,
-                    "Average Claim Amount": average,
-                    "Average Claim": f"${average:,.2f}",
-                    "Total Claims": data["count"],
-                    "Total Amount": f"${data['total_amount']:,}"
-                })    
-            df_avg = pd.DataFrame(avg_data).sort_values("Average Claim Amount", ascending=False)
+            df_avg = reports.average_claim_by_policy_type(start, end)
             display_df = df_avg.drop(columns=["Average Claim Amount"])
             st.dataframe(display_df, use_container_width=True)
-            fig, ax = plt.subplots(figsize=(10, 6))
-            sns.barplot(x="Policy Type", y="Average Claim Amount", data=df_avg, ax=ax)
-            plt.ylabel("Average Claim Amount ($)")
-            plt.title("Average Claim Amount by Policy Type")
-            plt.tight_layout()
-            st.pyplot(fig)
+            if not df_avg.empty:
+                st.image(charts.average_claim_by_policy_type(start, end), use_column_width=True)
         
         with tab3:
             st.subheader("Highest Claims Filed")
-            highest_claims = []
-            for claim in db.claims.values():
-                ph = db.policyholders.get(claim.policyholder_id)
-                if ph:
-                    highest_claims.append({
-                        "Claim ID": claim.id,
-                        "Policyholder": ph.name,
-                        "Policy Type": ph.policy_type,
-                        "Amount": claim.amount,
-                        "Formatted Amount": f"${claim.amount:,}",
-                        "Reason": claim.reason,
-                        "Status": claim.status,
-                        "Date": claim.date
-                    })
-            df_highest = pd.DataFrame(highest_claims).sort_values("Amount", ascending=False).head(10)
-            display_df = df_highest.drop(columns=["Amount"])
-            st.dataframe(display_df, use_container_width=True)
+            st.dataframe(reports.top_claims(10, start, end), use_container_width=True)
         
         with tab4:
             st.subheader("Policyholders with Pending Claims")
-            pending_claims = []
-            for claim in db.claims.values():
-                if claim.status == "Pending":
-                    ph = db.policyholders.get(claim.policyholder_id)
-                    if ph:
-                        pending_claims.append({
-                            "Claim ID": claim.id,
-                            "Policyholder": ph.name,
-                            "Policy Type": ph.policy_type,
-                            "Amount": f"${claim.amount:,}",
-                            "Reason": claim.reason,
-                            "Date": claim.date,
-                            "Days Pending": (datetime.now() - datetime.strptime(claim.date, "%Y-%m-%d")).days
-                        })
-            if pending_claims:
-                df_pending = pd.DataFrame(pending_claims).sort_values("Days Pending", ascending=False)
+            df_pending = reports.pending_aging(start=start, end=end)
+            if not df_pending.empty:
                 st.dataframe(df_pending, use_container_width=True)
             else:
                 st.info("No pending claims found.")
-db.save_data()
+db.flush()
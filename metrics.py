@@ -0,0 +1,171 @@
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+
+# In-process request and span metrics rendered in the Prometheus text format. Every
+# gunicorn worker keeps its own, so a scrape sees the worker that answered it.
+
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values = {}  # label values -> number
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, labels, value) for labels, value in self._values.items()]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._values = {}  # label values -> [per-bucket counts (+Inf last), sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][i] += 1
+            entry[1] += value
+
+    def samples(self):
+        with self._lock:
+            values = [(labels, list(counts), total) for labels, (counts, total) in self._values.items()]
+        samples = []
+        for labels, counts, total in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                samples.append((self.name + "_bucket", labels + (_format_value(bound),), cumulative))
+            samples.append((self.name + "_sum", labels, total))
+            samples.append((self.name + "_count", labels, cumulative))
+        return samples
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def counter(self, *args, **kwargs):
+        return self._register(Counter(*args, **kwargs))
+
+    def gauge(self, *args, **kwargs):
+        return self._register(Gauge(*args, **kwargs))
+
+    def histogram(self, *args, **kwargs):
+        return self._register(Histogram(*args, **kwargs))
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            labelnames = metric.labelnames
+            for name, labels, value in metric.samples():
+                names = labelnames + ("le",) if name.endswith("_bucket") else labelnames
+                if labels:
+                    pairs = ",".join(f'{label}="{_escape(value)}"' for label, value in zip(names, labels))
+                    lines.append(f"{name}{{{pairs}}} {_format_value(value)}")
+                else:
+                    lines.append(f"{name} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def _register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+
+class ApiMetrics:
+    # the risk API's request metrics plus spans around RiskAnalyzer and DBManager calls
+    RISK_ANALYZER_METHODS = ("analyze_risk", "analyze_batch")
+    DB_MANAGER_METHODS = ("get_all_risks", "get_risk_by_id", "get_version", "get_risk_version", "query_risks",
+                          "create_risk", "create_risks", "update_risk", "delete_risk", "delete_risks")
+
+    def __init__(self):
+        self.registry = Registry()
+        self.requests = self.registry.counter(
+            "risk_api_requests_total", "HTTP requests by method, route and status.", ("method", "route", "status"))
+        self.errors = self.registry.counter(
+            "risk_api_request_errors_total", "HTTP requests answered with a 5xx status.", ("method", "route"))
+        self.latency = self.registry.histogram(
+            "risk_api_request_duration_seconds", "Time from routing to the response being returned.",
+            ("method", "route"))
+        self.in_flight = self.registry.gauge(
+            "risk_api_requests_in_flight", "Requests currently being handled.", ("route",))
+        self.spans = self.registry.histogram(
+            "risk_api_span_duration_seconds", "Time spent in RiskAnalyzer and DBManager calls.", ("span",))
+
+    def instrument(self, obj, prefix, methods):
+        # replaces the named methods on this instance with timed wrappers
+        for name in methods:
+            method = getattr(obj, name, None)
+            if method is not None:
+                setattr(obj, name, self._timed(method, f"{prefix}.{name}"))
+
+    def instrument_service(self, service):
+        self.instrument(service.risk_analyzer, "risk_analyzer", self.RISK_ANALYZER_METHODS)
+        self.instrument(service.db_manager, "db_manager", self.DB_MANAGER_METHODS)
+
+    def request_started(self, route):
+        self.in_flight.inc(route)
+        return time.perf_counter()
+
+    def request_finished(self, method, route, status, started):
+        self.in_flight.dec(route)
+        self.latency.observe(time.perf_counter() - started, method, route)
+        self.requests.inc(method, route, str(status))
+        if status >= 500:
+            self.errors.inc(method, route)
+
+    def render(self):
+        return self.registry.render()
+
+    def _timed(self, method, span):
+        observe = self.spans.observe
+        perf_counter = time.perf_counter
+
+        @wraps(method)
+        def timed(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                observe(perf_counter() - start, span)
+        return timed
+
+
+def _format_value(value):
+    return "+Inf" if value == float("inf") else repr(value)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
@@ -1,15 +1,54 @@
 import uuid
-from datetime import datetime
+from datetime import date, datetime
+from functools import lru_cache
+
+DATE_FORMAT = "%Y-%m-%d"
+
+
+@lru_cache(maxsize=None)
+def ordinal_to_date_string(ordinal):
+    # claim dates repeat a lot, so each distinct day is formatted once
+    return date.fromordinal(ordinal).strftime(DATE_FORMAT)
+
+
+def date_string_to_ordinal(value):
+    if isinstance(value, date):
+        return value.toordinal()
+    try:
+        return date.fromisoformat(value).toordinal()
+    except ValueError:
+        return datetime.strptime(value, DATE_FORMAT).toordinal()
+
+
+def day_ordinal(value):
+    # a day given as a date, a "%Y-%m-%d" string or already as a day ordinal
+    if isinstance(value, int):
+        return value
+    return date_string_to_ordinal(value)
+
+
+# dates are kept as integer day ordinals (date.toordinal()) and exposed as "%Y-%m-%d"
+# strings through properties; __slots__ drops the per-instance __dict__
 
 class Policyholder:
+    __slots__ = ("id", "name", "age", "policy_type", "sum_insured", "registration_ordinal")
+
     def __init__(self, name, age, policy_type, sum_insured):
-        self.id = str(uuid.uuid4())[:8]  
+        self.id = str(uuid.uuid4())[:8]
         self.name = name
         self.age = age
         self.policy_type = policy_type
         self.sum_insured = sum_insured
-        self.registration_date = datetime.now().strftime("%Y-%m-%d")
-    
+        self.registration_ordinal = date.today().toordinal()
+
+    @property
+    def registration_date(self):
+        return ordinal_to_date_string(self.registration_ordinal)
+
+    @registration_date.setter
+    def registration_date(self, value):
+        self.registration_ordinal = date_string_to_ordinal(value)
+
     def to_dict(self):
         return {
             "id": self.id,
@@ -19,29 +58,39 @@ class Policyholder:
             "sum_insured": self.sum_insured,
             "registration_date": self.registration_date
         }
-    
+
     @classmethod
     def from_dict(cls, data):
-        policyholder = cls(
-            data["name"],
-            data["age"],
-            data["policy_type"],
-            data["sum_insured"]
-        )
+        # bypass __init__ so loading doesn't generate a throwaway uuid per record
+        policyholder = cls.__new__(cls)
         policyholder.id = data["id"]
-        policyholder.registration_date = data["registration_date"]
+        policyholder.name = data["name"]
+        policyholder.age = data["age"]
+        policyholder.policy_type = data["policy_type"]
+        policyholder.sum_insured = data["sum_insured"]
+        policyholder.registration_ordinal = date_string_to_ordinal(data["registration_date"])
         return policyholder
 
 
 class Claim:
+    __slots__ = ("id", "policyholder_id", "amount", "reason", "status", "date_ordinal")
+
     def __init__(self, policyholder_id, amount, reason, status, date=None):
         self.id = str(uuid.uuid4())[:8]  # Generate a short unique ID
         self.policyholder_id = policyholder_id
         self.amount = amount
         self.reason = reason
         self.status = status
-        self.date = date if date else datetime.now().strftime("%Y-%m-%d")
-    
+        self.date = date if date else datetime.now().strftime(DATE_FORMAT)
+
+    @property
+    def date(self):
+        return ordinal_to_date_string(self.date_ordinal)
+
+    @date.setter
+    def date(self, value):
+        self.date_ordinal = date_string_to_ordinal(value)
+
     def to_dict(self):
         return {
             "id": self.id,
@@ -51,15 +100,14 @@ class Claim:
             "status": self.status,
             "date": self.date
         }
-    
+
     @classmethod
     def from_dict(cls, data):
-        claim = cls(
-            data["policyholder_id"],
-            data["amount"],
-            data["reason"],
-            data["status"],
-            data["date"]
-        )
+        claim = cls.__new__(cls)
         claim.id = data["id"]
-        return claim
\ No newline at end of file
+        claim.policyholder_id = data["policyholder_id"]
+        claim.amount = data["amount"]
+        claim.reason = data["reason"]
+        claim.status = data["status"]
+        claim.date_ordinal = date_string_to_ordinal(data["date"])
+        return claim
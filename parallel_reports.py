@@ -0,0 +1,247 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+from itertools import repeat
+from operator import attrgetter
+from multiprocessing import shared_memory
+import numpy as np
+
+# Report aggregates computed over claim columns in a process pool. The columns are copied
+# once per data version into shared memory; each worker maps them without copying, reduces
+# its slice of claims to partial counts and sums, and the parent merges the partials.
+# ColumnAggregates answers the same queries as aggregates.ClaimAggregates, so ReportEngine
+# formats the reports the same way whichever path produced the numbers.
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+# below this many claims the running aggregates are read directly, in-process
+MIN_CLAIMS = 500_000
+_COLUMNS = ("amount", "date", "status", "policyholder", "policy_type")
+
+
+class ClaimColumns:
+    # the claim fields the reports read, as numpy arrays; strings are stored as codes into
+    # the lists kept alongside, and -1 marks a claim whose policyholder no longer exists
+    def __init__(self, db):
+        self.policyholders = list(db.policyholders.values())
+        self.claims = list(db.claims.values())
+        position = {policyholder.id: i for i, policyholder in enumerate(self.policyholders)}
+        self.policy_types = sorted({policyholder.policy_type for policyholder in self.policyholders})
+        # the order the serial aggregates list policy types in, when it isn't simply the
+        # order of their first claims
+        self.policy_type_order = db.policy_type_order()
+        type_code = {policy_type: i for i, policy_type in enumerate(self.policy_types)}
+        self.statuses = sorted(set(map(attrgetter("status"), self.claims)))
+        status_code = {status: i for i, status in enumerate(self.statuses)}
+        count = len(self.claims)
+        # map/attrgetter rather than comprehensions: this is the one serial pass over every claim
+        # integer amounts stay integers, so totals format (and compare) exactly as the serial ones
+        self.amount = np.array(list(map(attrgetter("amount"), self.claims)))
+        if self.amount.dtype.kind not in "if":
+            self.amount = self.amount.astype(np.float64)
+        elif count == 0:
+            self.amount = self.amount.astype(np.int64)
+        # chunked sums of integers are exact; float totals depend on the order they are added
+        # in, so only integer amounts can match the serial aggregates to the last bit
+        self.integral = self.amount.dtype.kind == "i"
+        self.date = np.fromiter(map(attrgetter("date_ordinal"), self.claims), dtype=np.int64, count=count)
+        self.status = np.fromiter(map(status_code.__getitem__, map(attrgetter("status"), self.claims)),
+                                  dtype=np.int32, count=count)
+        self.policyholder = np.fromiter(map(position.get, map(attrgetter("policyholder_id"), self.claims), repeat(-1)),
+                                        dtype=np.int64, count=count)
+        holder_type = np.array([type_code[p.policy_type] for p in self.policyholders] + [-1], dtype=np.int32)
+        # index -1 picks the trailing -1, the missing policyholder's missing type
+        self.policy_type = holder_type[self.policyholder]
+        self._shared = None
+
+    def __len__(self):
+        return len(self.claims)
+
+    def share(self):
+        # copies the columns into shared memory once; returns what a worker needs to map them
+        if self._shared is None:
+            segments, spec = [], []
+            for name in _COLUMNS:
+                column = getattr(self, name)
+                segment = shared_memory.SharedMemory(create=True, size=max(column.nbytes, 1))
+                np.ndarray(column.shape, column.dtype, buffer=segment.buf)[:] = column
+                segments.append(segment)
+                spec.append((name, segment.name, column.dtype.str, len(column)))
+            self._shared = (segments, spec)
+        return self._shared[1]
+
+    def release(self):
+        if self._shared is not None:
+            for segment in self._shared[0]:
+                segment.close()
+                segment.unlink()
+            self._shared = None
+
+
+class ParallelReports:
+    def __init__(self, workers=None, min_claims=MIN_CLAIMS):
+        self.workers = workers or os.cpu_count() or 1
+        self.min_claims = min_claims
+        self._executor = None
+
+    def applies(self, claim_count):
+        return self.workers > 1 and claim_count >= self.min_claims
+
+    def aggregates(self, columns, now=None):
+        today = (now or datetime.now()).toordinal()
+        count = len(columns)
+        bounds = np.linspace(0, count, self.workers + 1).astype(int)
+        chunks = [(start, stop) for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start] or [(0, 0)]
+        spec = columns.share()
+        if self._executor is None:
+            # spawn rather than fork: Streamlit and Flask run threads that fork would copy mid-flight
+            self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        status_count = len(columns.statuses)
+        partials = list(self._executor.map(_partial, [(spec, start, stop, today, status_count)
+                                                      for start, stop in chunks]))
+        return ColumnAggregates(columns, _merge(partials, columns))
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
+class ColumnAggregates:
+    # the read side of ClaimAggregates, over merged partials
+    def __init__(self, columns, merged):
+        self._columns = columns
+        self._merged = merged
+        self._position = {policyholder.id: i for i, policyholder in enumerate(columns.policyholders)}
+
+    def monthly_totals(self):
+        return self._merged["months"]
+
+    def policy_type_totals(self):
+        return self._merged["policy_types"]
+
+    def policy_type_status_count(self, policy_type, status):
+        return self._merged["policy_type_status"].get((policy_type, status), 0)
+
+    def status_totals(self, status):
+        return self._merged["statuses"].get(status, (0, 0))
+
+    def policyholder_totals(self, policyholder_id):
+        i = self._position.get(policyholder_id)
+        if i is None:
+            return (0, 0)
+        return (int(self._merged["claims"][i]), self._merged["amounts"][i].item())
+
+    def policyholder_claims_last_year(self, policyholder_id, now=None):
+        # only for the `now` the aggregates were computed with
+        i = self._position.get(policyholder_id)
+        return 0 if i is None else int(self._merged["recent"][i])
+
+
+def _partial(args):
+    spec, start, stop, today, status_count = args
+    segments, columns = [], {}
+    try:
+        for name, segment_name, dtype, length in spec:
+            # workers share the parent's resource tracker, so attaching doesn't hand them ownership
+            segment = shared_memory.SharedMemory(name=segment_name)
+            segments.append(segment)
+            columns[name] = np.ndarray((length,), np.dtype(dtype), buffer=segment.buf)[start:stop]
+        return _aggregate(columns, today, start, status_count)
+    finally:
+        columns.clear()
+        for segment in segments:
+            segment.close()
+
+
+def _aggregate(columns, today, offset, status_count):
+    amount, dates, status = columns["amount"], columns["date"], columns["status"]
+    policyholder, policy_type = columns["policyholder"], columns["policy_type"]
+    months = (dates - EPOCH_ORDINAL).astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+    partial = {"months": _grouped(months, amount), "statuses": _grouped(status, amount)}
+    typed = policy_type >= 0
+    partial["policy_types"] = _grouped(policy_type[typed], amount[typed])
+    # one code per (policy type, status) pair
+    partial["policy_type_status"] = _grouped(policy_type[typed].astype(np.int64) * status_count + status[typed],
+                                             amount[typed])
+    # where each policy type first appears, which fixes the order the serial aggregates list them in
+    types = partial["policy_types"][0]
+    partial["first_seen"] = (types, np.array([np.argmax(policy_type == code) + offset for code in types.tolist()],
+                                             dtype=np.int64))
+    held = policyholder >= 0
+    holders, counts, sums = _grouped(policyholder[held], amount[held])
+    # claims in the 365 days before today, as policyholder_claims_last_year counts them
+    recent = np.bincount(policyholder[held], weights=dates[held] > today - 365)[holders].astype(np.int64)
+    partial["policyholders"] = (holders, counts, sums, recent)
+    return partial
+
+
+def _grouped(keys, amount):
+    # (distinct keys, count, total amount) per key; keys are integer codes spanning a modest range,
+    # so counting into a bincount array beats sorting
+    if len(keys) == 0:
+        return keys, np.zeros(0, dtype=np.int64), np.zeros(0, dtype=amount.dtype)
+    low = keys.min()
+    keys = keys - low
+    counts = np.bincount(keys)
+    present = np.nonzero(counts)[0]
+    return present + low, counts[present], _sums(keys, amount, len(counts))[present]
+
+
+def _sums(inverse, amount, size):
+    sums = np.bincount(inverse, weights=amount, minlength=size)
+    if amount.dtype.kind == "i":
+        # bincount adds in float64, which is exact for integers while every total stays below 2**53
+        if np.abs(amount).sum() < 2 ** 53:
+            return sums.astype(np.int64)
+        sums = np.zeros(size, dtype=np.int64)
+        np.add.at(sums, inverse, amount)
+    return sums
+
+
+def _merge(partials, columns):
+    merged = {}
+    months = _merge_grouped([p["months"] for p in partials])
+    merged["months"] = [(f"{1970 + month // 12:04d}-{month % 12 + 1:02d}", count, total)
+                        for month, (count, total) in sorted(months.items())]
+    merged["statuses"] = {columns.statuses[code]: value
+                          for code, value in _merge_grouped([p["statuses"] for p in partials]).items()}
+    first_seen = {}
+    for types, first in (p["first_seen"] for p in partials):
+        for code, position in zip(types.tolist(), first.tolist()):
+            first_seen[code] = min(position, first_seen.get(code, position))
+    rank = first_seen
+    if columns.policy_type_order is not None:
+        known = {policy_type: i for i, policy_type in enumerate(columns.policy_type_order)}
+        rank = {code: (known.get(columns.policy_types[code], len(known)), position)
+                for code, position in first_seen.items()}
+    policy_types = _merge_grouped([p["policy_types"] for p in partials])
+    merged["policy_types"] = [(columns.policy_types[code], *policy_types[code])
+                              for code in sorted(first_seen, key=rank.get)]
+    status_count = len(columns.statuses)
+    merged["policy_type_status"] = {
+        (columns.policy_types[key // status_count], columns.statuses[key % status_count]): count
+        for key, (count, _) in _merge_grouped([p["policy_type_status"] for p in partials]).items()}
+    size = len(columns.policyholders)
+    merged["claims"] = np.zeros(size, dtype=np.int64)
+    merged["amounts"] = np.zeros(size, dtype=columns.amount.dtype)
+    merged["recent"] = np.zeros(size, dtype=np.int64)
+    for holders, counts, sums, recent in (p["policyholders"] for p in partials):
+        # a policyholder's claims can fall in several chunks, but only once per chunk
+        merged["claims"][holders] += counts
+        merged["amounts"][holders] += sums
+        merged["recent"][holders] += recent
+    return merged
+
+
+def _merge_grouped(partials):
+    merged = {}
+    for keys, counts, sums in partials:
+        for key, count, total in zip(keys.tolist(), counts.tolist(), sums.tolist()):
+            entry = merged.get(key)
+            if entry is None:
+                merged[key] = [count, total]
+            else:
+                entry[0] += count
+                entry[1] += total
+    return {key: tuple(value) for key, value in merged.items()}
@@ -0,0 +1,247 @@
+from collections import OrderedDict
+from datetime import datetime
+import threading
+import pandas as pd
+from models import day_ordinal
+from parallel_reports import ClaimColumns
+
+
+def _money(values):
+    return values.map(lambda v: f"${v:,}")
+
+
+class ReportEngine:
+    def __init__(self, db, parallel=None, max_windows=16):
+        self.db = db
+        # a parallel_reports.ParallelReports; datasets large enough for it are aggregated in
+        # its process pool instead of being read from Database.aggregates
+        self.parallel = parallel
+        self._lock = threading.Lock()
+        self._version = None
+        self._columns = None
+        # results over every claim, kept until the data changes, and results per date range for
+        # the max_windows ranges used most recently; one engine serves every dashboard session,
+        # so each range a session picks would otherwise stay cached
+        self._results = {}
+        self._windows = OrderedDict()
+        self.max_windows = max_windows
+
+    # every report can be limited to claims dated from start to end (dates, "%Y-%m-%d"
+    # strings or day ordinals, both included); None leaves that side open
+
+    def claim_frequency(self, start=None, end=None):
+        window = _window(start, end)
+        return self._cached(("claim_frequency", window), window, lambda: self._claim_frequency(window))
+
+    def high_risk_policyholders(self, now=None, start=None, end=None):
+        now = now or datetime.now()
+        window = _window(start, end)
+        return self._cached(("high_risk", now.date(), window), window,
+                            lambda: self._high_risk_policyholders(now, window))
+
+    def policy_type_summary(self, start=None, end=None):
+        window = _window(start, end)
+        return self._cached(("policy_type_summary", window), window, lambda: self._policy_type_summary(window))
+
+    def monthly_totals(self, start=None, end=None):
+        window = _window(start, end)
+        return self._cached(("monthly_totals", window), window, lambda: self._monthly_totals(window))
+
+    def average_claim_by_policy_type(self, start=None, end=None):
+        window = _window(start, end)
+        return self._cached(("average_claim_by_policy_type", window), window,
+                            lambda: self._average_claim_by_policy_type(window))
+
+    def top_claims(self, n=10, start=None, end=None):
+        window = _window(start, end)
+        return self._cached(("top_claims", n, window), window, lambda: self._top_claims(n, window))
+
+    def pending_aging(self, now=None, start=None, end=None):
+        now = now or datetime.now()
+        window = _window(start, end)
+        return self._cached(("pending_aging", now.date(), window), window,
+                            lambda: self._pending_aging(now, window))
+
+    def close(self):
+        # frees the shared-memory columns and stops the worker processes
+        with self._lock:
+            if self._columns is not None:
+                self._columns.release()
+                self._columns = None
+        if self.parallel is not None:
+            self.parallel.close()
+
+    def _sync(self):
+        with self._lock:
+            if self._version != self.db.version:
+                self._results = {}
+                self._windows = OrderedDict()
+                if self._columns is not None:
+                    self._columns.release()
+                    self._columns = None
+                self._version = self.db.version
+
+    def _cached(self, key, window, compute):
+        results = self._window_results(window)
+        result = results.get(key)
+        if result is None:
+            result = results[key] = compute()
+        return result
+
+    def _window_results(self, window):
+        self._sync()
+        with self._lock:
+            if window == (None, None):
+                return self._results
+            results = self._windows.get(window)
+            if results is None:
+                results = self._windows[window] = {}
+                if len(self._windows) > self.max_windows:
+                    self._windows.popitem(last=False)
+            else:
+                self._windows.move_to_end(window)
+            return results
+
+    def _in_parallel(self):
+        # backends that push queries down aggregate in the database already; float amounts
+        # stay serial, where they are summed in the order the running aggregates add them
+        return (self.parallel is not None and not self.db.backend.pushdown
+                and self.parallel.applies(len(self.db.claims)) and self._claim_columns().integral)
+
+    def _claim_columns(self):
+        with self._lock:
+            if self._columns is None:
+                self._columns = ClaimColumns(self.db)
+            return self._columns
+
+    def _aggregates(self, now=None, window=(None, None)):
+        # Database.aggregates, or the same figures computed by the parallel executor; for a date
+        # range, aggregates over just the claims in it, read off Database's date index
+        if window != (None, None):
+            return self._cached(("aggregates", window), window, lambda: self.db.aggregates_between(*window))
+        if not self._in_parallel():
+            return self.db.aggregates
+        now = now or datetime.now()
+        return self._cached(("aggregates", now.date()), window,
+                            lambda: self.parallel.aggregates(self._claim_columns(), now))
+
+    # the grouped reports below read aggregates and cost O(groups); top claims and
+    # pending aging walk Database's amount and pending-date indexes
+
+    def _claim_frequency(self, window):
+        aggregates = self._aggregates(window=window)
+        policyholders = list(self.db.policyholders.values())
+        df = pd.DataFrame({
+            "Policyholder": [p.name for p in policyholders],
+            "Number of Claims": [aggregates.policyholder_totals(p.id)[0] for p in policyholders],
+        }, columns=["Policyholder", "Number of Claims"])
+        return df.sort_values("Number of Claims", ascending=False, kind="stable").reset_index(drop=True)
+
+    def _high_risk_policyholders(self, now, window):
+        aggregates = self._aggregates(now, window)
+        rows = []
+        for policyholder in self.db.policyholders.values():
+            claims_last_year = aggregates.policyholder_claims_last_year(policyholder.id, now)
+            total_claim_amount = aggregates.policyholder_totals(policyholder.id)[1]
+            claim_ratio = (total_claim_amount / policyholder.sum_insured) * 100 if policyholder.sum_insured > 0 else 0
+            risk_factors = []
+            if claims_last_year > 3:
+                risk_factors.append("Frequent Claims")
+            if claim_ratio > 80:
+                risk_factors.append("High Claim Ratio")
+            if risk_factors:
+                rows.append({
+                    "Policyholder": policyholder.name,
+                    "Policy Type": policyholder.policy_type,
+                    "Claims (Last Year)": claims_last_year,
+                    "Total Claim Amount": f"${total_claim_amount:,}",
+                    "Sum Insured": f"${policyholder.sum_insured:,}",
+                    "Claim Ratio": f"{claim_ratio:.2f}%",
+                    "Risk Factors": ", ".join(risk_factors)
+                })
+        return pd.DataFrame(rows)
+
+    def _policy_type_summary(self, window):
+        aggregates = self._aggregates(window=window)
+        rows = []
+        for policy_type, count, total in aggregates.policy_type_totals():
+            rows.append({
+                "Policy Type": policy_type,
+                "Total Claims": count,
+                "Total Amount": f"${total:,}",
+                "Approved Claims": aggregates.policy_type_status_count(policy_type, "Approved"),
+                "Pending Claims": aggregates.policy_type_status_count(policy_type, "Pending"),
+                "Rejected Claims": aggregates.policy_type_status_count(policy_type, "Rejected"),
+                "Average Claim": f"${total / count:,.2f}",
+                # numeric column for the pie charts, dropped before display
+                "Total Amount Value": total,
+            })
+        # named columns keep an empty date range's report shaped like the others
+        return pd.DataFrame(rows, columns=["Policy Type", "Total Claims", "Total Amount", "Approved Claims",
+                                           "Pending Claims", "Rejected Claims", "Average Claim", "Total Amount Value"])
+
+    def _monthly_totals(self, window):
+        rows = []
+        for month, count, total in self._aggregates(window=window).monthly_totals():
+            rows.append({
+                "Month": datetime.strptime(month, "%Y-%m").strftime("%B %Y"),
+                "Number of Claims": count,
+                "Total Amount": f"${total:,}",
+                "Average Claim": f"${total / count:,.2f}",
+            })
+        return pd.DataFrame(rows, columns=["Month", "Number of Claims", "Total Amount", "Average Claim"])
+
+    def _average_claim_by_policy_type(self, window):
+        rows = []
+        for policy_type, count, total in self._aggregates(window=window).policy_type_totals():
+            average = total / count
+            rows.append({
+                "Policy Type": policy_type,
+                "Average Claim Amount": average,
+                "Average Claim": f"${average:,.2f}",
+                "Total Claims": count,
+                "Total Amount": f"${total:,}",
+            })
+        df = pd.DataFrame(rows, columns=["Policy Type", "Average Claim Amount", "Average Claim", "Total Claims",
+                                         "Total Amount"])
+        return df.sort_values("Average Claim Amount", ascending=False)
+
+    def _top_claims(self, n, window):
+        claims = self.db.top_claims(n, *window)
+        policyholders = self._policyholders_of(claims)
+        return pd.DataFrame({
+            "Claim ID": [claim.id for claim in claims],
+            "Policyholder": [policyholder.name for policyholder in policyholders],
+            "Policy Type": [policyholder.policy_type for policyholder in policyholders],
+            "Formatted Amount": _money(pd.Series([claim.amount for claim in claims], dtype=object)),
+            "Reason": [claim.reason for claim in claims],
+            "Status": [claim.status for claim in claims],
+            "Date": [claim.date for claim in claims],
+        })
+
+    def _pending_aging(self, now, window):
+        claims = self.db.pending_claims(None, *window)
+        policyholders = self._policyholders_of(claims)
+        today = now.toordinal()
+        return pd.DataFrame({
+            "Claim ID": [claim.id for claim in claims],
+            "Policyholder": [policyholder.name for policyholder in policyholders],
+            "Policy Type": [policyholder.policy_type for policyholder in policyholders],
+            "Amount": _money(pd.Series([claim.amount for claim in claims], dtype=object)),
+            "Reason": [claim.reason for claim in claims],
+            "Date": [claim.date for claim in claims],
+            "Days Pending": pd.Series([today - claim.date_ordinal for claim in claims], dtype="int64"),
+        })
+
+    def _policyholders_of(self, claims):
+        # one lookup per distinct policyholder, which matters where every lookup is a query
+        found = {}
+        for claim in claims:
+            if claim.policyholder_id not in found:
+                found[claim.policyholder_id] = self.db.policyholders[claim.policyholder_id]
+        return [found[claim.policyholder_id] for claim in claims]
+
+
+def _window(start, end):
+    # day ordinals, so a date and its string form share cached results
+    return (None if start is None else day_ordinal(start)), (None if end is None else day_ordinal(end))
@@ -1,3 +1,11 @@
+import threading
+from array import array
+from functools import lru_cache
+from operator import itemgetter
+
+import numpy as np
+
+
 class RiskAnalyzer:
     RISK_LEVELS = {
         'low': (0, 30),
@@ -13,8 +21,41 @@ class RiskAnalyzer:
         'stakeholder_involvement': 0.10,
         'regulatory_compliance': 0.15
     }
-    
+
+    SCORE_CACHE_MODES = ('memo', 'table', 'off')
+
+    def __init__(self, score_cache='memo', memo_size=65536):
+        # inputs with exactly the six factors, each equal to an integer 1..10 (10^6 possible),
+        # are answered from an LRU memo ('memo') or a table of every score built on first use
+        # ('table', 8 MB); anything else (fractional values, extra keys) takes the exact
+        # computation. Equal numbers divide to the same float, so 5, 5.0 and True == 1
+        # share an entry without changing a bit of the result.
+        if score_cache not in self.SCORE_CACHE_MODES:
+            raise ValueError(f"score_cache must be one of: {', '.join(self.SCORE_CACHE_MODES)}")
+        self.score_cache = score_cache
+        self._factor_values = itemgetter(*self.WEIGHT_FACTORS)
+        self._memo = lru_cache(maxsize=memo_size)(self._score_for_values)
+        self._table = None
+        self._table_lock = threading.Lock()
+        self._table_hits = 0
+        self._fallbacks = 0
+
     def analyze_risk(self, risk_factors):
+        if self.score_cache != 'off':
+            values = self._cacheable_values(risk_factors)
+            if values is not None:
+                if self.score_cache == 'memo':
+                    return self._memo(values)
+                table = self._table if self._table is not None else self._score_table()
+                try:
+                    score = table[_table_index(values)]
+                except TypeError:
+                    # an integral float such as 5.0 can't index the table
+                    pass
+                else:
+                    self._table_hits += 1
+                    return score
+            self._fallbacks += 1
         if not risk_factors:
             raise ValueError("Risk factors cannot be empty")
         self._validate_risk_factors(risk_factors)
@@ -23,7 +64,83 @@ class RiskAnalyzer:
             if factor in risk_factors:
                 weighted_score += (risk_factors[factor] / 10) * 100 * weight
         return round(weighted_score, 2)
+
+    def score_cache_stats(self):
+        if self.score_cache == 'memo':
+            info = self._memo.cache_info()
+            hits, misses, size = info.hits, info.misses, info.currsize
+        else:
+            hits, misses, size = self._table_hits, 0, len(self._table) if self._table is not None else 0
+        lookups = hits + misses + self._fallbacks
+        return {
+            "mode": self.score_cache,
+            "hits": hits,
+            "misses": misses,
+            "fallbacks": self._fallbacks,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "size": size,
+        }
+
+    def _cacheable_values(self, risk_factors):
+        # the factor values in WEIGHT_FACTORS order when they are exactly the six factors,
+        # each equal to an integer 1..10 (so validation can't fail); otherwise None
+        if type(risk_factors) is not dict or len(risk_factors) != len(self.WEIGHT_FACTORS):
+            return None
+        try:
+            values = self._factor_values(risk_factors)
+            if _FACTOR_VALUES.issuperset(values):
+                return values
+        except (KeyError, TypeError):
+            pass
+        return None
+
+    def _score_for_values(self, values):
+        # the arithmetic of analyze_risk, in the same order, so the result is bit-identical
+        weighted_score = 0
+        for value, weight in zip(values, self.WEIGHT_FACTORS.values()):
+            weighted_score += (value / 10) * 100 * weight
+        return round(weighted_score, 2)
+
+    def _score_table(self):
+        if self._table is None:
+            with self._table_lock:
+                if self._table is None:
+                    # index = sum((value - 1) * 10 ** position), last factor fastest; numpy does the
+                    # same column-by-column float arithmetic and Python's round() finishes each score
+                    grid = np.indices((10,) * len(self.WEIGHT_FACTORS)).reshape(len(self.WEIGHT_FACTORS), -1) + 1
+                    weighted = np.zeros(grid.shape[1])
+                    for column, weight in zip(grid, self.WEIGHT_FACTORS.values()):
+                        weighted += (column / 10) * 100 * weight
+                    self._table = array('d', [round(score, 2) for score in weighted.tolist()])
+        return self._table
     
+    def analyze_batch(self, rows):
+        # rows: a sequence of risk factor dicts, or a 2-D array whose columns follow WEIGHT_FACTORS order
+        factors = list(self.WEIGHT_FACTORS)
+        if isinstance(rows, np.ndarray) or (len(rows) and not isinstance(rows[0], dict)):
+            matrix, errors = self._batch_matrix_from_array(rows, factors)
+        else:
+            matrix, errors = self._batch_matrix_from_dicts(rows, factors)
+        n = matrix.shape[0]
+        invalid = ~np.all((matrix >= 1) & (matrix <= 10), axis=1)
+        for i in np.flatnonzero(invalid).tolist():
+            if i not in errors:
+                bad = {f: v for f, v in zip(factors, matrix[i].tolist()) if not 1 <= v <= 10}
+                errors[i] = f"Invalid risk factor values: {bad}. Values must be between 1 and 10"
+        # accumulate column by column in WEIGHT_FACTORS order, matching analyze_risk's float arithmetic
+        weighted = np.zeros(n)
+        for j, weight in enumerate(self.WEIGHT_FACTORS.values()):
+            weighted += (matrix[:, j] / 10) * 100 * weight
+        scores = np.array([round(score, 2) for score in weighted.tolist()], dtype=float)
+        low_max = self.RISK_LEVELS['low'][1]
+        medium_max = self.RISK_LEVELS['medium'][1]
+        levels = np.where(scores < low_max, 'low', np.where(scores < medium_max, 'medium', 'high')).astype(object)
+        if errors:
+            failed = np.fromiter(errors.keys(), dtype=np.intp, count=len(errors))
+            scores[failed] = np.nan
+            levels[failed] = None
+        return {"scores": scores, "risk_levels": levels.tolist(), "errors": errors}
+
     def get_risk_level(self, risk_score):
         if risk_score < self.RISK_LEVELS['low'][1]:
             return 'low'
@@ -62,4 +179,44 @@ class RiskAnalyzer:
         invalid_values = {k: v for k, v in risk_factors.items() 
                          if not isinstance(v, (int, float)) or v < 1 or v > 10}        
         if invalid_values:
-            raise ValueError(f"Invalid risk factor values: {invalid_values}. Values must be between 1 and 10")
\ No newline at end of file
+            raise ValueError(f"Invalid risk factor values: {invalid_values}. Values must be between 1 and 10")
+
+    def _batch_matrix_from_dicts(self, rows, factors):
+        matrix = np.full((len(rows), len(factors)), np.nan)
+        errors = {}
+        for i, row in enumerate(rows):
+            if not row:
+                errors[i] = "Risk factors cannot be empty"
+                continue
+            if not isinstance(row, dict):
+                errors[i] = "Risk factors must be an object"
+                continue
+            missing = [f for f in factors if f not in row]
+            if missing:
+                errors[i] = f"Missing required risk factors: {', '.join(missing)}"
+                continue
+            invalid = {k: v for k, v in row.items()
+                       if not isinstance(v, (int, float)) or v < 1 or v > 10}
+            if invalid:
+                errors[i] = f"Invalid risk factor values: {invalid}. Values must be between 1 and 10"
+                continue
+            matrix[i] = [row[f] for f in factors]
+        return matrix, errors
+
+    def _batch_matrix_from_array(self, rows, factors):
+        try:
+            matrix = np.asarray(rows, dtype=float)
+        except (TypeError, ValueError):
+            raise ValueError("Risk factor rows must be numeric")
+        if matrix.ndim != 2 or matrix.shape[1] != len(factors):
+            raise ValueError(f"Expected a 2-D array with {len(factors)} columns ({', '.join(factors)})")
+        errors = {i: "Risk factor values must be numbers" for i in np.flatnonzero(np.isnan(matrix).any(axis=1)).tolist()}
+        return matrix, errors
+
+
+_FACTOR_VALUES = frozenset(range(1, 11))
+
+
+def _table_index(values):
+    a, b, c, d, e, f = values
+    return (((((a - 1) * 10 + b - 1) * 10 + c - 1) * 10 + d - 1) * 10 + e - 1) * 10 + f - 1
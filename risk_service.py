@@ -0,0 +1,364 @@
+import base64
+import json
+import os
+import zlib
+try:
+    import orjson
+except ImportError:  # optional, the standard encoder is used without it
+    orjson = None
+from db_manager import create_db_manager
+from risk_analyzer import RiskAnalyzer
+from response_cache import ResponseCache
+
+# The risk API's logic, shared by the Flask app (app.py) and the ASGI app (asgi.py). Methods
+# take parsed request data and return response payloads; anything other than a success is
+# raised as a ServiceError carrying its HTTP status.
+
+MAX_PAGE_SIZE = 1000
+EXPORT_BATCH_SIZE = 1000
+
+
+class ServiceError(Exception):
+    def __init__(self, message, status=400, **extra):
+        super().__init__(message)
+        self.status = status
+        self.extra = extra
+
+    def payload(self):
+        return {"status": "error", "message": str(self), **self.extra}
+
+
+class RiskService:
+    def __init__(self, db_manager, risk_analyzer, response_cache, max_bulk_size=100000):
+        self.db_manager = db_manager
+        self.risk_analyzer = risk_analyzer
+        # serialized GET responses per DBManager version, see cached_body
+        self.response_cache = response_cache
+        self.max_bulk_size = max_bulk_size
+
+    # reads
+
+    def export_format(self, args, accept=''):
+        export = args.get('export')
+        if export is None and 'application/x-ndjson' in accept:
+            export = 'ndjson'
+        return export
+
+    def export_risks(self, export, args):
+        # (mimetype, chunks) streaming every matching risk, one DBManager page at a time, so
+        # memory stays flat and the first rows go out before the rest are read; errors after
+        # the first byte can only end the stream early
+        query, fields = parse_risk_query(args)
+        if export not in ('ndjson', 'json'):
+            raise ValueError("export must be 'ndjson' or 'json'")
+        if 'limit' in query:
+            raise ValueError("limit cannot be combined with export")
+        def batches():
+            after = query.pop('after', None)
+            while True:
+                risks, after = self.db_manager.query_risks(limit=EXPORT_BATCH_SIZE, after=after, **query)
+                if fields:
+                    risks = [{field: risk[field] for field in fields if field in risk} for risk in risks]
+                yield risks
+                if after is None:
+                    return
+        if export == 'ndjson':
+            return 'application/x-ndjson', (b"".join(dumps(risk) + b"\n" for risk in risks) for risks in batches())
+        return 'application/json', json_array_stream(batches())
+
+    def risk_list(self, args, query_string):
+        # (cache key, version, build) for GET /api/risks, see cached_body
+        if not args:
+            return ('risks',), self.db_manager.get_version(), \
+                lambda: {"status": "success", "data": self.db_manager.get_all_risks()}
+        query, fields = parse_risk_query(args)
+        def build():
+            risks, next_after = self.db_manager.query_risks(**query)
+            if fields:
+                risks = [{field: risk[field] for field in fields if field in risk} for risk in risks]
+            return {"status": "success", "data": risks, "next_cursor": encode_cursor(next_after)}
+        return ('risks', query_string), self.db_manager.get_version(), build
+
+    def risk(self, risk_id):
+        version = self.db_manager.get_risk_version(risk_id)
+        if version is None:
+            raise ServiceError("Risk not found", 404)
+        def build():
+            risk = self.db_manager.get_risk_by_id(risk_id)
+            if not risk:
+                return None
+            return {"status": "success", "data": risk}
+        return ('risk', risk_id), version, build
+
+    def etag(self, key, version):
+        return f"{version}-{zlib.crc32(repr(key).encode()):08x}"
+
+    def cached_body(self, key, version, build, encode):
+        # the body cached for this version, building and encoding it only on a miss; callers
+        # read the version (and answer If-None-Match) before the data, so a body is never
+        # older than its ETag
+        body = self.response_cache.get(key, version)
+        if body is None:
+            payload = build()
+            if payload is None:
+                # deleted between the version check and the read
+                raise ServiceError("Risk not found", 404)
+            body = encode(payload)
+            self.response_cache.put(key, version, body)
+        return body
+
+    def cache_stats(self):
+        return {"status": "success", "data": {**self.response_cache.stats(),
+                                              "risk_scores": self.risk_analyzer.score_cache_stats()}}
+
+    # writes
+
+    def create_risk(self, data):
+        for field in ('project_name', 'risk_factors'):
+            if field not in data:
+                raise ServiceError(f"Missing required field: {field}")
+        data['risk_score'] = self.risk_analyzer.analyze_risk(data['risk_factors'])
+        risk_id = self.db_manager.create_risk(data)
+        return {"status": "success", "message": "Risk assessment created", "risk_id": risk_id}
+
+    def bulk_factors(self, items, errors):
+        # validates the assessments of a bulk create, adding {index: error} to errors, and
+        # returns the risk factors to score (empty for rows that already failed)
+        if not items:
+            raise ServiceError("Request body must contain at least one assessment")
+        if len(items) > self.max_bulk_size:
+            raise ServiceError(f"At most {self.max_bulk_size} assessments per request", 413)
+        factors = []
+        for i, item in enumerate(items):
+            if i not in errors:
+                if not isinstance(item, dict):
+                    errors[i] = "Each assessment must be a JSON object"
+                else:
+                    missing = [field for field in ('project_name', 'risk_factors') if field not in item]
+                    if missing:
+                        errors[i] = f"Missing required field: {missing[0]}"
+                    elif not isinstance(item['risk_factors'], dict):
+                        errors[i] = "risk_factors must be an object"
+            factors.append(item['risk_factors'] if i not in errors else {})
+        return factors
+
+    def create_risks_scored(self, items, errors, result):
+        # all or nothing: only if no row failed validation or scoring are they written, in a
+        # single create_risks call
+        errors = {**result["errors"], **errors}
+        if errors:
+            raise ServiceError(f"{len(errors)} of {len(items)} assessments are invalid; none were created",
+                               errors=[{"index": i, "error": errors[i]} for i in sorted(errors)],
+                               total=len(items), failed=len(errors))
+        for item, score in zip(items, result["scores"].tolist()):
+            item['risk_score'] = score
+        risk_ids = self.db_manager.create_risks(items)
+        return {
+            "status": "success",
+            "message": f"{len(risk_ids)} risk assessments created",
+            "data": [{"index": i, "risk_id": risk_id} for i, risk_id in enumerate(risk_ids)],
+            "total": len(risk_ids)
+        }
+
+    def create_risks(self, items, errors):
+        factors = self.bulk_factors(items, errors)
+        return self.create_risks_scored(items, errors, self.risk_analyzer.analyze_batch(factors))
+
+    def update_risk(self, risk_id, data):
+        if not self.db_manager.get_risk_by_id(risk_id):
+            raise ServiceError("Risk not found", 404)
+        if 'risk_factors' in data:
+            data['risk_score'] = self.risk_analyzer.analyze_risk(data['risk_factors'])
+        if not self.db_manager.update_risk(risk_id, data):
+            raise ServiceError("Failed to update risk assessment", 500)
+        return {"status": "success", "message": "Risk assessment updated"}
+
+    def delete_risk(self, risk_id):
+        if not self.db_manager.get_risk_by_id(risk_id):
+            raise ServiceError("Risk not found", 404)
+        if not self.db_manager.delete_risk(risk_id):
+            raise ServiceError("Failed to delete risk assessment", 500)
+        return {"status": "success", "message": "Risk assessment deleted"}
+
+    # scoring
+
+    def analyze(self, data):
+        if 'risk_factors' not in data:
+            raise ServiceError("Missing risk_factors")
+        risk_score = self.risk_analyzer.analyze_risk(data['risk_factors'])
+        return {
+            "status": "success",
+            "data": {
+                "risk_score": risk_score,
+                "risk_level": self.risk_analyzer.get_risk_level(risk_score)
+            }
+        }
+
+    def batch_rows(self, items, parse_errors):
+        # each item is either the risk factors themselves or an object wrapping them in
+        # "risk_factors"; returns the rows to score, with failed ones blanked out
+        if not items:
+            raise ServiceError("Request body must contain at least one assessment")
+        rows = []
+        for i, item in enumerate(items):
+            if isinstance(item, dict) and 'risk_factors' in item:
+                item = item['risk_factors']
+            if i not in parse_errors and not isinstance(item, dict):
+                parse_errors[i] = "Each assessment must be a JSON object"
+            rows.append(item if i not in parse_errors else {})
+        return rows
+
+    def analyze_batch_scored(self, parse_errors, result):
+        errors = {**result["errors"], **parse_errors}
+        data = []
+        for i, (score, level) in enumerate(zip(result["scores"].tolist(), result["risk_levels"])):
+            if i in errors:
+                data.append({"index": i, "error": errors[i]})
+            else:
+                data.append({"index": i, "risk_score": score, "risk_level": level})
+        return {
+            "status": "success",
+            "data": data,
+            "total": len(data),
+            "failed": len(errors)
+        }
+
+    def analyze_batch(self, items, parse_errors):
+        rows = self.batch_rows(items, parse_errors)
+        return self.analyze_batch_scored(parse_errors, self.risk_analyzer.analyze_batch(rows))
+
+
+def create_service(env=None):
+    env = os.environ if env is None else env
+    return RiskService(
+        create_db_manager(env),
+        RiskAnalyzer(score_cache=env.get('RISK_SCORE_CACHE', 'memo')),
+        ResponseCache(int(env.get('RESPONSE_CACHE_MB', 64)) * 1024 * 1024),
+        max_bulk_size=int(env.get('MAX_BULK_SIZE', 100000)),
+    )
+
+
+_batch_analyzer = None
+
+
+def score_batch(rows):
+    # RiskAnalyzer.analyze_batch as a plain function, for executors that run it in another process
+    global _batch_analyzer
+    if _batch_analyzer is None:
+        _batch_analyzer = RiskAnalyzer(score_cache='off')
+    return _batch_analyzer.analyze_batch(rows)
+
+
+def json_array_stream(batches):
+    # the same {"status": ..., "data": [...]} document jsonify would produce, in chunks
+    yield b'{"status":"success","data":['
+    first = True
+    for risks in batches:
+        if not risks:
+            continue
+        # encoding the batch as one array and dropping its brackets beats a call per row
+        chunk = dumps(risks)[1:-1]
+        yield chunk if first else b"," + chunk
+        first = False
+    yield b"]}"
+
+
+_compact_encoder = json.JSONEncoder(separators=(',', ':'))
+
+
+def dumps(value):
+    if orjson is not None:
+        try:
+            return orjson.dumps(value)
+        except TypeError:
+            # e.g. integers wider than 64 bits, which only the standard encoder handles
+            pass
+    return _compact_encoder.encode(value).encode()
+
+
+def loads(data):
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except ValueError:
+            # NaN, Infinity or integers wider than 64 bits, which only the standard decoder accepts
+            pass
+    return json.loads(data)
+
+
+def read_json_items(body, content_type):
+    # accepts a JSON array or an NDJSON body; returns the items and {index: error} for
+    # NDJSON lines that aren't valid JSON
+    parse_errors = {}
+    if 'ndjson' in (content_type or '') or not body.lstrip().startswith(b'['):
+        items = []
+        for line in body.splitlines():
+            if not line.strip():
+                continue
+            try:
+                items.append(loads(line))
+            except ValueError:
+                parse_errors[len(items)] = "Invalid JSON"
+                items.append(None)
+    else:
+        items = loads(body)
+    return items, parse_errors
+
+
+def parse_risk_query(args):
+    # limit/after page through the results, min_score/max_score/risk_level/project_prefix
+    # filter them and fields=a,b,... picks the keys returned for each risk
+    query = {}
+    if 'limit' in args:
+        query['limit'] = _int_arg(args, 'limit')
+        if not 1 <= query['limit'] <= MAX_PAGE_SIZE:
+            raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    if args.get('after'):
+        query['after'] = decode_cursor(args['after'])
+    for name in ('min_score', 'max_score'):
+        if name in args:
+            query[name] = _float_arg(args, name)
+    if 'risk_level' in args:
+        level = args['risk_level'].lower()
+        if level not in RiskAnalyzer.RISK_LEVELS:
+            raise ValueError(f"risk_level must be one of: {', '.join(RiskAnalyzer.RISK_LEVELS)}")
+        # the same bands get_risk_level uses: low < 30 <= medium < 70 <= high
+        low, high = RiskAnalyzer.RISK_LEVELS[level]
+        if level != 'low':
+            query['min_score'] = max(low, query.get('min_score', low))
+        if level != 'high':
+            query['below_score'] = high
+    if 'project_prefix' in args:
+        query['project_prefix'] = args['project_prefix']
+    fields = [field for field in args.get('fields', '').split(',') if field]
+    return query, fields
+
+
+def _int_arg(args, name):
+    try:
+        return int(args[name])
+    except ValueError:
+        raise ValueError(f"{name} must be an integer") from None
+
+
+def _float_arg(args, name):
+    try:
+        value = float(args[name])
+    except ValueError:
+        raise ValueError(f"{name} must be a number") from None
+    if value != value or value in (float('inf'), float('-inf')):
+        raise ValueError(f"{name} must be a finite number")
+    return value
+
+
+def encode_cursor(after):
+    if after is None:
+        return None
+    return base64.urlsafe_b64encode(json.dumps(after).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor") from None
@@ -0,0 +1,315 @@
+import argparse
+import mmap
+import os
+import struct
+from array import array
+from collections.abc import MutableMapping
+
+from json_stream import iter_ndjson, iter_object_items, write_ndjson, write_object_items
+from models import date_string_to_ordinal, ordinal_to_date_string
+
+# Binary columnar snapshot of policyholders and claims, opened with mmap so that
+# several worker processes share the same read-only pages.
+#
+# Layout (native byte order, every section 8-byte aligned):
+#   header   magic, version, row counts, string count, then the offset of every column
+#   columns  one fixed-width array per field: "str" fields are uint32 indexes into the
+#            string table, "num" fields are float64 plus a uint8 "was an int" flag,
+#            "date" fields are int32 day ordinals
+#   strings  uint64 offsets (count + 1) followed by the UTF-8 blob
+
+MAGIC = b"CLMSNAP1"
+VERSION = 1
+
+POLICYHOLDER_SCHEMA = (
+    ("id", "str"),
+    ("name", "str"),
+    ("age", "num"),
+    ("policy_type", "str"),
+    ("sum_insured", "num"),
+    ("registration_date", "date"),
+)
+CLAIM_SCHEMA = (
+    ("id", "str"),
+    ("policyholder_id", "str"),
+    ("amount", "num"),
+    ("reason", "str"),
+    ("status", "str"),
+    ("date", "date"),
+)
+_KIND_TYPECODES = {"str": ("I",), "num": ("d", "B"), "date": ("i",)}
+
+
+def _typecodes(schema):
+    return [code for _, kind in schema for code in _KIND_TYPECODES[kind]]
+
+
+_HEADER = struct.Struct("<8sIIQQQ" + "Q" * (len(_typecodes(POLICYHOLDER_SCHEMA)) + len(_typecodes(CLAIM_SCHEMA)) + 2))
+
+
+def _align(offset):
+    return (offset + 7) & ~7
+
+
+class _StringTable:
+    def __init__(self):
+        self.index = {}
+        self.blob = bytearray()
+        self.offsets = array("Q", [0])
+
+    def add(self, value):
+        position = self.index.get(value)
+        if position is None:
+            position = self.index[value] = len(self.index)
+            self.blob += value.encode("utf-8")
+            self.offsets.append(len(self.blob))
+        return position
+
+
+def _encode(schema, records, strings):
+    columns = [array(code) for code in _typecodes(schema)]
+    count = 0
+    for record in records:
+        i = 0
+        for field, kind in schema:
+            value = record[field]
+            if kind == "str":
+                columns[i].append(strings.add(value))
+                i += 1
+            elif kind == "num":
+                columns[i].append(value)
+                columns[i + 1].append(isinstance(value, int))
+                i += 2
+            else:
+                columns[i].append(date_string_to_ordinal(value))
+                i += 1
+        count += 1
+    return count, columns
+
+
+def write_snapshot(fp, policyholder_records, claim_records):
+    # fp must be a binary file; records are dicts as produced by to_dict()
+    strings = _StringTable()
+    ph_count, ph_columns = _encode(POLICYHOLDER_SCHEMA, policyholder_records, strings)
+    claim_count, claim_columns = _encode(CLAIM_SCHEMA, claim_records, strings)
+    sections = ph_columns + claim_columns + [strings.offsets, strings.blob]
+    offsets = []
+    position = _align(_HEADER.size)
+    for section in sections:
+        offsets.append(position)
+        size = len(section) * (section.itemsize if isinstance(section, array) else 1)
+        position = _align(position + size)
+    fp.write(_HEADER.pack(MAGIC, VERSION, 0, ph_count, claim_count, len(strings.index), *offsets))
+    written = _HEADER.size
+    for offset, section in zip(offsets, sections):
+        fp.write(b"\0" * (offset - written))
+        data = section.tobytes() if isinstance(section, array) else bytes(section)
+        fp.write(data)
+        written = offset + len(data)
+
+
+class Snapshot:
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        view = self._view = memoryview(self._mmap)
+        header = _HEADER.unpack_from(view, 0)
+        magic, version, _, ph_count, claim_count, string_count = header[:6]
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} claims snapshot")
+        offsets = list(header[6:])
+        string_offsets = view[offsets[-2]:offsets[-2] + 8 * (string_count + 1)].cast("Q")
+        blob = view[offsets[-1]:]
+        self.strings = _Strings(string_offsets, blob)
+        ph_codes = _typecodes(POLICYHOLDER_SCHEMA)
+        self.policyholders = SnapshotTable(POLICYHOLDER_SCHEMA, ph_count, view, offsets[:len(ph_codes)], self.strings)
+        self.claims = SnapshotTable(CLAIM_SCHEMA, claim_count, view, offsets[len(ph_codes):-2], self.strings)
+
+    def close(self):
+        self.policyholders.release()
+        self.claims.release()
+        self.strings.release()
+        self._view.release()
+        self._mmap.close()
+        self._file.close()
+
+
+class _Strings:
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+
+    def __getitem__(self, index):
+        return str(self.blob[self.offsets[index]:self.offsets[index + 1]], "utf-8")
+
+    def release(self):
+        self.offsets.release()
+        self.blob.release()
+
+
+class SnapshotTable:
+    def __init__(self, schema, count, view, offsets, strings):
+        self.schema = schema
+        self.count = count
+        self.strings = strings
+        self.columns = []
+        for code, offset in zip(_typecodes(schema), offsets):
+            size = struct.calcsize(code)
+            self.columns.append(view[offset:offset + size * count].cast(code))
+
+    def record_id(self, row):
+        return self.strings[self.columns[0][row]]
+
+    def record(self, row):
+        record = {}
+        i = 0
+        for field, kind in self.schema:
+            if kind == "str":
+                record[field] = self.strings[self.columns[i][row]]
+                i += 1
+            elif kind == "num":
+                value = self.columns[i][row]
+                record[field] = int(value) if self.columns[i + 1][row] else value
+                i += 2
+            else:
+                record[field] = ordinal_to_date_string(self.columns[i][row])
+                i += 1
+        return record
+
+    def release(self):
+        for column in self.columns:
+            column.release()
+
+
+class SnapshotRecords(MutableMapping):
+    # id -> model mapping over a snapshot table; rows become model objects on first access
+    # and changes live in an overlay, so opening costs nothing per row
+    def __init__(self, table, factory):
+        self._table = table
+        self._factory = factory
+        self._base_count = table.count if table is not None else 0
+        self._rows = None  # id -> row, built on the first keyed lookup
+        self._overlay = {}  # materialized or changed records by id
+        self._deleted = set()  # snapshot ids that were removed
+        self._new = {}  # ids that are not in the snapshot, in insertion order
+
+    def _row_map(self):
+        if self._rows is None:
+            self._rows = {self._table.record_id(row): row for row in range(self._base_count)}
+        return self._rows
+
+    def _in_base(self, key):
+        return self._base_count > 0 and key in self._row_map()
+
+    def raw_items(self):
+        for key in self:
+            item = self._overlay.get(key)
+            yield key, item.to_dict() if item is not None else self._table.record(self._rows[key])
+
+    def materialized_count(self):
+        return len(self._overlay)
+
+    def __getitem__(self, key):
+        item = self._overlay.get(key)
+        if item is not None:
+            return item
+        if key in self._deleted or not self._in_base(key):
+            raise KeyError(key)
+        item = self._overlay[key] = self._factory(self._table.record(self._rows[key]))
+        return item
+
+    def __setitem__(self, key, value):
+        if self._in_base(key):
+            self._deleted.discard(key)
+        else:
+            self._new[key] = None
+        self._overlay[key] = value
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self._overlay.pop(key, None)
+        if key in self._new:
+            del self._new[key]
+        else:
+            self._deleted.add(key)
+
+    def __contains__(self, key):
+        if key in self._new:
+            return True
+        return key not in self._deleted and self._in_base(key)
+
+    def __iter__(self):
+        if self._base_count:
+            self._row_map()
+            for row in range(self._base_count):
+                key = self._table.record_id(row)
+                if key not in self._deleted:
+                    yield key
+        yield from list(self._new)
+
+    def __len__(self):
+        return self._base_count - len(self._deleted) + len(self._new)
+
+    def clear(self):
+        self._base_count = 0
+        self._rows = None
+        self._overlay.clear()
+        self._deleted.clear()
+        self._new.clear()
+
+
+def _read_records(data_dir, collection, data_format):
+    path = os.path.join(data_dir, f"{collection}.{data_format}")
+    if not os.path.exists(path):
+        return
+    with open(path, "r") as f:
+        if data_format == "ndjson":
+            yield from iter_ndjson(f)
+        else:
+            for _, record in iter_object_items(f):
+                yield record
+
+
+def pack(data_dir, output, data_format="json"):
+    with open(output, "wb") as fp:
+        write_snapshot(fp, _read_records(data_dir, "policyholders", data_format),
+                       _read_records(data_dir, "claims", data_format))
+
+
+def unpack(path, data_dir, data_format="json"):
+    snapshot = Snapshot(path)
+    try:
+        for collection in ("policyholders", "claims"):
+            table = getattr(snapshot, collection)
+            records = (table.record(row) for row in range(table.count))
+            with open(os.path.join(data_dir, f"{collection}.{data_format}"), "w") as f:
+                if data_format == "ndjson":
+                    write_ndjson(f, records)
+                else:
+                    write_object_items(f, ((record["id"], record) for record in records), indent=4)
+    finally:
+        snapshot.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert between the JSON data files and the binary snapshot")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    pack_parser = subparsers.add_parser("pack", help="build a snapshot from policyholders/claims files")
+    pack_parser.add_argument("data_dir")
+    pack_parser.add_argument("output", nargs="?", help="defaults to <data_dir>/data.snap")
+    pack_parser.add_argument("--format", choices=["json", "ndjson"], default="json")
+    unpack_parser = subparsers.add_parser("unpack", help="write policyholders/claims files from a snapshot")
+    unpack_parser.add_argument("snapshot")
+    unpack_parser.add_argument("data_dir")
+    unpack_parser.add_argument("--format", choices=["json", "ndjson"], default="json")
+    args = parser.parse_args()
+    if args.command == "pack":
+        pack(args.data_dir, args.output or os.path.join(args.data_dir, "data.snap"), args.format)
+    else:
+        unpack(args.snapshot, args.data_dir, args.format)
+
+
+if __name__ == '__main__':
+    main()
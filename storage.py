@@ -0,0 +1,628 @@
+import json
+import os
+import sqlite3
+import stat
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from collections.abc import ItemsView, MutableMapping, ValuesView
+from datetime import datetime, timedelta
+
+from models import Policyholder, Claim, date_string_to_ordinal, ordinal_to_date_string
+from json_stream import LazyRecords, iter_ndjson, iter_object_items, write_ndjson, write_object_items
+from snapshot import Snapshot, SnapshotRecords, write_snapshot
+
+FACTORIES = {"policyholders": Policyholder.from_dict, "claims": Claim.from_dict}
+
+
+class StorageBackend(ABC):
+    # where Database keeps its records. Database does the bookkeeping (validation, indexes,
+    # aggregates) and calls commit() once per mutation. Backends with pushdown = True answer
+    # the query methods themselves, under the same names as on Database.
+    pushdown = False
+    # whether records are materialized on demand, so indexes are built on first use
+    lazy = False
+
+    @abstractmethod
+    def records(self, collection):
+        # the id -> model mapping Database uses for "policyholders" / "claims"
+        ...
+
+    @abstractmethod
+    def load(self, db):
+        ...
+
+    @abstractmethod
+    def commit(self, db, op, payload):
+        ...
+
+    def mark_dirty(self, collection):
+        pass
+
+    def save(self, db):
+        return True
+
+    def flush(self, db):
+        return True
+
+    def is_dirty(self):
+        return False
+
+    def changed_on_disk(self):
+        return False
+
+    def close(self):
+        pass
+
+
+class FileBackend(StorageBackend):
+    # everything in memory, mirrored to the data files (and the journal) in data_dir
+    JOURNAL_FILE = "journal.log"
+    # "json" is the original pretty-printed object keyed by id; "ndjson" holds one record per line;
+    # "snapshot" is the binary memory-mapped columnar file described in snapshot.py
+    DATA_FILES = {
+        "json": {"policyholders": "policyholders.json", "claims": "claims.json"},
+        "ndjson": {"policyholders": "policyholders.ndjson", "claims": "claims.ndjson"},
+        "snapshot": {"snapshot": "data.snap"},
+    }
+
+    def __init__(self, data_dir="./data", data_format="json", journal=False, compact_threshold=10000,
+                 fsync=True, lazy=False):
+        if data_format not in self.DATA_FILES:
+            raise ValueError(f"Unknown data format: {data_format}")
+        self.data_dir = data_dir
+        self.data_format = data_format
+        # lazy mode keeps loaded records as parsed dicts and builds model objects on first access;
+        # a mapped snapshot is always read lazily
+        self.lazy = lazy or data_format == "snapshot"
+        # journal mode appends one record per mutation instead of rewriting the snapshot files
+        self.journal = journal
+        self.compact_threshold = compact_threshold
+        self.fsync = fsync
+        self._snapshot = None
+        self._journal_fp = None
+        self._journal_entries = 0
+        # collections whose snapshot file is behind memory
+        self._dirty = set()
+        # (mtime, size) of the data files as last loaded or written by this instance
+        self._disk_signature = None
+        if not os.path.exists(data_dir):
+            os.makedirs(data_dir)
+
+    def records(self, collection):
+        if self.data_format == "snapshot":
+            return SnapshotRecords(None, FACTORIES[collection])
+        return LazyRecords(FACTORIES[collection]) if self.lazy else {}
+
+    def load(self, db):
+        if self.data_format == "snapshot":
+            self._open_snapshot(db)
+        else:
+            for collection in ("policyholders", "claims"):
+                self._load_collection(collection, getattr(db, collection))
+        self._dirty.clear()
+        self._replay_journal(db)
+        self._disk_signature = self._read_disk_signature()
+
+    def commit(self, db, op, payload):
+        if not self.journal:
+            return self.save(db)
+        try:
+            if self._journal_fp is None:
+                self._journal_fp = open(self._journal_path(), "a")
+            record = {"op": op, **payload}
+            self._journal_fp.write(json.dumps(record) + "\n")
+            self._journal_fp.flush()
+            if self.fsync:
+                os.fsync(self._journal_fp.fileno())
+            self._journal_entries += 1
+            self._disk_signature = self._read_disk_signature()
+        except Exception as e:
+            print(f"Error writing journal: {e}")
+            return False
+        if self._journal_entries >= self.compact_threshold:
+            return self.save(db)
+        return True
+
+    def mark_dirty(self, collection):
+        self._dirty.add(collection)
+
+    def save(self, db):
+        # only collections that changed since the last save are rewritten
+        try:
+            if self.data_format == "snapshot":
+                if self._dirty:
+                    self._write_atomic(self.DATA_FILES["snapshot"]["snapshot"],
+                                       lambda f: self._write_snapshot(f, db), binary=True)
+                    self._dirty.clear()
+            for collection in ("policyholders", "claims"):
+                if collection in self._dirty:
+                    items = self._record_items(db, collection)
+                    self._write_atomic(self.DATA_FILES[self.data_format][collection],
+                                       lambda f: self._write_records(f, items))
+                    self._dirty.discard(collection)
+            # the snapshot now contains everything the journal recorded
+            self._reset_journal()
+            self._disk_signature = self._read_disk_signature()
+            return True
+        except Exception as e:
+            print(f"Error saving data: {e}")
+            return False
+
+    def flush(self, db):
+        # journaled mutations are already durable; otherwise write whatever is still dirty
+        if self.journal or not self._dirty:
+            return True
+        return self.save(db)
+
+    def is_dirty(self):
+        return bool(self._dirty)
+
+    def changed_on_disk(self):
+        # true when another process rewrote the data files since we last touched them
+        return self._read_disk_signature() != self._disk_signature
+
+    def close(self):
+        if self._journal_fp is not None:
+            self._journal_fp.close()
+            self._journal_fp = None
+
+    def _replay_journal(self, db):
+        journal_file = self._journal_path()
+        if not os.path.exists(journal_file):
+            return
+        entries = 0
+        # byte offset just past the last complete record
+        good = 0
+        with open(journal_file, "rb") as f:
+            for line in f:
+                # a record is acknowledged only once its newline is on disk
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # torn write from a crash mid-append, nothing after it was acknowledged
+                    break
+                db._apply(record)
+                entries += 1
+                good += len(line)
+            size = f.seek(0, os.SEEK_END)
+        if size > good:
+            # cut the torn tail off, or the next append would continue its unterminated line
+            # and that record, with everything after it, would be lost on the following replay
+            with open(journal_file, "r+b") as f:
+                f.truncate(good)
+                if self.fsync:
+                    os.fsync(f.fileno())
+        self._journal_entries = entries
+        if not self.journal and entries:
+            # fold a journal left by a journaled run into the snapshot files
+            self.save(db)
+
+    def _load_collection(self, collection, target):
+        path = os.path.join(self.data_dir, self.DATA_FILES[self.data_format][collection])
+        if not os.path.exists(path):
+            return
+        factory = FACTORIES[collection]
+        with open(path, "r") as f:
+            if self.data_format == "ndjson":
+                records = ((record["id"], record) for record in iter_ndjson(f))
+            else:
+                records = iter_object_items(f)
+            for record_id, record in records:
+                if self.lazy:
+                    target.set_raw(record_id, record)
+                else:
+                    target[record_id] = factory(record)
+
+    def _open_snapshot(self, db):
+        path = os.path.join(self.data_dir, self.DATA_FILES["snapshot"]["snapshot"])
+        if self._snapshot is not None:
+            # records already handed out are independent objects, so the old mapping can go
+            self._snapshot.close()
+            self._snapshot = None
+        if os.path.exists(path):
+            self._snapshot = Snapshot(path)
+        db.policyholders = SnapshotRecords(self._snapshot and self._snapshot.policyholders, Policyholder.from_dict)
+        db.claims = SnapshotRecords(self._snapshot and self._snapshot.claims, Claim.from_dict)
+
+    def _write_snapshot(self, f, db):
+        write_snapshot(f, (record for _, record in self._record_items(db, "policyholders")),
+                       (record for _, record in self._record_items(db, "claims")))
+
+    def _write_records(self, f, items):
+        if self.data_format == "ndjson":
+            write_ndjson(f, (record for _, record in items))
+        else:
+            write_object_items(f, items, indent=4)
+
+    def _record_items(self, db, collection):
+        records = getattr(db, collection)
+        if isinstance(records, (LazyRecords, SnapshotRecords)):
+            return records.raw_items()
+        return ((record_id, record.to_dict()) for record_id, record in records.items())
+
+    def _reset_journal(self):
+        self.close()
+        journal_file = self._journal_path()
+        if os.path.exists(journal_file):
+            os.remove(journal_file)
+        self._journal_entries = 0
+
+    def _journal_path(self):
+        return os.path.join(self.data_dir, self.JOURNAL_FILE)
+
+    def _read_disk_signature(self):
+        signature = []
+        for filename in (*self.DATA_FILES[self.data_format].values(), self.JOURNAL_FILE):
+            try:
+                info = os.stat(os.path.join(self.data_dir, filename))
+                signature.append((info.st_mtime_ns, info.st_size))
+            except FileNotFoundError:
+                signature.append(None)
+        return tuple(signature)
+
+    def _write_atomic(self, filename, write, binary=False):
+        # write to a temp file in the same directory and rename it over the old one,
+        # so readers never see a half-written data file
+        fd, tmp_path = tempfile.mkstemp(dir=self.data_dir, prefix=f".{filename}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb" if binary else "w") as f:
+                write(f)
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+            target = os.path.join(self.data_dir, filename)
+            # mkstemp creates the file 0600; keep the permissions the data file had
+            os.chmod(tmp_path, stat.S_IMODE(os.stat(target).st_mode) if os.path.exists(target) else 0o644)
+            os.replace(tmp_path, target)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS policyholders (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    age,
+    policy_type TEXT,
+    sum_insured,
+    registration_date TEXT
+);
+CREATE TABLE IF NOT EXISTS claims (
+    id TEXT PRIMARY KEY,
+    policyholder_id TEXT,
+    amount,
+    reason TEXT,
+    status TEXT,
+    date TEXT
+);
+CREATE INDEX IF NOT EXISTS claims_policyholder_id ON claims (policyholder_id);
+CREATE INDEX IF NOT EXISTS claims_status ON claims (status);
+CREATE INDEX IF NOT EXISTS claims_date ON claims (date);
+CREATE INDEX IF NOT EXISTS claims_amount ON claims (amount DESC, id);
+CREATE INDEX IF NOT EXISTS claims_pending_date ON claims (date, id) WHERE status = 'Pending';
+CREATE INDEX IF NOT EXISTS policyholders_policy_type ON policyholders (policy_type);
+"""
+# numeric columns are declared without a type so ints and floats come back as they went in;
+# dates are "%Y-%m-%d" text, which sorts and groups (substr(date, 1, 7)) by month correctly
+SQLITE_COLUMNS = {
+    "policyholders": ("id", "name", "age", "policy_type", "sum_insured", "registration_date"),
+    "claims": ("id", "policyholder_id", "amount", "reason", "status", "date"),
+}
+
+
+class SQLiteBackend(StorageBackend):
+    # records live in an SQLite database in WAL mode; Database reads them on demand and its
+    # queries and report aggregates run as indexed SQL instead of in-memory indexes
+    pushdown = True
+    lazy = True
+
+    def __init__(self, path="./data/claims.db", synchronous="NORMAL"):
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self.path = path
+        # Database serializes access with its own lock, and Streamlit sessions run on several threads
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(f"PRAGMA synchronous={synchronous}")
+        self.conn.executescript(SQLITE_SCHEMA)
+        self.lock = threading.RLock()
+        self.policyholders = SQLiteRecords(self.conn, "policyholders", SQLITE_COLUMNS["policyholders"],
+                                           Policyholder.from_dict)
+        self.claims = SQLiteRecords(self.conn, "claims", SQLITE_COLUMNS["claims"], Claim.from_dict)
+        self.aggregates = SQLiteAggregates(self)
+        self._data_version = self._read_data_version()
+
+    def records(self, collection):
+        return getattr(self, collection)
+
+    def load(self, db):
+        # nothing to read up front; records are fetched as they are used
+        pass
+
+    def commit(self, db, op, payload):
+        # the mapping writes for this mutation already ran inside the current transaction
+        try:
+            with self.lock:
+                self.conn.commit()
+                self.aggregates.invalidate()
+            return True
+        except sqlite3.Error as e:
+            print(f"Error committing to SQLite: {e}")
+            self.conn.rollback()
+            return False
+
+    def save(self, db):
+        try:
+            with self.lock:
+                self.conn.commit()
+                self.aggregates.invalidate()
+                self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            return True
+        except sqlite3.Error as e:
+            print(f"Error saving data: {e}")
+            return False
+
+    def flush(self, db):
+        if not self.conn.in_transaction:
+            return True
+        return self.commit(db, None, None)
+
+    def is_dirty(self):
+        return self.conn.in_transaction
+
+    def changed_on_disk(self):
+        # data_version moves when another connection commits, never for our own commits
+        with self.lock:
+            data_version = self._read_data_version()
+            if data_version == self._data_version:
+                return False
+            self._data_version = data_version
+            self.aggregates.invalidate()
+            return True
+
+    def close(self):
+        self.conn.close()
+
+    def get_claims_for_policyholder(self, policyholder_id):
+        return list(self.claims.select("WHERE policyholder_id = ?", (policyholder_id,)))
+
+    def count_claims_for_policyholder(self, policyholder_id):
+        return self._scalar("SELECT COUNT(*) FROM claims WHERE policyholder_id = ?", (policyholder_id,))
+
+    def has_claims(self, policyholder_id):
+        return self._scalar("SELECT EXISTS (SELECT 1 FROM claims WHERE policyholder_id = ?)", (policyholder_id,)) == 1
+
+    def get_claims_by_status(self, status):
+        return list(self.claims.select("WHERE status = ?", (status,)))
+
+    def count_claims_by_status(self, status):
+        return self._scalar("SELECT COUNT(*) FROM claims WHERE status = ?", (status,))
+
+    def get_policy_types(self):
+        # first-seen order, like the in-memory index
+        rows = self.conn.execute("SELECT policy_type FROM policyholders GROUP BY policy_type ORDER BY MIN(rowid)")
+        return [row[0] for row in rows]
+
+    def get_policyholders_by_type(self, policy_type):
+        return list(self.policyholders.select("WHERE policy_type = ?", (policy_type,)))
+
+    def get_claims_by_policy_type(self, policy_type):
+        return self._joined_claims("WHERE p.policy_type = ? ORDER BY p.rowid, c.rowid", (policy_type,))
+
+    def claims_between(self, start=None, end=None):
+        # start and end are day ordinals or None, as Database.claims_between passes them
+        where, params = _date_range(start, end, "date")
+        columns = ", ".join(SQLITE_COLUMNS["claims"])
+        rows = self.conn.execute(f"SELECT {columns} FROM claims WHERE {where} ORDER BY date, id", params)
+        return [Claim.from_dict(row) for row in rows]
+
+    def claim_date_range(self):
+        # (first, last) day ordinals, or None without claims; one MIN or MAX per query is read off
+        # either end of claims_date, where both together would scan it
+        first, last = self.conn.execute(
+            "SELECT (SELECT MIN(date) FROM claims), (SELECT MAX(date) FROM claims)").fetchone()
+        return (date_string_to_ordinal(first), date_string_to_ordinal(last)) if first else None
+
+    def aggregates_between(self, start=None, end=None):
+        return SQLiteAggregates(self, start, end)
+
+    def top_claims(self, n, start=None, end=None):
+        # walks claims_amount from the top and stops after n rows; with a date range the
+        # planner may read the range off claims_date and sort it instead
+        where, params = _date_range(start, end, "c.date")
+        return self._joined_claims(f"WHERE {where} ORDER BY c.amount DESC, c.id LIMIT ?", (*params, n))
+
+    def pending_claims(self, limit=None, start=None, end=None):
+        # read in order from the partial index claims_pending_date; left to itself the planner
+        # picks claims_status and sorts every pending claim
+        where, params = _date_range(start, end, "c.date")
+        return self._joined_claims(f"WHERE c.status = 'Pending' AND {where} ORDER BY c.date, c.id LIMIT ?",
+                                   (*params, -1 if limit is None else limit), index="claims_pending_date")
+
+    def _joined_claims(self, clauses, params, index=None):
+        # claims joined to their policyholder, so claims whose policyholder is gone drop out
+        columns = ", ".join(f"c.{column}" for column in SQLITE_COLUMNS["claims"])
+        indexed_by = f" INDEXED BY {index}" if index else ""
+        rows = self.conn.execute(
+            f"SELECT {columns} FROM claims c{indexed_by} JOIN policyholders p ON p.id = c.policyholder_id {clauses}",
+            params)
+        return [Claim.from_dict(row) for row in rows]
+
+    def _scalar(self, sql, params=()):
+        return self.conn.execute(sql, params).fetchone()[0]
+
+    def _read_data_version(self):
+        return self._scalar("PRAGMA data_version")
+
+
+def _date_range(start, end, column):
+    # a WHERE condition for dates from start to end (day ordinals, None for an open side)
+    clauses, params = [], []
+    for op, ordinal in ((">=", start), ("<=", end)):
+        if ordinal is not None:
+            clauses.append(f"{column} {op} ?")
+            params.append(ordinal_to_date_string(ordinal))
+    return " AND ".join(clauses) or "1", params
+
+
+class SQLiteRecords(MutableMapping):
+    # id -> model mapping over one table; every read is a query and every write an upsert
+    # in the connection's current transaction (SQLiteBackend.commit ends it)
+    def __init__(self, conn, table, columns, factory):
+        self._conn = conn
+        self._table = table
+        self._factory = factory
+        column_list = ", ".join(columns)
+        self._columns = columns
+        self._select = f"SELECT {column_list} FROM {table}"
+        # an upsert rather than INSERT OR REPLACE keeps the rowid, and with it the insertion order
+        updates = ", ".join(f"{column} = excluded.{column}" for column in columns[1:])
+        self._upsert = (f"INSERT INTO {table} ({column_list}) VALUES ({', '.join('?' * len(columns))}) "
+                        f"ON CONFLICT (id) DO UPDATE SET {updates}")
+
+    def select(self, where="", params=()):
+        for row in self._conn.execute(f"{self._select} {where} ORDER BY rowid", params):
+            yield self._factory(row)
+
+    def __getitem__(self, key):
+        row = self._conn.execute(f"{self._select} WHERE id = ?", (key,)).fetchone()
+        if row is None:
+            raise KeyError(key)
+        return self._factory(row)
+
+    def __setitem__(self, key, value):
+        record = value.to_dict()
+        self._conn.execute(self._upsert, tuple(record[column] for column in self._columns))
+
+    def put_many(self, values):
+        # one executemany for a whole batch of models
+        records = (value.to_dict() for value in values)
+        self._conn.executemany(self._upsert, (tuple(record[column] for column in self._columns) for record in records))
+
+    def __delitem__(self, key):
+        if self._conn.execute(f"DELETE FROM {self._table} WHERE id = ?", (key,)).rowcount == 0:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        return self._conn.execute(f"SELECT 1 FROM {self._table} WHERE id = ?", (key,)).fetchone() is not None
+
+    def __iter__(self):
+        for row in self._conn.execute(f"SELECT id FROM {self._table} ORDER BY rowid"):
+            yield row[0]
+
+    def __len__(self):
+        return self._conn.execute(f"SELECT COUNT(*) FROM {self._table}").fetchone()[0]
+
+    def values(self):
+        return _SQLiteValues(self)
+
+    def items(self):
+        return _SQLiteItems(self)
+
+    def clear(self):
+        self._conn.execute(f"DELETE FROM {self._table}")
+
+
+class _SQLiteValues(ValuesView):
+    # one table scan instead of a lookup per key
+    def __iter__(self):
+        return self._mapping.select()
+
+
+class _SQLiteItems(ItemsView):
+    def __iter__(self):
+        for record in self._mapping.select():
+            yield record.id, record
+
+
+class SQLiteAggregates:
+    # the ClaimAggregates query API answered with GROUP BY queries; each grouping is computed
+    # once and cached until the next commit (or a commit by another connection). Given a date
+    # range (day ordinals), only claims dated in it are counted
+    def __init__(self, backend, start=None, end=None):
+        self.backend = backend
+        self._cache = {}
+        self._claims = "claims"
+        if start is not None or end is not None:
+            # dates are inlined, as formatted by ordinal_to_date_string, so every query below keeps
+            # its own parameters. The first-seen orderings go by a rowid numbered in claims_between
+            # order, the order in-memory aggregates over a date range are built in
+            where = " AND ".join(f"date {op} '{ordinal_to_date_string(ordinal)}'"
+                                 for op, ordinal in ((">=", start), ("<=", end)) if ordinal is not None)
+            self._claims = f"(SELECT ROW_NUMBER() OVER (ORDER BY date, id) AS rowid, * FROM claims WHERE {where})"
+
+    def invalidate(self):
+        self._cache.clear()
+
+    def monthly_totals(self):
+        return self._rows("monthly_totals",
+                          f"SELECT substr(date, 1, 7) AS month, COUNT(*), SUM(amount) FROM {self._claims} "
+                          "GROUP BY month ORDER BY month")
+
+    def policy_type_totals(self):
+        # claims whose policyholder is gone drop out of the join, as they do in ClaimAggregates
+        return self._rows("policy_type_totals",
+                          f"SELECT p.policy_type, COUNT(*), SUM(c.amount) FROM {self._claims} c "
+                          "JOIN policyholders p ON p.id = c.policyholder_id "
+                          "GROUP BY p.policy_type ORDER BY MIN(c.rowid)")
+
+    def policy_type_status_count(self, policy_type, status):
+        counts = self._groups("by_policy_type_status",
+                              f"SELECT p.policy_type, c.status, COUNT(*) FROM {self._claims} c "
+                              "JOIN policyholders p ON p.id = c.policyholder_id GROUP BY p.policy_type, c.status", width=2)
+        return counts.get((policy_type, status), 0)
+
+    def status_totals(self, status):
+        totals = self._groups("by_status",
+                              f"SELECT status, COUNT(*), SUM(amount) FROM {self._claims} GROUP BY status")
+        return totals.get(status, (0, 0))
+
+    def policyholder_totals(self, policyholder_id):
+        totals = self._groups("by_policyholder",
+                              f"SELECT policyholder_id, COUNT(*), SUM(amount) FROM {self._claims} "
+                              "GROUP BY policyholder_id")
+        return totals.get(policyholder_id, (0, 0))
+
+    def policyholder_claims_since(self, policyholder_id, since_ordinal):
+        # claims dated strictly after the `since_ordinal` day
+        counts = self._groups(("since", since_ordinal),
+                              f"SELECT policyholder_id, COUNT(*) FROM {self._claims} WHERE date > ? "
+                              "GROUP BY policyholder_id",
+                              (ordinal_to_date_string(since_ordinal),))
+        return counts.get(policyholder_id, 0)
+
+    def policyholder_claims_last_year(self, policyholder_id, now=None):
+        now = now or datetime.now()
+        return self.policyholder_claims_since(policyholder_id, (now - timedelta(days=365)).toordinal())
+
+    def verify(self, db):
+        # nothing is kept incrementally, so there is nothing to drift
+        return []
+
+    def _rows(self, key, sql, params=()):
+        with self.backend.lock:
+            rows = self._cache.get(key)
+            if rows is None:
+                rows = self._cache[key] = [tuple(row) for row in self.backend.conn.execute(sql, params)]
+            return rows
+
+    def _groups(self, key, sql, params=(), width=1):
+        # rows of (*group key, *values) as a dict, where the group key is the first `width`
+        # columns; single-column keys and values are unwrapped
+        with self.backend.lock:
+            groups = self._cache.get(key)
+            if groups is None:
+                groups = {}
+                for row in self.backend.conn.execute(sql, params):
+                    row = tuple(row)
+                    group, values = row[:width], row[width:]
+                    groups[group[0] if width == 1 else group] = values[0] if len(values) == 1 else values
+                self._cache[key] = groups
+            return groups
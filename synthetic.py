@@ -0,0 +1,174 @@
+import argparse
+import csv
+import os
+import sys
+from datetime import date
+
+import numpy as np
+
+from bulk import FIELDS
+from json_stream import write_ndjson, write_object_items
+from models import ordinal_to_date_string
+from snapshot import write_snapshot
+
+# Seeded synthetic policyholders and claims for load testing, at anything from thousands to
+# tens of millions of records:
+#   python synthetic.py --policyholders 100000 --claims 1000000 --data-dir ./bench-data
+# The same seed and end date always give the same records. A few policyholders account for
+# many of the claims, claim dates spread from each policyholder's registration up to the end
+# date, and recent claims are more often still pending.
+
+POLICY_TYPES = ("Health", "Vehicle", "Life")
+POLICY_TYPE_WEIGHTS = (0.5, 0.35, 0.15)
+# median sum insured and median claim amount per policy type
+MEDIAN_SUM_INSURED = (500000, 300000, 2000000)
+MEDIAN_CLAIM_AMOUNT = (25000, 40000, 250000)
+REASONS = (
+    ("Medical Treatment", "Surgery", "Hospitalization", "Diagnostics", "Maternity"),
+    ("Car Accident", "Theft", "Windscreen Damage", "Flood Damage", "Third Party Liability"),
+    ("Critical Illness", "Death Benefit", "Disability", "Terminal Illness"),
+)
+FIRST_NAMES = ("John", "Jane", "Varun", "Lisa", "Amit", "Maria", "Chen", "Fatima", "Liam", "Olivia", "Noah",
+               "Priya", "Kenji", "Sofia", "Omar", "Grace", "Ivan", "Zara", "Lucas", "Aisha")
+LAST_NAMES = ("Smith", "Abhram", "Dhawan", "Ray", "Patel", "Garcia", "Wang", "Khan", "Brown", "Jones",
+              "Sharma", "Tanaka", "Rossi", "Hassan", "Lee", "Ivanov", "Okafor", "Silva", "Martin", "Nair")
+CLAIM_STATUSES = ("Pending", "Approved", "Rejected")
+# status mix for claims settled long ago and for claims filed in the last RECENT_DAYS
+SETTLED_STATUS_WEIGHTS = (0.03, 0.67, 0.30)
+RECENT_STATUS_WEIGHTS = (0.55, 0.30, 0.15)
+RECENT_DAYS = 90
+# records are produced this many at a time, so memory stays flat at any scale
+CHUNK_SIZE = 100000
+DATA_FORMATS = ("json", "ndjson", "snapshot", "csv")
+
+
+class SyntheticData:
+    def __init__(self, policyholders, claims, seed=0, end_date=None, years=5):
+        self.policyholder_count = policyholders
+        self.claim_count = claims if policyholders else 0
+        self.seed = seed
+        self.end_ordinal = (end_date or date.today()).toordinal()
+        self.start_ordinal = self.end_ordinal - int(years * 365.25)
+        # each part of the data draws from its own stream, so changing the claim count
+        # leaves the policyholders as they were
+        rng = self._rng(0)
+        n = policyholders
+        # the few per-policyholder columns that claims depend on, kept compact
+        self._policy_type = rng.choice(len(POLICY_TYPES), size=n, p=POLICY_TYPE_WEIGHTS).astype(np.int8)
+        sum_insured = np.array(MEDIAN_SUM_INSURED)[self._policy_type] * rng.lognormal(0.0, 0.6, n)
+        self._sum_insured = (np.clip(np.round(sum_insured, -5), 100000, 10000000)).astype(np.int32)
+        # registrations spread evenly, so claim volume grows over the years like a growing book
+        self._registration = rng.integers(self.start_ordinal, self.end_ordinal + 1, n).astype(np.int32)
+        # a heavy-tailed claim propensity: most policyholders claim rarely, a few very often
+        propensity = rng.pareto(2.5, n) + 0.05
+        self._claim_cdf = np.cumsum(propensity)
+
+    def policyholders(self):
+        # yields policyholder record dicts in the Policyholder.to_dict() layout
+        rng = self._rng(1)
+        for start in range(0, self.policyholder_count, CHUNK_SIZE):
+            stop = min(start + CHUNK_SIZE, self.policyholder_count)
+            size = stop - start
+            first = rng.integers(len(FIRST_NAMES), size=size)
+            last = rng.integers(len(LAST_NAMES), size=size)
+            ages = np.clip(np.round(rng.normal(44, 14, size)), 18, 95).astype(int)
+            for i in range(size):
+                index = start + i
+                yield {
+                    "id": policyholder_id(index),
+                    "name": f"{FIRST_NAMES[first[i]]} {LAST_NAMES[last[i]]}",
+                    "age": int(ages[i]),
+                    "policy_type": POLICY_TYPES[self._policy_type[index]],
+                    "sum_insured": int(self._sum_insured[index]),
+                    "registration_date": ordinal_to_date_string(int(self._registration[index])),
+                }
+
+    def claims(self):
+        # yields claim record dicts in the Claim.to_dict() layout
+        rng = self._rng(2)
+        total = self._claim_cdf[-1] if self.claim_count else 0
+        for start in range(0, self.claim_count, CHUNK_SIZE):
+            size = min(start + CHUNK_SIZE, self.claim_count) - start
+            owners = np.searchsorted(self._claim_cdf, rng.random(size) * total, side="right")
+            owners = np.minimum(owners, self.policyholder_count - 1)
+            policy_type = self._policy_type[owners]
+            registered = self._registration[owners].astype(np.int64)
+            # filed some time between registration and the end date
+            dates = registered + (rng.random(size) * (self.end_ordinal - registered + 1)).astype(np.int64)
+            amounts = np.array(MEDIAN_CLAIM_AMOUNT)[policy_type] * rng.lognormal(0.0, 0.9, size)
+            amounts = np.clip(np.round(amounts, -2), 1000, self._sum_insured[owners]).astype(np.int64)
+            reasons = rng.random(size)
+            recent = dates > self.end_ordinal - RECENT_DAYS
+            statuses = np.where(
+                recent,
+                np.searchsorted(np.cumsum(RECENT_STATUS_WEIGHTS), rng.random(size), side="right"),
+                np.searchsorted(np.cumsum(SETTLED_STATUS_WEIGHTS), rng.random(size), side="right"),
+            )
+            for i in range(size):
+                type_reasons = REASONS[policy_type[i]]
+                yield {
+                    "id": claim_id(start + i),
+                    "policyholder_id": policyholder_id(int(owners[i])),
+                    "amount": int(amounts[i]),
+                    "reason": type_reasons[int(reasons[i] * len(type_reasons))],
+                    "status": CLAIM_STATUSES[min(statuses[i], 2)],
+                    "date": ordinal_to_date_string(int(dates[i])),
+                }
+
+    def write(self, data_dir, data_format="json"):
+        # writes the data files a Database(data_dir, data_format=...) loads, or for "csv" the
+        # policyholders.csv/claims.csv that bulk.py imports; returns the paths written
+        os.makedirs(data_dir, exist_ok=True)
+        if data_format == "snapshot":
+            path = os.path.join(data_dir, "data.snap")
+            with open(path, "wb") as f:
+                write_snapshot(f, self.policyholders(), self.claims())
+            return [path]
+        paths = []
+        for collection, records in (("policyholders", self.policyholders()), ("claims", self.claims())):
+            path = os.path.join(data_dir, f"{collection}.{data_format}")
+            with open(path, "w", newline="") as f:
+                if data_format == "csv":
+                    writer = csv.DictWriter(f, fieldnames=FIELDS[collection])
+                    writer.writeheader()
+                    writer.writerows(records)
+                elif data_format == "ndjson":
+                    write_ndjson(f, records)
+                else:
+                    write_object_items(f, ((record["id"], record) for record in records), indent=4)
+            paths.append(path)
+        return paths
+
+    def _rng(self, stream):
+        return np.random.default_rng([self.seed, stream])
+
+
+def policyholder_id(index):
+    return f"p{index:07x}"
+
+
+def claim_id(index):
+    return f"c{index:08x}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate seeded synthetic policyholders and claims")
+    parser.add_argument("--policyholders", type=int, default=10000)
+    parser.add_argument("--claims", type=int, help="defaults to 5 per policyholder")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--end-date", type=date.fromisoformat, help="latest claim date, defaults to today")
+    parser.add_argument("--years", type=float, default=5, help="how far back registrations and claims go")
+    parser.add_argument("--data-dir", default="./synthetic-data")
+    parser.add_argument("--data-format", choices=DATA_FORMATS, default="json",
+                        help="a Database data format, or csv files for bulk.py import")
+    args = parser.parse_args()
+    claims = args.claims if args.claims is not None else args.policyholders * 5
+    data = SyntheticData(args.policyholders, claims, seed=args.seed, end_date=args.end_date, years=args.years)
+    for path in data.write(args.data_dir, args.data_format):
+        print(f"wrote {path}")
+    print(f"{data.policyholder_count} policyholders, {data.claim_count} claims")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
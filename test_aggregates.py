@@ -0,0 +1,48 @@
+from aggregates import ClaimAggregates
+from models import Claim
+
+
+def make_claim(claim_id, date, policyholder_id="p1", amount=100, status="Pending"):
+    claim = Claim(policyholder_id, amount, "Surgery", status, date)
+    claim.id = claim_id
+    return claim
+
+
+def test_policyholder_dates_stay_sorted():
+    aggregates = ClaimAggregates()
+    claims = [make_claim(f"c{i}", date) for i, date in enumerate(["2024-05-01", "2024-01-01", "2024-03-01",
+                                                                  "2024-03-01", "2023-12-31"])]
+    for claim in claims:
+        aggregates.add(claim, "Health")
+    dates = aggregates.dates_by_policyholder["p1"]
+    assert dates == sorted(claim.date_ordinal for claim in claims)
+    aggregates.remove(claims[2], "Health")
+    assert dates == sorted(claim.date_ordinal for claim in claims[:2] + claims[3:])
+    for claim in claims[:2] + claims[3:]:
+        aggregates.remove(claim, "Health")
+    assert "p1" not in aggregates.dates_by_policyholder
+
+
+def test_policyholder_claims_since_and_between():
+    aggregates = ClaimAggregates()
+    for i, date in enumerate(["2024-01-01", "2024-02-01", "2024-02-01", "2024-03-01"]):
+        aggregates.add(make_claim(f"c{i}", date), "Health")
+    feb = make_claim("x", "2024-02-01").date_ordinal
+    assert aggregates.policyholder_claims_since("p1", feb) == 1
+    assert aggregates.policyholder_claims_since("p1", feb - 1) == 3
+    assert aggregates.policyholder_claims_between("p1", feb, feb) == 2
+    assert aggregates.policyholder_claims_between("p1", feb - 31, feb) == 3
+    assert aggregates.policyholder_claims_since("nobody", feb) == 0
+    assert aggregates.policyholder_claims_between("nobody", feb, feb) == 0
+
+
+def test_grouped_totals():
+    aggregates = ClaimAggregates()
+    aggregates.add(make_claim("c1", "2024-01-05", amount=100), "Health")
+    aggregates.add(make_claim("c2", "2024-01-20", policyholder_id="p2", amount=50, status="Approved"), "Life")
+    aggregates.add(make_claim("c3", "2024-02-01", amount=25), None)
+    assert aggregates.monthly_totals() == [("2024-01", 2, 150), ("2024-02", 1, 25)]
+    assert aggregates.policy_type_totals() == [("Health", 1, 100), ("Life", 1, 50)]
+    assert aggregates.policy_type_status_count("Life", "Approved") == 1
+    assert aggregates.status_totals("Pending") == (2, 125)
+    assert aggregates.policyholder_totals("p1") == (2, 125)
@@ -0,0 +1,210 @@
+import json
+
+import pytest
+
+import app as flask_app
+from risk_service import create_service
+
+FACTORS = {"technical_complexity": 8, "resource_availability": 6, "timeline_constraints": 5,
+           "budget_constraints": 3, "stakeholder_involvement": 4, "regulatory_compliance": 7}
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def client(request, tmp_path, monkeypatch):
+    service = create_service({"RISK_DB_BACKEND": request.param, "RISK_DB_PATH": str(tmp_path / "risks.db")})
+    monkeypatch.setattr(flask_app, "service", service)
+    yield flask_app.app.test_client()
+    service.db_manager.close()
+
+
+def factors(value, **overrides):
+    return {**{factor: value for factor in FACTORS}, **overrides}
+
+
+def create_risks(client, count=60):
+    risks = [{"project_name": f"{('alpha', 'beta')[i % 2]}-{i % 7}", "risk_factors": factors(i % 10 + 1)}
+             for i in range(count)]
+    response = client.post("/api/risks/bulk", json=risks)
+    assert response.status_code == 201
+    return client.get("/api/risks").get_json()["data"]
+
+
+def walk(client, query):
+    risks, cursor = [], None
+    while True:
+        response = client.get("/api/risks", query_string={**query, **({"after": cursor} if cursor else {})})
+        assert response.status_code == 200
+        body = response.get_json()
+        risks += body["data"]
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return risks
+
+
+@pytest.mark.parametrize("query, order", [
+    ({}, lambda risk: risk["id"]),
+    ({"risk_level": "medium"}, lambda risk: (risk["risk_score"], risk["id"])),
+    ({"risk_level": "high", "max_score": 80}, lambda risk: (risk["risk_score"], risk["id"])),
+    ({"min_score": 42.5}, lambda risk: (risk["risk_score"], risk["id"])),
+    ({"project_prefix": "beta-", "risk_level": "low"}, lambda risk: (risk["project_name"], risk["id"])),
+])
+def test_risk_pages(client, query, order):
+    risks = create_risks(client)
+    low, high = {"low": (0, 30), "medium": (30, 70), "high": (70, 100)}.get(query.get("risk_level"), (0, 101))
+    expected = sorted((risk for risk in risks
+                       if low <= risk["risk_score"] < high and risk["risk_score"] >= query.get("min_score", 0)
+                       and risk["risk_score"] <= query.get("max_score", 100)
+                       and risk["project_name"].startswith(query.get("project_prefix", ""))), key=order)
+    assert expected
+    assert walk(client, {**query, "limit": 4}) == expected
+    assert walk(client, {**query, "limit": 1000}) == expected
+
+
+def test_fields_are_projected(client):
+    create_risks(client, 5)
+    body = client.get("/api/risks?limit=2&fields=id,risk_score,missing").get_json()
+    assert [sorted(risk) for risk in body["data"]] == [["id", "risk_score"]] * 2
+    assert body["next_cursor"]
+
+
+@pytest.mark.parametrize("query, message", [
+    ("limit=0", "limit must be between"),
+    ("limit=1001", "limit must be between"),
+    ("limit=ten", "limit must be an integer"),
+    ("after=%%%", "Invalid cursor"),
+    ("after=bm90IGpzb24", "Invalid cursor"),
+    ("min_score=nan", "finite"),
+    ("risk_level=extreme", "risk_level must be one of"),
+])
+def test_bad_queries_are_rejected(client, query, message):
+    response = client.get("/api/risks?" + query)
+    assert response.status_code == 400
+    assert message in response.get_json()["message"]
+
+
+def test_cursors_only_continue_their_own_query(client):
+    create_risks(client, 5)
+    cursor = client.get("/api/risks?limit=2").get_json()["next_cursor"]
+    response = client.get(f"/api/risks?limit=2&min_score=10&after={cursor}")
+    assert response.status_code == 400
+    assert response.get_json()["message"] == "Cursor does not match the query filters"
+
+
+def test_unchanged_risks_answer_304(client):
+    create_risks(client, 3)
+    for url in ("/api/risks", "/api/risks?limit=2&fields=id", "/api/risks/2"):
+        first = client.get(url)
+        etag = first.headers["ETag"]
+        response = client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 304 and response.headers["ETag"] == etag and not response.data
+        # served from the response cache, byte for byte
+        assert client.get(url).data == first.data
+
+
+def test_writes_change_the_etag(client):
+    create_risks(client, 3)
+    etags = {url: client.get(url).headers["ETag"] for url in ("/api/risks", "/api/risks/2", "/api/risks/3")}
+
+    assert client.put("/api/risks/2", json={"project_name": "renamed"}).status_code == 200
+    response = client.get("/api/risks/2", headers={"If-None-Match": etags["/api/risks/2"]})
+    assert response.status_code == 200 and response.get_json()["data"]["project_name"] == "renamed"
+    response = client.get("/api/risks", headers={"If-None-Match": etags["/api/risks"]})
+    assert response.status_code == 200
+    assert [risk["project_name"] for risk in response.get_json()["data"]][1] == "renamed"
+    # a risk's own ETag only follows writes to that risk
+    assert client.get("/api/risks/3", headers={"If-None-Match": etags["/api/risks/3"]}).status_code == 304
+
+    etag = client.get("/api/risks").headers["ETag"]
+    assert client.delete("/api/risks/2").status_code == 200
+    response = client.get("/api/risks", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert [risk["id"] for risk in response.get_json()["data"]] == [1, 3]
+    assert client.get("/api/risks/2", headers={"If-None-Match": etags["/api/risks/2"]}).status_code == 404
+
+
+def test_bulk_creates_change_the_etag(client):
+    create_risks(client, 3)
+    etag = client.get("/api/risks?limit=10").headers["ETag"]
+    client.post("/api/risks/bulk", json=[{"project_name": "new", "risk_factors": FACTORS}])
+    response = client.get("/api/risks?limit=10", headers={"If-None-Match": etag})
+    assert response.status_code == 200 and len(response.get_json()["data"]) == 4
+
+
+def assert_unchanged(client, before):
+    response = client.get("/api/risks", headers={"If-None-Match": before.headers["ETag"]})
+    assert response.status_code == 304
+
+
+@pytest.mark.parametrize("row, error", [
+    ({"project_name": "bad", "risk_factors": factors(5, budget_constraints=11)}, "Invalid risk factor values"),
+    ({"project_name": "bad", "risk_factors": factors(5, budget_constraints="high")}, "Invalid risk factor values"),
+    ({"project_name": "bad"}, "Missing required field: risk_factors"),
+    ({"project_name": "bad", "risk_factors": [1, 2]}, "risk_factors must be an object"),
+    ("not an object", "Each assessment must be a JSON object"),
+])
+def test_one_invalid_bulk_row_creates_nothing(client, row, error):
+    create_risks(client, 2)
+    before = client.get("/api/risks")
+    rows = [{"project_name": f"ok-{i}", "risk_factors": FACTORS} for i in range(4)]
+    rows.insert(2, row)
+    response = client.post("/api/risks/bulk", json=rows)
+    assert response.status_code == 400
+    body = response.get_json()
+    assert (body["total"], body["failed"]) == (5, 1)
+    assert body["errors"][0]["index"] == 2 and error in body["errors"][0]["error"]
+    assert_unchanged(client, before)
+    assert client.get("/api/risks").get_json()["data"] == before.get_json()["data"]
+
+
+def test_one_malformed_ndjson_line_creates_nothing(client):
+    create_risks(client, 2)
+    before = client.get("/api/risks")
+    lines = [json.dumps({"project_name": "ok", "risk_factors": FACTORS})] * 3
+    lines.insert(1, '{"project_name": "torn", "risk_factors": {')
+    response = client.post("/api/risks/bulk", data="\n".join(lines), content_type="application/x-ndjson")
+    assert response.status_code == 400
+    assert response.get_json()["errors"] == [{"index": 1, "error": "Invalid JSON"}]
+    assert_unchanged(client, before)
+
+
+def test_bulk_ndjson_creates_every_row(client):
+    lines = [json.dumps({"project_name": f"p{i}", "risk_factors": factors(i + 1)}) for i in range(3)]
+    response = client.post("/api/risks/bulk", data="\n".join(lines) + "\n\n", content_type="application/x-ndjson")
+    assert response.status_code == 201
+    assert response.get_json()["data"] == [{"index": i, "risk_id": i + 1} for i in range(3)]
+    assert [risk["risk_score"] for risk in client.get("/api/risks").get_json()["data"]] == [10.0, 20.0, 30.0]
+
+
+def test_empty_and_invalid_bulk_bodies(client):
+    assert client.post("/api/risks/bulk", json=[]).status_code == 400
+    assert client.post("/api/risks/bulk", data="[1, 2", content_type="application/json").status_code == 400
+    assert client.get("/api/risks").get_json()["data"] == []
+
+
+def test_batch_scores_match_single_analysis(client):
+    rows = [factors(value, budget_constraints=10 - value // 2) for value in range(1, 11)]
+    response = client.post("/api/analyze/batch", json=[rows[0], {"risk_factors": rows[1]}, *rows[2:]])
+    assert response.status_code == 200
+    body = response.get_json()
+    assert (body["total"], body["failed"]) == (10, 0)
+    for i, row in enumerate(rows):
+        single = client.post("/api/analyze", json={"risk_factors": row}).get_json()["data"]
+        assert body["data"][i] == {"index": i, **single}
+
+
+def test_batch_reports_invalid_rows(client):
+    items = [FACTORS, factors(5, budget_constraints=0), "text", [1, 2, 3], {"risk_factors": {}}, factors(11), FACTORS]
+    body = client.post("/api/analyze/batch", json=items).get_json()
+    assert (body["total"], body["failed"]) == (7, 5)
+    assert [("error" in row) for row in body["data"]] == [False, True, True, True, True, True, False]
+    assert body["data"][2]["error"] == "Each assessment must be a JSON object"
+    assert "Values must be between 1 and 10" in body["data"][1]["error"]
+    assert body["data"][0]["risk_score"] == body["data"][6]["risk_score"]
+
+
+def test_batch_reports_malformed_ndjson_lines(client):
+    lines = [json.dumps(FACTORS), "{not json", json.dumps({"risk_factors": factors(2)})]
+    body = client.post("/api/analyze/batch", data="\n".join(lines), content_type="application/x-ndjson").get_json()
+    assert body["data"][1] == {"index": 1, "error": "Invalid JSON"}
+    assert body["data"][2]["risk_score"] == 20.0 and body["failed"] == 1
+    assert client.post("/api/analyze/batch", json=[]).status_code == 400
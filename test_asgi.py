@@ -0,0 +1,124 @@
+import json
+
+import pytest
+from starlette.testclient import TestClient
+
+import app as flask_app
+import asgi
+from risk_service import create_service
+
+FACTORS = {"technical_complexity": 8, "resource_availability": 6, "timeline_constraints": 5,
+           "budget_constraints": 3, "stakeholder_involvement": 4, "regulatory_compliance": 7}
+
+
+def factors(value):
+    return dict.fromkeys(FACTORS, value)
+
+
+# each step is (method, url, options); "etag" sends the ETag last returned for that url
+SCENARIOS = {
+    "crud": [
+        ("POST", "/api/risks", {"json": {"project_name": "Alpha", "risk_factors": FACTORS}}),
+        ("POST", "/api/risks", {"json": {"project_name": "Beta", "risk_factors": factors(2)}}),
+        ("POST", "/api/risks", {"json": {"project_name": "Missing factors"}}),
+        ("POST", "/api/risks", {"json": {"project_name": "Bad", "risk_factors": factors(11)}}),
+        ("GET", "/api/risks", {}),
+        ("GET", "/api/risks/1", {}),
+        ("GET", "/api/risks/99", {}),
+        ("PUT", "/api/risks/1", {"json": {"project_name": "Alpha 2", "risk_factors": factors(9)}}),
+        ("PUT", "/api/risks/99", {"json": {"project_name": "Nobody"}}),
+        ("GET", "/api/risks/1", {}),
+        ("DELETE", "/api/risks/2", {}),
+        ("DELETE", "/api/risks/2", {}),
+        ("GET", "/api/risks?limit=1&fields=id,project_name", {}),
+        ("GET", "/api/risks?limit=0", {}),
+        ("GET", "/api/risks?after=%%%", {}),
+    ],
+    "bulk": [
+        ("POST", "/api/risks/bulk", {"json": [{"project_name": f"p{i}", "risk_factors": factors(i % 10 + 1)}
+                                              for i in range(100)]}),
+        ("POST", "/api/risks/bulk", {"body": "\n".join(json.dumps({"project_name": f"n{i}", "risk_factors": FACTORS})
+                                                        for i in range(3)), "content_type": "application/x-ndjson"}),
+        ("POST", "/api/risks/bulk", {"json": [{"project_name": "ok", "risk_factors": FACTORS}, "not an object"]}),
+        ("POST", "/api/risks/bulk", {"body": '{"project_name": "torn"', "content_type": "application/x-ndjson"}),
+        ("POST", "/api/risks/bulk", {"json": []}),
+        ("GET", "/api/risks?risk_level=high&limit=5", {}),
+        ("GET", "/api/risks?project_prefix=n&fields=id,risk_score", {}),
+    ],
+    "batch": [
+        ("POST", "/api/analyze", {"json": {"risk_factors": FACTORS}}),
+        ("POST", "/api/analyze", {"json": {"risk_factors": factors(0)}}),
+        ("POST", "/api/analyze/batch", {"json": [factors(i % 10 + 1) for i in range(200)]}),
+        ("POST", "/api/analyze/batch", {"json": [FACTORS, {"risk_factors": factors(3)}, 5, factors(11)]}),
+        ("POST", "/api/analyze/batch", {"body": json.dumps(FACTORS) + "\n{oops\n",
+                                        "content_type": "application/x-ndjson"}),
+        ("POST", "/api/analyze/batch", {"json": []}),
+    ],
+    "not_modified": [
+        ("POST", "/api/risks", {"json": {"project_name": "Alpha", "risk_factors": FACTORS}}),
+        ("GET", "/api/risks", {}),
+        ("GET", "/api/risks", {"etag": True}),
+        ("GET", "/api/risks/1", {}),
+        ("GET", "/api/risks/1", {"etag": True}),
+        ("GET", "/api/risks?limit=1", {}),
+        ("GET", "/api/risks?limit=1", {"etag": True}),
+        ("PUT", "/api/risks/1", {"json": {"project_name": "Changed"}}),
+        ("GET", "/api/risks/1", {"etag": True}),
+    ],
+}
+
+
+def flask_request(client, method, url, body=None, content_type=None, headers=None):
+    response = client.open(url, method=method, data=body, content_type=content_type, headers=headers)
+    return response.status_code, response.get_data(), response.headers.get("ETag")
+
+
+def starlette_request(client, method, url, body=None, content_type=None, headers=None):
+    headers = dict(headers or {})
+    if content_type:
+        headers["content-type"] = content_type
+    response = client.request(method, url, content=body, headers=headers)
+    return response.status_code, response.content, response.headers.get("etag")
+
+
+def run(request, client, steps):
+    results, etags = [], {}
+    for method, url, options in steps:
+        options = dict(options)
+        if options.pop("etag", False):
+            options["headers"] = {"If-None-Match": etags[url]}
+        if "json" in options:
+            # encoded here, so both apps get the same bytes (Flask's client would sort the keys)
+            options.update(body=json.dumps(options.pop("json")), content_type="application/json")
+        status, body, etag = request(client, method, url, **options)
+        if etag:
+            etags[url] = etag
+        results.append((method, url, status, json.loads(body) if body else None, etag))
+    return results
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def clients(request, tmp_path, monkeypatch):
+    services = [create_service({"RISK_DB_BACKEND": request.param, "RISK_DB_PATH": str(tmp_path / f"{name}.db")})
+                for name in ("flask", "asgi")]
+    monkeypatch.setattr(flask_app, "service", services[0])
+    monkeypatch.setattr(asgi, "service", services[1])
+    # batches of more than a handful of rows are scored in a thread pool
+    monkeypatch.setenv("SCORING_EXECUTOR", "thread")
+    monkeypatch.setenv("SCORING_WORKERS", "2")
+    monkeypatch.setattr(asgi, "OFFLOAD_MIN_ROWS", 4)
+    monkeypatch.setattr(asgi, "_executor", None)
+    with TestClient(asgi.app) as starlette_client:
+        yield flask_app.app.test_client(), starlette_client
+    services[0].db_manager.close()
+
+
+@pytest.mark.parametrize("scenario", sorted(SCENARIOS))
+def test_asgi_app_answers_like_the_flask_app(clients, scenario):
+    flask_client, starlette_client = clients
+    expected = run(flask_request, flask_client, SCENARIOS[scenario])
+    assert run(starlette_request, starlette_client, SCENARIOS[scenario]) == expected
+    if scenario == "batch":
+        assert asgi._executor is not None
+    if scenario == "not_modified":
+        assert [status for _, _, status, _, _ in expected] == [201, 200, 304, 200, 304, 200, 304, 200, 200]
@@ -0,0 +1,114 @@
+import io
+
+import pytest
+
+from bulk import BulkImportError, export_records, import_records, read_records
+from database import Database
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = Database(str(tmp_path), fsync=False)
+    yield db
+    db.close()
+
+
+def holder(id, sum_insured=100000, **fields):
+    return {"id": id, "name": f"Holder {id}", "age": 40, "policy_type": "Health",
+            "sum_insured": sum_insured, "registration_date": "2020-01-01", **fields}
+
+
+def claim(id, policyholder_id, amount=1000, **fields):
+    return {"id": id, "policyholder_id": policyholder_id, "amount": amount, "reason": "Surgery",
+            "status": "Pending", "date": "2024-01-01", **fields}
+
+
+def test_imports_valid_records(db):
+    summary = import_records(db, [holder("p1"), holder("p2")], [claim("c1", "p1"), claim("c2", "p2")])
+    assert (summary["policyholders"], summary["claims"], summary["skipped"]) == (2, 2, 0)
+    assert summary["saved"]
+    assert db.claims["c2"].policyholder_id == "p2"
+    assert db.verify_aggregates() == []
+
+
+def test_claims_may_reference_stored_policyholders(db):
+    import_records(db, [holder("p1")])
+    assert import_records(db, claims=[claim("c1", "p1")])["claims"] == 1
+
+
+@pytest.mark.parametrize("record, message", [
+    (claim("c1", "nobody"), "unknown policyholder"),
+    (claim("c1", "p1", amount=0), "amount must be positive"),
+    (claim("c1", "p1", amount=200000), "exceeds the sum insured"),
+    (claim("c1", "p1", status="Lost"), "status must be one of"),
+    (claim("c1", "p1", date="01/02/2024"), "must be a YYYY-MM-DD date"),
+    (claim("c1", "p1", amount="lots"), "amount must be a number"),
+])
+def test_invalid_claims_abort_the_import(db, record, message):
+    with pytest.raises(BulkImportError) as raised:
+        import_records(db, [holder("p1")], [record])
+    assert raised.value.error_count == 1
+    assert message in raised.value.errors[0]
+    assert len(db.policyholders) == 0 and len(db.claims) == 0
+
+
+def test_invalid_policyholders_are_reported(db):
+    with pytest.raises(BulkImportError) as raised:
+        import_records(db, [holder("p1", sum_insured=-5), holder("p2", age=40.5), holder("p3", name="")])
+    assert raised.value.error_count == 3
+
+
+def test_skip_invalid_keeps_the_valid_records(db):
+    summary = import_records(db, [holder("p1")], [claim("c1", "p1"), claim("c2", "nobody")], skip_invalid=True)
+    assert (summary["claims"], summary["skipped"]) == (1, 1)
+    assert summary["errors"] == ["claims record 2: unknown policyholder 'nobody'"]
+    assert list(db.claims) == ["c1"]
+
+
+def test_duplicate_ids_within_an_import_are_errors(db):
+    policyholders = [holder("p1", sum_insured=1000), holder("p2"), holder("p1", sum_insured=900000)]
+    claims = [claim("c1", "p1", amount=900), claim("c1", "p2")]
+    with pytest.raises(BulkImportError) as raised:
+        import_records(db, policyholders, claims)
+    assert raised.value.errors == ["policyholders record 3: duplicate id 'p1'", "claims record 2: duplicate id 'c1'"]
+
+    summary = import_records(db, policyholders, claims, skip_invalid=True)
+    assert (summary["policyholders"], summary["claims"], summary["skipped"]) == (2, 1, 2)
+    # the first row is the one kept, and the one the claims were checked against
+    assert db.policyholders["p1"].sum_insured == 1000
+    assert db.claims["c1"].policyholder_id == "p1"
+
+
+def test_ids_already_stored_are_errors(db):
+    import_records(db, [holder("p1")], [claim("c1", "p1")])
+    summary = import_records(db, [holder("p1", sum_insured=5)], [claim("c1", "p1", amount=5)], skip_invalid=True)
+    assert (summary["policyholders"], summary["claims"], summary["skipped"]) == (0, 0, 2)
+    assert db.policyholders["p1"].sum_insured == 100000
+    assert db.claims["c1"].amount == 1000
+
+
+def test_csv_values_are_converted(db):
+    text = "id,name,age,policy_type,sum_insured,registration_date\np1,Jane,40,Health,250000.5,\n"
+    import_records(db, read_records(io.StringIO(text), "csv"))
+    policyholder = db.policyholders["p1"]
+    assert (policyholder.age, policyholder.sum_insured) == (40, 250000.5)
+    assert isinstance(policyholder.age, int)
+
+
+def test_export_round_trips_through_import(db, tmp_path):
+    import_records(db, [holder("p1"), holder("p2")], [claim("c1", "p1", amount=1500.5)])
+    exported = {}
+    for collection in ("policyholders", "claims"):
+        fp = io.StringIO()
+        assert export_records(db, collection, fp, "csv") == len(getattr(db, collection))
+        exported[collection] = fp.getvalue()
+
+    other = Database(str(tmp_path / "copy"), fsync=False)
+    try:
+        summary = import_records(other, read_records(io.StringIO(exported["policyholders"]), "csv"),
+                                 read_records(io.StringIO(exported["claims"]), "csv"))
+        assert (summary["policyholders"], summary["claims"]) == (2, 1)
+        assert other.claims["c1"].amount == 1500.5
+        assert other.policyholders["p2"].age == 40
+    finally:
+        other.close()
@@ -0,0 +1,177 @@
+import random
+from datetime import date
+
+import pytest
+
+from database import Database
+from models import date_string_to_ordinal
+from models import Claim, Policyholder
+from storage import SQLiteBackend
+
+STATUSES = ("Pending", "Approved", "Rejected")
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def db(request, tmp_path):
+    if request.param == "sqlite":
+        db = Database(backend=SQLiteBackend(str(tmp_path / "claims.db")))
+    else:
+        db = Database(str(tmp_path), fsync=False, journal=True)
+    yield db
+    db.close()
+
+
+def populate(db, seed=0, policyholders=20, claims=300):
+    rng = random.Random(seed)
+    holders = []
+    for i in range(policyholders):
+        holder = Policyholder(f"Holder {i}", 30 + i, rng.choice(("Health", "Vehicle", "Life")), 10**6)
+        holder.id = f"p{i:03d}"
+        db.add_policyholder(holder)
+        holders.append(holder)
+    for i in range(claims):
+        # few distinct amounts and days, so ties are ordered by claim id
+        claim = Claim(rng.choice(holders).id, rng.randrange(1, 40) * 100, "Surgery", rng.choice(STATUSES),
+                      f"2024-{rng.randrange(1, 13):02d}-{rng.randrange(1, 29):02d}")
+        claim.id = f"c{i:04d}"
+        db.add_claim(claim)
+    return rng
+
+
+def expected_top(db, n):
+    claims = [claim for claim in db.claims.values() if claim.policyholder_id in db.policyholders]
+    return [claim.id for claim in sorted(claims, key=lambda claim: (-claim.amount, claim.id))[:n]]
+
+
+def expected_pending(db):
+    claims = [claim for claim in db.claims.values()
+              if claim.status == "Pending" and claim.policyholder_id in db.policyholders]
+    return [claim.id for claim in sorted(claims, key=lambda claim: (claim.date_ordinal, claim.id))]
+
+
+def ids(claims):
+    return [claim.id for claim in claims]
+
+
+def test_top_and_pending_claims(db):
+    populate(db)
+    assert ids(db.top_claims(10)) == expected_top(db, 10)
+    assert ids(db.top_claims(1000)) == expected_top(db, 1000)
+    assert ids(db.pending_claims()) == expected_pending(db)
+    assert ids(db.pending_claims(5)) == expected_pending(db)[:5]
+
+
+def test_indexes_follow_changes(db):
+    rng = populate(db)
+    # build the indexes first, so the changes below go through their upkeep
+    db.top_claims()
+    db.pending_claims()
+    claim_ids = sorted(db.claims)
+    for claim_id in rng.sample(claim_ids, 60):
+        db.update_claim_status(claim_id, rng.choice(STATUSES))
+    for claim_id in rng.sample(claim_ids, 40):
+        db.delete_claim(claim_id)
+    top = Claim("p000", 10**6, "Surgery", "Pending", "2023-01-01")
+    db.add_claim(top)
+    assert ids(db.top_claims(10)) == expected_top(db, 10)
+    assert db.top_claims(1)[0].id == top.id
+    assert ids(db.pending_claims()) == expected_pending(db)
+    assert db.pending_claims(1)[0].id == top.id
+
+
+def test_claims_of_deleted_policyholders_are_left_out(db):
+    populate(db)
+    db.top_claims()
+    # delete_policyholder refuses while claims exist, so remove the holder underneath
+    holder = db.top_claims(1)[0].policyholder_id
+    with db._lock:
+        db._remove_policyholder(holder)
+        db._mark_dirty("policyholders")
+    assert holder not in {claim.policyholder_id for claim in db.top_claims(1000)}
+    assert ids(db.top_claims(10)) == expected_top(db, 10)
+    assert ids(db.pending_claims()) == expected_pending(db)
+
+
+def test_aggregates_follow_changes(tmp_path):
+    db = Database(str(tmp_path), fsync=False, journal=True)
+    rng = populate(db)
+    assert db.verify_aggregates() == []
+    for claim_id in rng.sample(sorted(db.claims), 50):
+        db.update_claim_status(claim_id, "Approved")
+    for claim_id in rng.sample(sorted(db.claims), 50):
+        db.delete_claim(claim_id)
+    db.update_policyholder("p001", {"policy_type": "Life"})
+    assert db.verify_aggregates() == []
+    db.close()
+
+
+def expected_between(db, start, end):
+    start = date_string_to_ordinal(start) if start else 0
+    end = date_string_to_ordinal(end) if end else 10**7
+    claims = [claim for claim in db.claims.values() if start <= claim.date_ordinal <= end]
+    return [claim.id for claim in sorted(claims, key=lambda claim: (claim.date_ordinal, claim.id))]
+
+
+WINDOWS = [(None, None), ("2024-03-01", "2024-05-31"), ("2024-06-15", None), (None, "2024-01-31"),
+           ("2024-04-04", "2024-04-04"), ("2025-01-01", None)]
+
+
+@pytest.mark.parametrize("start, end", WINDOWS)
+def test_claims_between(db, start, end):
+    populate(db)
+    assert ids(db.claims_between(start, end)) == expected_between(db, start, end)
+
+
+def test_claims_between_accepts_dates_and_ordinals(db):
+    populate(db)
+    expected = expected_between(db, "2024-03-01", "2024-03-31")
+    assert ids(db.claims_between(date(2024, 3, 1), date(2024, 3, 31))) == expected
+    assert ids(db.claims_between(date(2024, 3, 1).toordinal(), date(2024, 3, 31).toordinal())) == expected
+
+
+def test_claim_date_range(db):
+    assert db.claim_date_range() is None
+    populate(db)
+    days = sorted(claim.date_ordinal for claim in db.claims.values())
+    assert db.claim_date_range() == (date.fromordinal(days[0]), date.fromordinal(days[-1]))
+
+
+def test_date_index_follows_changes(db):
+    rng = populate(db)
+    db.claims_between()
+    for claim_id in rng.sample(sorted(db.claims), 40):
+        db.update_claim_status(claim_id, rng.choice(STATUSES))
+    for claim_id in rng.sample(sorted(db.claims), 40):
+        db.delete_claim(claim_id)
+    db.add_claim(Claim("p000", 100, "Surgery", "Pending", "2030-06-01"))
+    for start, end in WINDOWS:
+        assert ids(db.claims_between(start, end)) == expected_between(db, start, end)
+    assert db.claim_date_range()[1] == date(2030, 6, 1)
+
+
+@pytest.mark.parametrize("start, end", WINDOWS)
+def test_windowed_top_and_pending_claims(db, start, end):
+    populate(db)
+    window = set(expected_between(db, start, end))
+    top = [claim_id for claim_id in expected_top(db, 1000) if claim_id in window][:5]
+    assert ids(db.top_claims(5, start, end)) == top
+    assert ids(db.pending_claims(None, start, end)) == [claim_id for claim_id in expected_pending(db)
+                                                        if claim_id in window]
+
+
+@pytest.mark.parametrize("start, end", WINDOWS[1:])
+def test_aggregates_between(db, start, end):
+    populate(db)
+    aggregates = db.aggregates_between(start, end)
+    claims = [db.claims[claim_id] for claim_id in expected_between(db, start, end)]
+    months = {}
+    for claim in claims:
+        count, total = months.get(claim.date[:7], (0, 0))
+        months[claim.date[:7]] = (count + 1, total + claim.amount)
+    assert aggregates.monthly_totals() == [(month, *months[month]) for month in sorted(months)]
+    for holder_id in db.policyholders:
+        mine = [claim for claim in claims if claim.policyholder_id == holder_id]
+        assert aggregates.policyholder_totals(holder_id) == (len(mine), sum(claim.amount for claim in mine))
+        since = date_string_to_ordinal("2024-06-30")
+        assert aggregates.policyholder_claims_since(holder_id, since) == sum(
+            claim.date_ordinal > since for claim in mine)
@@ -0,0 +1,273 @@
+import random
+import threading
+import time
+
+import pytest
+
+from db_manager import ConnectionPool, DBManager, SQLDBManager, SQLiteDialect, create_db_manager
+from risk_service import decode_cursor, encode_cursor
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def manager(request, tmp_path):
+    if request.param == "sqlite":
+        manager = SQLDBManager(SQLiteDialect(str(tmp_path / "risks.db")), max_size=2)
+    else:
+        manager = DBManager()
+    yield manager
+    manager.close()
+
+
+def create(manager, names):
+    return manager.create_risks([{"project_name": name, "risk_score": 50} for name in names])
+
+
+# U+D7FF is followed by the surrogates, and U+10FFFF is the last code point
+PROJECT_NAMES = ["", "a", "ab", "abc", "abd", "b", "\ud7ff", "\ud7ffz", "\ue000", "x\U0010ffff",
+                 "x\U0010ffff\U0010ffff", "y", "\U0010ffff", "\U0010ffffa"]
+
+
+@pytest.mark.parametrize("prefix", ["a", "ab", "abc", "z", "\ud7ff", "x\U0010ffff", "\U0010ffff", ""])
+def test_project_prefix_matches_startswith(manager, prefix):
+    create(manager, PROJECT_NAMES)
+    risks, after = manager.query_risks(project_prefix=prefix)
+    assert after is None
+    assert [risk["project_name"] for risk in risks] == sorted(name for name in PROJECT_NAMES
+                                                              if name.startswith(prefix))
+
+
+def populate(manager, seed=0, count=120):
+    rng = random.Random(seed)
+    risks = []
+    for _ in range(count):
+        risk = {"project_name": rng.choice(["alpha", "beta", "gamma"]) + f"-{rng.randrange(8)}",
+                # few distinct scores, so pages split runs of equal scores
+                "risk_score": rng.choice([10, 25.5, 30, 50.25, 69.99, 70, 88])}
+        if rng.random() < 0.1:
+            del risk["project_name"]
+        if rng.random() < 0.1:
+            risk["risk_score"] = None
+        risks.append(risk)
+    manager.create_risks(risks)
+    return risks
+
+
+def expected(risks, min_score=None, max_score=None, below_score=None, project_prefix=None):
+    matches = []
+    for risk in risks:
+        score, name = risk["risk_score"], risk.get("project_name")
+        if project_prefix is not None and (name is None or not name.startswith(project_prefix)):
+            continue
+        if (min_score, max_score, below_score) != (None, None, None):
+            if score is None or (min_score is not None and score < min_score) or \
+                    (max_score is not None and score > max_score) or (below_score is not None and score >= below_score):
+                continue
+        matches.append(risk)
+    if project_prefix is not None:
+        matches.sort(key=lambda risk: (risk["project_name"], risk["id"]))
+    elif (min_score, max_score, below_score) != (None, None, None):
+        matches.sort(key=lambda risk: (risk["risk_score"], risk["id"]))
+    return [risk["id"] for risk in matches]
+
+
+QUERIES = [{}, {"min_score": 30}, {"max_score": 50.25}, {"below_score": 70}, {"min_score": 30, "below_score": 70},
+           {"min_score": 100}, {"project_prefix": "beta"}, {"project_prefix": "gamma-3"}, {"project_prefix": "delta"},
+           {"project_prefix": "alpha", "min_score": 50}, {"project_prefix": "b", "min_score": 25.5, "max_score": 70}]
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_unpaged_queries(manager, query):
+    risks = populate(manager)
+    found, after = manager.query_risks(**query)
+    assert after is None
+    assert [risk["id"] for risk in found] == expected(risks, **query)
+
+
+@pytest.mark.parametrize("limit", [1, 3, 7, 500])
+@pytest.mark.parametrize("query", QUERIES)
+def test_pages_add_up_to_the_unpaged_query(manager, query, limit):
+    populate(manager)
+    unpaged, _ = manager.query_risks(**query)
+    pages, after = [], None
+    while True:
+        page, after = manager.query_risks(limit=limit, after=after, **query)
+        assert len(page) <= limit
+        pages.append(page)
+        if after is None:
+            break
+        assert len(page) == limit
+        # the cursor goes out to the client and comes back in the next request
+        after = decode_cursor(encode_cursor(after))
+    assert [risk for page in pages for risk in page] == unpaged
+
+
+def test_pages_follow_writes_between_requests(manager):
+    populate(manager)
+    page, after = manager.query_risks(limit=10, min_score=30)
+    seen = [risk["id"] for risk in page]
+    # rows removed behind the cursor don't shift the rest of the walk, and rows added
+    # ahead of it are still reached
+    manager.delete_risks(seen[:5])
+    manager.create_risks([{"project_name": "late", "risk_score": 99}])
+    rest, _ = manager.query_risks(after=after, min_score=30)
+    unpaged, _ = manager.query_risks(min_score=30)
+    assert seen[5:] + [risk["id"] for risk in rest] == [risk["id"] for risk in unpaged]
+
+
+@pytest.mark.parametrize("query, after", [
+    ({}, ["risk_score", 50, 3]),
+    ({"min_score": 30}, ["id", 3]),
+    ({"project_prefix": "a"}, ["project_name", 5, 3]),
+    ({}, ["id", True]),
+    ({}, "id"),
+])
+def test_cursors_must_match_the_query(manager, query, after):
+    with pytest.raises(ValueError):
+        manager.query_risks(after=after, **query)
+
+
+def test_limit_must_be_positive(manager):
+    with pytest.raises(ValueError):
+        manager.query_risks(limit=0)
+
+
+def test_create_risks_is_all_or_nothing(manager):
+    create(manager, ["first"])
+    version = manager.get_version()
+    with pytest.raises(TypeError):
+        manager.create_risks([{"project_name": "kept?"}, ["not", "a", "risk"]])
+    assert [risk["project_name"] for risk in manager.get_all_risks()] == ["first"]
+    assert manager.get_version() == version
+    assert create(manager, ["second"]) == [2]
+
+
+def test_sql_create_risks_rolls_back_a_failed_insert(tmp_path):
+    manager = SQLDBManager(SQLiteDialect(str(tmp_path / "risks.db")))
+    try:
+        version = manager.get_version()
+        # the rows before it are inserted by the same executemany when this one fails to bind
+        risks = [{"project_name": f"p{i}", "risk_score": 50} for i in range(5)]
+        risks.append({"project_name": "overflow", "risk_score": 10**30})
+        with pytest.raises(OverflowError):
+            manager.create_risks(risks)
+        assert manager.get_all_risks() == [] and manager.get_version() == version
+        assert manager.pool.size == 1
+    finally:
+        manager.close()
+
+
+def test_pool_shares_at_most_max_size_connections(tmp_path):
+    dialect = SQLiteDialect(str(tmp_path / "pool.db"))
+    pool = ConnectionPool(dialect.connect, min_size=1, max_size=3)
+    with pool.connection() as conn:
+        conn.execute("CREATE TABLE hits (thread INTEGER)")
+    active, peak, lock = [0], [0], threading.Lock()
+
+    def work(n):
+        for _ in range(5):
+            with pool.connection() as conn:
+                with lock:
+                    active[0] += 1
+                    peak[0] = max(peak[0], active[0])
+                conn.execute("INSERT INTO hits VALUES (?)", (n,))
+                time.sleep(0.002)
+                with lock:
+                    active[0] -= 1
+
+    threads = [threading.Thread(target=work, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert 1 < peak[0] <= 3 and pool.size <= 3
+    with pool.connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM hits").fetchone()[0] == 40
+    pool.close()
+    assert pool.size == 0
+
+
+def test_pool_times_out_when_every_connection_is_out(tmp_path):
+    pool = ConnectionPool(SQLiteDialect(str(tmp_path / "pool.db")).connect, min_size=0, max_size=1, timeout=0.05)
+    conn = pool.acquire()
+    with pytest.raises(TimeoutError):
+        pool.acquire()
+    pool.release(conn)
+    assert pool.acquire() is conn
+    pool.release(conn)
+    pool.close()
+
+
+def test_pool_sizes_are_checked():
+    with pytest.raises(ValueError):
+        ConnectionPool(lambda: None, min_size=2, max_size=1)
+
+
+def test_an_error_inside_a_transaction_writes_nothing(tmp_path):
+    dialect = SQLiteDialect(str(tmp_path / "pool.db"))
+    pool = ConnectionPool(dialect.connect, min_size=1, max_size=1)
+    with pool.connection() as conn:
+        conn.execute("CREATE TABLE rows (n INTEGER)")
+    with pytest.raises(KeyError):
+        with pool.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("INSERT INTO rows VALUES (1)")
+            raise KeyError("boom")
+    # rolled back and returned, so the same connection sees no rows and isn't mid-transaction
+    with pool.connection() as reused:
+        assert reused is conn and not reused.in_transaction
+        assert reused.execute("SELECT COUNT(*) FROM rows").fetchone()[0] == 0
+    pool.close()
+
+
+def test_sql_update_errors_leave_the_risk_and_version_alone(tmp_path):
+    manager = SQLDBManager(SQLiteDialect(str(tmp_path / "risks.db")))
+    try:
+        [risk_id] = create(manager, ["before"])
+        version = manager.get_version()
+        # the version is bumped before the unserializable document fails
+        with pytest.raises(TypeError):
+            manager.update_risk(risk_id, {"project_name": "after", "tags": {1, 2}})
+        assert manager.get_risk_by_id(risk_id)["project_name"] == "before"
+        assert manager.get_version() == version == manager.get_risk_version(risk_id)
+    finally:
+        manager.close()
+
+
+class UnrollbackableConnection:
+    def __init__(self):
+        self.closed = False
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        raise ConnectionError("connection lost")
+
+    def close(self):
+        self.closed = True
+
+
+def test_a_failed_rollback_keeps_the_original_error_and_drops_the_connection():
+    conn = UnrollbackableConnection()
+    pool = ConnectionPool(lambda: conn, min_size=1, max_size=1)
+    with pytest.raises(KeyError) as raised:
+        with pool.connection():
+            raise KeyError("boom")
+    assert isinstance(raised.value.__cause__, ConnectionError)
+    assert conn.closed and pool.size == 0
+
+
+def test_backend_comes_from_the_environment(tmp_path):
+    manager = create_db_manager({})
+    assert isinstance(manager, DBManager)
+    manager = create_db_manager({"RISK_DB_BACKEND": "sqlite", "RISK_DB_PATH": str(tmp_path / "risks.db"),
+                                 "DB_POOL_MIN": "2", "DB_POOL_MAX": "4"})
+    try:
+        assert isinstance(manager, SQLDBManager)
+        assert (manager.pool.min_size, manager.pool.max_size, manager.pool.size) == (2, 4, 2)
+        create(manager, ["stored"])
+    finally:
+        manager.close()
+    assert (tmp_path / "risks.db").exists()
+    with pytest.raises(ValueError, match="Unknown RISK_DB_BACKEND: mongo"):
+        create_db_manager({"RISK_DB_BACKEND": "mongo"})
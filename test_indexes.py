@@ -0,0 +1,82 @@
+import random
+
+import pytest
+
+from indexes import Index, SortedIndex
+
+
+def test_index_buckets_keep_insertion_order():
+    index = Index()
+    for item_id in ("c3", "c1", "c2"):
+        index.add("Pending", item_id)
+    index.add("Approved", "c4")
+    assert list(index.get("Pending")) == ["c3", "c1", "c2"]
+    index.remove("Pending", "c1")
+    index.remove("Approved", "c4")
+    assert list(index.get("Pending")) == ["c3", "c2"]
+    assert index.count("Approved") == 0 and "Approved" not in index.keys()
+    assert list(index.get("missing")) == []
+
+
+def test_sorted_index_builds_sorted():
+    keys = [(5, "b"), (1, "a"), (5, "a"), (3, "z")]
+    index = SortedIndex(keys, load=2)
+    assert list(index) == sorted(keys)
+    assert len(index) == 4
+
+
+@pytest.mark.parametrize("load", [1, 2, 4, 512])
+def test_sorted_index_matches_a_sorted_list(load):
+    rng = random.Random(load)
+    index = SortedIndex(load=load)
+    reference = []
+    for step in range(3000):
+        if reference and rng.random() < 0.4:
+            key = rng.choice(reference)
+            reference.remove(key)
+            assert index.remove(key)
+        else:
+            # mostly appends past the end, as increasing ids and dates arrive
+            key = (step if rng.random() < 0.5 else rng.randrange(step + 1), f"c{step}")
+            reference.append(key)
+            index.add(key)
+    reference.sort()
+    assert list(index) == reference
+    assert len(index) == len(reference)
+    # every block stays within 2 * load keys
+    assert all(len(block) <= 2 * load for block in index._blocks)
+
+
+def test_sorted_index_remove_missing_key():
+    index = SortedIndex([(1, "a"), (2, "b")])
+    assert not index.remove((1, "b"))
+    assert not index.remove((9, "z"))
+    assert list(index) == [(1, "a"), (2, "b")]
+
+
+def test_sorted_index_irange():
+    index = SortedIndex([(day, f"c{day}{n}") for day in range(10) for n in range(3)], load=4)
+    assert [key[0] for key in index.irange((3,), (5,), inclusive=(True, False))] == [3, 3, 3, 4, 4, 4]
+    assert [key[0] for key in index.irange((8,))] == [8, 8, 8, 9, 9, 9]
+    assert list(index.irange(None, (0, "c01"))) == [(0, "c00"), (0, "c01")]
+    assert list(index.irange((0, "c01"), (0, "c02"), inclusive=(False, True))) == [(0, "c02")]
+    assert list(index.irange((20,))) == []
+
+
+def test_sorted_index_clear():
+    index = SortedIndex([(1, "a")])
+    index.clear()
+    assert list(index) == [] and len(index) == 0
+    index.add((2, "b"))
+    assert list(index) == [(2, "b")]
+
+
+def test_sorted_index_first_and_last():
+    index = SortedIndex(load=2)
+    assert index.first() is None and index.last() is None
+    for key in [(5, "e"), (1, "a"), (9, "i"), (3, "c")]:
+        index.add(key)
+    assert (index.first(), index.last()) == ((1, "a"), (9, "i"))
+    index.remove((9, "i"))
+    index.remove((1, "a"))
+    assert (index.first(), index.last()) == ((3, "c"), (5, "e"))
@@ -0,0 +1,96 @@
+import random
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from database import Database
+from models import Claim, Policyholder
+from parallel_reports import ParallelReports
+from reports import ReportEngine
+
+NOW = datetime(2024, 12, 31)
+STATUSES = ("Pending", "Approved", "Rejected", "Under Review")
+
+
+def populate(db, fractional, seed=0):
+    rng = random.Random(seed)
+    holders = []
+    for i in range(40):
+        holder = Policyholder(f"Holder {i}", 30 + i, rng.choice(("Health", "Vehicle", "Life", "Home")),
+                              rng.choice([20000, 50000, 10**6]))
+        db.add_policyholder(holder)
+        holders.append(holder)
+    for _ in range(1500):
+        amount = rng.randrange(1, 400) * 25
+        if fractional:
+            amount += rng.choice([0.1, 0.25, 0.7])
+        db.add_claim(Claim(rng.choice(holders).id, amount, "Surgery", rng.choice(STATUSES),
+                           f"{rng.choice([2023, 2024])}-{rng.randrange(1, 13):02d}-{rng.randrange(1, 29):02d}"))
+    return rng
+
+
+def reports(engine):
+    results = {"claim_frequency": engine.claim_frequency(),
+               "high_risk_policyholders": engine.high_risk_policyholders(NOW),
+               "policy_type_summary": engine.policy_type_summary(),
+               "monthly_totals": engine.monthly_totals(),
+               "average_claim_by_policy_type": engine.average_claim_by_policy_type(),
+               "top_claims": engine.top_claims(),
+               "pending_aging": engine.pending_aging(NOW),
+               "windowed": engine.policy_type_summary("2024-03-01", "2024-08-31")}
+    assert not results["high_risk_policyholders"].empty
+    return results
+
+
+def assert_same_reports(engine, db):
+    serial = reports(ReportEngine(db))
+    for name, result in reports(engine).items():
+        pd.testing.assert_frame_equal(result, serial[name], obj=name)
+
+
+@pytest.fixture(params=["integer", "fractional"])
+def setup(request, tmp_path):
+    db = Database(str(tmp_path), fsync=False, journal=True)
+    rng = populate(db, request.param == "fractional")
+    engine = ReportEngine(db, parallel=ParallelReports(workers=2, min_claims=100))
+    yield db, engine, rng, request.param
+    engine.close()
+    db.close()
+
+
+def test_reports_match_the_serial_engine(setup):
+    db, engine, _, amounts = setup
+    assert_same_reports(engine, db)
+    # integer amounts go through the pool; fractional ones stay serial, where float
+    # totals are added in the same order
+    assert engine._in_parallel() == (amounts == "integer")
+    assert (engine.parallel._executor is not None) == (amounts == "integer")
+
+
+def test_reports_match_after_changes(setup):
+    db, engine, rng, _ = setup
+    reports(engine)
+    for claim_id in rng.sample(sorted(db.claims), 200):
+        db.update_claim_status(claim_id, rng.choice(STATUSES))
+    for claim_id in rng.sample(sorted(db.claims), 200):
+        db.delete_claim(claim_id)
+    db.update_policyholder(next(iter(db.policyholders)), {"policy_type": "Travel"})
+    # a claim whose policyholder is gone counts towards months and statuses only
+    with db._lock:
+        db._remove_policyholder(db.claims[next(iter(db.claims))].policyholder_id)
+        db._mark_dirty("policyholders")
+    assert_same_reports(engine, db)
+
+
+def test_small_datasets_stay_serial(tmp_path):
+    db = Database(str(tmp_path), fsync=False, journal=True)
+    engine = ReportEngine(db, parallel=ParallelReports(workers=2, min_claims=10**6))
+    try:
+        populate(db, fractional=False)
+        assert not engine._in_parallel()
+        assert_same_reports(engine, db)
+        assert engine.parallel._executor is None
+    finally:
+        engine.close()
+        db.close()
@@ -0,0 +1,65 @@
+from datetime import datetime
+
+import pytest
+
+from database import Database
+from reports import ReportEngine
+from test_database import populate
+
+NOW = datetime(2024, 12, 31)
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = Database(str(tmp_path), fsync=False, journal=True)
+    populate(db)
+    yield db
+    db.close()
+
+
+def reports(engine, start=None, end=None):
+    return [engine.claim_frequency(start, end), engine.high_risk_policyholders(NOW, start, end),
+            engine.policy_type_summary(start, end), engine.monthly_totals(start, end),
+            engine.average_claim_by_policy_type(start, end), engine.top_claims(10, start, end),
+            engine.pending_aging(NOW, start, end)]
+
+
+def assert_same(frames, expected):
+    assert len(frames) == len(expected)
+    for frame, other in zip(frames, expected):
+        assert frame.equals(other)
+
+
+def test_date_ranges_are_cached_least_recently_used_first(db):
+    engine = ReportEngine(db, max_windows=2)
+    windows = [("2024-01-01", "2024-03-31"), ("2024-04-01", "2024-06-30"), ("2024-07-01", None)]
+    first = reports(engine, *windows[0])
+    assert engine.claim_frequency("2024-01-01", "2024-03-31") is first[0]
+    second = reports(engine, *windows[1])
+    # the first range was used more recently than the second, so the second goes
+    engine.claim_frequency(*windows[0])
+    reports(engine, *windows[2])
+    assert len(engine._windows) == 2
+    assert engine.claim_frequency(*windows[0]) is first[0]
+    recomputed = reports(engine, *windows[1])
+    assert recomputed[0] is not second[0]
+    assert_same(recomputed, second)
+
+
+def test_results_over_every_claim_are_not_evicted(db):
+    engine = ReportEngine(db, max_windows=1)
+    everything = reports(engine)
+    for month in range(1, 13):
+        reports(engine, f"2024-{month:02d}-01", f"2024-{month:02d}-28")
+    assert len(engine._windows) == 1
+    assert all(result is cached for result, cached in zip(reports(engine), everything))
+
+
+def test_results_follow_changes(db):
+    engine = ReportEngine(db, max_windows=4)
+    before = engine.top_claims(5, "2024-03-01", "2024-03-31")
+    top = before["Claim ID"][0]
+    db.delete_claim(top)
+    after = engine.top_claims(5, "2024-03-01", "2024-03-31")
+    assert top not in list(after["Claim ID"])
+    assert_same(reports(engine, "2024-03-01", "2024-03-31"), reports(ReportEngine(db), "2024-03-01", "2024-03-31"))
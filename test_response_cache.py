@@ -0,0 +1,45 @@
+from response_cache import ResponseCache
+
+
+def test_other_versions_miss():
+    cache = ResponseCache()
+    cache.put("risks", 1, b"old")
+    assert cache.get("risks", 1) == b"old"
+    assert cache.get("risks", 2) is None
+    cache.put("risks", 2, b"new")
+    assert cache.get("risks", 1) is None and cache.get("risks", 2) == b"new"
+    assert cache.stats()["bytes"] == 3
+
+
+def test_least_recently_used_bodies_are_evicted_by_size():
+    cache = ResponseCache(max_bytes=10)
+    cache.put("a", 1, b"aaaa")
+    cache.put("b", 1, b"bbbb")
+    assert cache.get("a", 1) == b"aaaa"
+    cache.put("c", 1, b"cccc")
+    # b was used least recently
+    assert cache.get("b", 1) is None
+    assert cache.get("a", 1) == b"aaaa" and cache.get("c", 1) == b"cccc"
+    cache.put("d", 1, b"dddddddd")
+    assert cache.get("a", 1) is None and cache.get("c", 1) is None and cache.get("d", 1) == b"dddddddd"
+    stats = cache.stats()
+    assert (stats["evictions"], stats["entries"], stats["bytes"]) == (3, 1, 8)
+
+
+def test_bodies_larger_than_the_cache_are_not_kept():
+    cache = ResponseCache(max_bytes=4)
+    cache.put("a", 1, b"aa")
+    cache.put("a", 2, b"too large")
+    assert cache.get("a", 1) is None and cache.get("a", 2) is None
+    assert cache.stats()["bytes"] == 0
+
+
+def test_stats_count_hits_and_misses():
+    cache = ResponseCache()
+    cache.put("a", 1, b"a")
+    cache.get("a", 1)
+    cache.get("a", 1)
+    cache.get("b", 1)
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (2, 1)
+    assert stats["hit_rate"] == 2 / 3
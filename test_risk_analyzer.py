@@ -0,0 +1,158 @@
+import itertools
+import random
+
+import numpy as np
+import pytest
+
+from risk_analyzer import RiskAnalyzer
+
+FACTORS = list(RiskAnalyzer.WEIGHT_FACTORS)
+
+
+def original_score(risk_factors):
+    # analyze_risk's arithmetic before the score cache, the reference every mode must match
+    weighted_score = 0
+    for factor, weight in RiskAnalyzer.WEIGHT_FACTORS.items():
+        if factor in risk_factors:
+            weighted_score += (risk_factors[factor] / 10) * 100 * weight
+    return round(weighted_score, 2)
+
+
+@pytest.fixture(scope="module")
+def integer_grid():
+    # every input with six integer factors 1..10, in score table order; scores are positive,
+    # so == between them means the same bits
+    rows = [dict(zip(FACTORS, values)) for values in itertools.product(range(1, 11), repeat=len(FACTORS))]
+    return rows, [original_score(row) for row in rows]
+
+
+def test_score_table_matches_the_original_on_every_integer_input(integer_grid):
+    rows, expected = integer_grid
+    analyzer = RiskAnalyzer(score_cache='table')
+    assert list(analyzer._score_table()) == expected
+    assert [analyzer.analyze_risk(row) for row in rows] == expected
+    assert analyzer.score_cache_stats()["fallbacks"] == 0
+
+
+def test_memo_matches_the_original_on_every_integer_input(integer_grid):
+    rows, expected = integer_grid
+    analyzer = RiskAnalyzer(score_cache='memo')
+    assert [analyzer.analyze_risk(row) for row in rows] == expected
+    # and again for a slice the memo still holds
+    assert [analyzer.analyze_risk(row) for row in rows[-1000:]] == expected[-1000:]
+    assert analyzer.score_cache_stats()["hits"] == 1000
+
+
+@pytest.mark.parametrize("mode", RiskAnalyzer.SCORE_CACHE_MODES)
+def test_other_inputs_fall_back_to_the_exact_computation(mode):
+    rng = random.Random(0)
+    analyzer = RiskAnalyzer(score_cache=mode)
+    rows = []
+    for _ in range(5000):
+        # fractional, integral-float and bool values, in shuffled key order
+        rows.append({factor: rng.choice([rng.uniform(1, 10), rng.randint(1, 10), float(rng.randint(1, 10)), True])
+                     for factor in rng.sample(FACTORS, len(FACTORS))})
+    rows.append({**dict.fromkeys(FACTORS, 5), "notes": 5})
+    for row in rows:
+        assert analyzer.analyze_risk(row) == original_score(row)
+
+
+@pytest.mark.parametrize("mode", RiskAnalyzer.SCORE_CACHE_MODES)
+@pytest.mark.parametrize("risk_factors", [{}, {factor: 5 for factor in FACTORS[1:]},
+                                          {**dict.fromkeys(FACTORS, 5), "budget_constraints": 11},
+                                          {**dict.fromkeys(FACTORS, 5), "budget_constraints": "5"}])
+def test_invalid_inputs_still_raise(mode, risk_factors):
+    with pytest.raises(ValueError):
+        RiskAnalyzer(score_cache=mode).analyze_risk(risk_factors)
+
+
+def test_memo_stats():
+    analyzer = RiskAnalyzer(score_cache='memo')
+    row = dict.fromkeys(FACTORS, 5)
+    for _ in range(4):
+        analyzer.analyze_risk(row)
+    analyzer.analyze_risk({**row, "budget_constraints": 5.5})
+    # 5.0 and True equal integers, so they share the memo entries of 5 and 1
+    analyzer.analyze_risk({**row, "budget_constraints": 5.0})
+    analyzer.analyze_risk(dict.fromkeys(FACTORS, True))
+    stats = analyzer.score_cache_stats()
+    assert (stats["hits"], stats["misses"], stats["fallbacks"], stats["size"]) == (4, 2, 1, 2)
+    assert stats["hit_rate"] == 4 / 7
+
+
+def test_table_stats():
+    analyzer = RiskAnalyzer(score_cache='table')
+    assert analyzer.score_cache_stats()["size"] == 0
+    row = dict.fromkeys(FACTORS, 3)
+    for _ in range(3):
+        analyzer.analyze_risk(row)
+    # an integral float can't index the table and takes the exact computation
+    assert analyzer.analyze_risk({**row, "budget_constraints": 3.0}) == analyzer.analyze_risk(row)
+    stats = analyzer.score_cache_stats()
+    assert (stats["hits"], stats["misses"], stats["fallbacks"], stats["size"]) == (4, 0, 1, 10**6)
+    assert stats["hit_rate"] == 4 / 5
+
+
+def test_uncached_stats():
+    analyzer = RiskAnalyzer(score_cache='off')
+    analyzer.analyze_risk(dict.fromkeys(FACTORS, 3))
+    stats = analyzer.score_cache_stats()
+    # nothing is looked up, so nothing falls back either
+    assert (stats["mode"], stats["hits"], stats["fallbacks"], stats["hit_rate"]) == ('off', 0, 0, 0.0)
+
+
+def test_unknown_cache_mode():
+    with pytest.raises(ValueError):
+        RiskAnalyzer(score_cache='disk')
+
+
+def random_rows(rng, count):
+    return [{factor: rng.choice([rng.randint(1, 10), rng.uniform(1, 10), True]) for factor in FACTORS}
+            for _ in range(count)]
+
+
+def test_batch_scores_match_analyze_risk():
+    rows = random_rows(random.Random(1), 5000)
+    analyzer = RiskAnalyzer(score_cache='off')
+    result = analyzer.analyze_batch(rows)
+    assert result["errors"] == {}
+    assert result["scores"].tolist() == [analyzer.analyze_risk(row) for row in rows]
+    assert result["risk_levels"] == [analyzer.get_risk_level(analyzer.analyze_risk(row)) for row in rows]
+
+
+def test_batch_accepts_an_array_in_factor_order():
+    rows = random_rows(random.Random(2), 1000)
+    analyzer = RiskAnalyzer()
+    result = analyzer.analyze_batch(np.array([[row[factor] for factor in FACTORS] for row in rows]))
+    assert result["scores"].tolist() == [analyzer.analyze_risk(row) for row in rows]
+    with pytest.raises(ValueError):
+        analyzer.analyze_batch(np.ones((3, 5)))
+
+
+def test_batch_reports_errors_per_row():
+    analyzer = RiskAnalyzer()
+    valid = dict.fromkeys(FACTORS, 4)
+    rows = [valid,
+            {**valid, "budget_constraints": 0},
+            {**valid, "regulatory_compliance": 10.5},
+            {},
+            {factor: 4 for factor in FACTORS[1:]},
+            {**valid, "timeline_constraints": "4"},
+            [4] * 6,
+            {**valid, "notes": 4},
+            {**valid, "technical_complexity": 10}]
+    result = analyzer.analyze_batch(rows)
+    for i, row in enumerate(rows):
+        try:
+            expected = analyzer.analyze_risk(row)
+        except (ValueError, AttributeError):
+            assert i in result["errors"]
+            assert np.isnan(result["scores"][i]) and result["risk_levels"][i] is None
+        else:
+            assert i not in result["errors"]
+            assert result["scores"][i] == expected
+    assert sorted(result["errors"]) == [1, 2, 3, 4, 5, 6]
+    assert "Values must be between 1 and 10" in result["errors"][1]
+    assert result["errors"][3] == "Risk factors cannot be empty"
+    assert "technical_complexity" in result["errors"][4]
+    assert result["errors"][6] == "Risk factors must be an object"
@@ -0,0 +1,139 @@
+import os
+import random
+
+import pytest
+
+from database import Database
+from models import Claim, Policyholder
+from snapshot import Snapshot, pack, unpack
+
+STATUSES = ("Pending", "Approved", "Rejected")
+
+
+def open_db(data_dir, **options):
+    return Database(str(data_dir), fsync=False, **options)
+
+
+def populate(db, seed=0):
+    rng = random.Random(seed)
+    holders = []
+    for i in range(30):
+        # non-ASCII and repeated strings go through the string table
+        holder = Policyholder(rng.choice(["Zoë Ørsted", "李雷", "Jane Smith"]) + f" {i}", 20 + i,
+                              rng.choice(("Health", "Vehicle", "Life")), rng.choice([500000, 750000.5]))
+        db.add_policyholder(holder)
+        holders.append(holder)
+    for _ in range(200):
+        amount = rng.choice([rng.randrange(100, 50000), round(rng.uniform(100, 50000), 2)])
+        db.add_claim(Claim(rng.choice(holders).id, amount, rng.choice(["Surgery", "Theft", "Flood"]),
+                           rng.choice(STATUSES), f"2024-{rng.randrange(1, 13):02d}-{rng.randrange(1, 29):02d}"))
+    return rng
+
+
+def records(db):
+    return ({key: value.to_dict() for key, value in db.policyholders.items()},
+            {key: value.to_dict() for key, value in db.claims.items()})
+
+
+def summary(db):
+    # float totals and the order of policy types depend on the order claims were added and
+    # removed, so totals are compared to the cent and policy types sorted
+    aggregates = db.aggregates
+    return ([(month, count, round(total, 2)) for month, count, total in aggregates.monthly_totals()],
+            sorted((policy_type, count, round(total, 2))
+                   for policy_type, count, total in aggregates.policy_type_totals()),
+            {holder_id: (lambda count, total: (count, round(total, 2)))(*aggregates.policyholder_totals(holder_id))
+             for holder_id in db.policyholders},
+            [claim.id for claim in db.top_claims(20)], [claim.id for claim in db.pending_claims()])
+
+
+def edit(db, rng):
+    for claim_id in rng.sample(sorted(db.claims), 20):
+        db.update_claim_status(claim_id, rng.choice(STATUSES))
+    for claim_id in rng.sample(sorted(db.claims), 20):
+        db.delete_claim(claim_id)
+    holder_id = sorted(db.policyholders)[0]
+    db.update_policyholder(holder_id, {"policy_type": "Life", "name": "Renamed Ünïcode"})
+    # fixed ids, so both databases get the same records
+    holder = Policyholder("New Holder", 33, "Health", 100000)
+    holder.id = "new-holder"
+    db.add_policyholder(holder)
+    claim = Claim(holder.id, 1234.5, "Flood", "Pending", "2025-02-03")
+    claim.id = "new-claim"
+    db.add_claim(claim)
+
+
+@pytest.fixture
+def source(tmp_path):
+    db = open_db(tmp_path / "json")
+    rng = populate(db)
+    yield db, rng
+    db.close()
+
+
+def test_pack_keeps_every_record(source, tmp_path):
+    db, _ = source
+    path = str(tmp_path / "data.snap")
+    pack(db.data_dir, path)
+    snapshot = Snapshot(path)
+    try:
+        policyholders, claims = records(db)
+        for table, expected in ((snapshot.policyholders, policyholders), (snapshot.claims, claims)):
+            assert [table.record(row) for row in range(table.count)] == list(expected.values())
+        # each distinct string is stored once
+        strings = {value for rows in (policyholders, claims) for record in rows.values()
+                   for field, value in record.items() if isinstance(value, str) and "date" not in field}
+        assert len(snapshot.strings.offsets) == len(strings) + 1
+    finally:
+        snapshot.close()
+
+
+def test_unpack_restores_the_data_files(source, tmp_path):
+    db, _ = source
+    pack(db.data_dir, str(tmp_path / "data.snap"))
+    os.makedirs(tmp_path / "unpacked")
+    unpack(str(tmp_path / "data.snap"), str(tmp_path / "unpacked"), "ndjson")
+    copy = open_db(tmp_path / "unpacked", data_format="ndjson")
+    try:
+        assert records(copy) == records(db)
+    finally:
+        copy.close()
+
+
+def test_snapshot_database_matches_the_source(source, tmp_path):
+    db, _ = source
+    os.makedirs(tmp_path / "snap")
+    pack(db.data_dir, str(tmp_path / "snap" / "data.snap"))
+    snap = open_db(tmp_path / "snap", data_format="snapshot")
+    try:
+        # nothing is built into model objects until it is read
+        assert snap.claims.materialized_count() == 0
+        assert records(snap) == records(db)
+        assert summary(snap) == summary(db)
+        assert snap.verify_aggregates() == []
+    finally:
+        snap.close()
+
+
+@pytest.mark.parametrize("journal", [True, False])
+def test_edits_on_a_snapshot_survive_reopening(source, tmp_path, journal):
+    db, rng = source
+    os.makedirs(tmp_path / "snap")
+    pack(db.data_dir, str(tmp_path / "snap" / "data.snap"))
+    snap = open_db(tmp_path / "snap", data_format="snapshot", journal=journal)
+    state = rng.getstate()
+    edit(snap, rng)
+    rng.setstate(state)
+    edit(db, rng)
+    assert records(snap) == records(db)
+    snap.close()
+    # journaled edits replay over the mapped snapshot; otherwise the snapshot was rewritten
+    assert os.path.exists(tmp_path / "snap" / "journal.log") == journal
+
+    snap = open_db(tmp_path / "snap", data_format="snapshot", journal=journal)
+    try:
+        assert records(snap) == records(db)
+        assert summary(snap) == summary(db)
+        assert snap.verify_aggregates() == []
+    finally:
+        snap.close()
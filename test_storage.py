@@ -0,0 +1,140 @@
+import json
+import os
+
+import pytest
+
+from database import Database
+from models import Claim, Policyholder
+from storage import FileBackend, StorageBackend
+
+
+def open_db(data_dir, **options):
+    return Database(str(data_dir), fsync=False, **options)
+
+
+def journal_path(data_dir):
+    return os.path.join(str(data_dir), FileBackend.JOURNAL_FILE)
+
+
+def add_holder(db, name="Jane Smith"):
+    policyholder = Policyholder(name, 40, "Health", 500000)
+    db.add_policyholder(policyholder)
+    return policyholder
+
+
+def add_claim(db, policyholder, amount=1000):
+    claim = Claim(policyholder.id, amount, "Surgery", "Pending", "2024-01-01")
+    assert db.add_claim(claim)
+    return claim
+
+
+def test_journal_replays_on_reopen(tmp_path):
+    db = open_db(tmp_path, journal=True)
+    policyholder = add_holder(db)
+    claim = add_claim(db, policyholder)
+    db.update_claim_status(claim.id, "Approved")
+    db.close()
+    # nothing was compacted, so the records exist only in the journal
+    assert not os.path.exists(tmp_path / "claims.json")
+
+    db = open_db(tmp_path, journal=True)
+    assert db.policyholders[policyholder.id].name == "Jane Smith"
+    assert db.claims[claim.id].status == "Approved"
+    assert db.verify_aggregates() == []
+    db.close()
+
+
+def test_journal_deletes_replay(tmp_path):
+    db = open_db(tmp_path, journal=True)
+    policyholder = add_holder(db)
+    claim = add_claim(db, policyholder)
+    db.delete_claim(claim.id)
+    db.close()
+
+    db = open_db(tmp_path, journal=True)
+    assert claim.id not in db.claims
+    assert policyholder.id in db.policyholders
+    db.close()
+
+
+def test_journal_compacts_at_threshold(tmp_path):
+    db = open_db(tmp_path, journal=True, compact_threshold=3)
+    policyholder = add_holder(db)
+    add_claim(db, policyholder)
+    assert os.path.exists(journal_path(tmp_path))
+    add_claim(db, policyholder)
+    # the third entry folded the journal into the data files
+    assert not os.path.exists(journal_path(tmp_path))
+    with open(tmp_path / "claims.json") as f:
+        assert len(json.load(f)) == 2
+    db.close()
+
+    db = open_db(tmp_path, journal=True)
+    assert len(db.claims) == 2
+    db.close()
+
+
+def test_leftover_journal_is_folded_in_without_journal_mode(tmp_path):
+    db = open_db(tmp_path, journal=True)
+    policyholder = add_holder(db)
+    db.close()
+
+    db = open_db(tmp_path)
+    assert policyholder.id in db.policyholders
+    assert not os.path.exists(journal_path(tmp_path))
+    db.close()
+    with open(tmp_path / "policyholders.json") as f:
+        assert policyholder.id in json.load(f)
+
+
+def test_torn_journal_tail_is_dropped(tmp_path):
+    db = open_db(tmp_path, journal=True)
+    policyholder = add_holder(db)
+    db.close()
+    with open(journal_path(tmp_path), "a") as f:
+        f.write('{"op": "put_claim", "data": {"id": "torn"')
+
+    db = open_db(tmp_path, journal=True)
+    assert policyholder.id in db.policyholders
+    assert "torn" not in db.claims
+    db.close()
+    with open(journal_path(tmp_path), "rb") as f:
+        assert f.read().endswith(b"\n")
+
+
+def test_writes_after_a_torn_tail_survive_the_next_replay(tmp_path):
+    db = open_db(tmp_path, journal=True)
+    policyholder = add_holder(db)
+    db.close()
+    # a crash after the record but before its newline: valid JSON, still unacknowledged
+    with open(journal_path(tmp_path), "a") as f:
+        f.write(json.dumps({"op": "delete_policyholder", "id": policyholder.id}))
+
+    db = open_db(tmp_path, journal=True)
+    assert policyholder.id in db.policyholders
+    claim = add_claim(db, policyholder)
+    db.close()
+
+    db = open_db(tmp_path, journal=True)
+    assert claim.id in db.claims
+    db.close()
+
+
+def test_save_rewrites_only_dirty_files(tmp_path):
+    db = open_db(tmp_path)
+    policyholder = add_holder(db)
+    add_claim(db, policyholder)
+    claims_mtime = os.stat(tmp_path / "claims.json").st_mtime_ns
+    os.utime(tmp_path / "claims.json", ns=(claims_mtime - 10**9, claims_mtime - 10**9))
+    db.update_policyholder(policyholder.id, {"age": 41})
+    assert os.stat(tmp_path / "claims.json").st_mtime_ns == claims_mtime - 10**9
+    db.close()
+
+
+def test_incomplete_backend_fails_on_creation():
+    class RecordsOnly(StorageBackend):
+        def records(self, collection):
+            return {}
+
+    with pytest.raises(TypeError):
+        RecordsOnly()